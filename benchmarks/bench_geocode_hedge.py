@@ -0,0 +1,76 @@
+"""
+ROAD→PARCEL 순차 폴백 vs 헤지 모드 지오코딩 지연시간 비교 (네트워크 없이 VWorld 지연을 모사).
+
+실행: python benchmarks/bench_geocode_hedge.py [--n 400] [--parcel-ratio 0.6] [--scale 0.01]
+- parcel-ratio: 지번 주소 비율(ROAD 조회가 실패하는 비율)
+- scale: 실제 초 단위 지연에 곱하는 값(기본 0.01 → 10초 타임아웃이 0.1초)
+"""
+import argparse, asyncio, os, random, statistics, sys, time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi import HTTPException
+from python_ai_server import geocoding_vworld
+from python_ai_server.cache import TieredCache
+
+def _latency(rng: random.Random, scale: float) -> float:
+    # VWorld 응답: 대부분 100~400ms, 2% 확률로 10초 타임아웃
+    if rng.random() < 0.02:
+        return 10.0 * scale
+    return rng.lognormvariate(-1.6, 0.5) * scale
+
+def _make_fake_vworld(rng: random.Random, scale: float, parcel_addresses: set):
+    async def fake_call(address: str, addr_type: str):
+        await asyncio.sleep(_latency(rng, scale))
+        if addr_type == "ROAD" and address in parcel_addresses:
+            raise HTTPException(404, f"VWorld 결과 없음({addr_type}): {address}")
+        return 37.5, 127.0
+    return fake_call
+
+async def _run(hedge: bool, addresses: list, concurrency: int = 20) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(address: str):
+        async with semaphore:
+            started = time.perf_counter()
+            await geocoding_vworld.geocode_vworld(address, hedge=hedge)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(a) for a in addresses))
+    return latencies
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=400)
+    parser.add_argument("--parcel-ratio", type=float, default=0.6)
+    parser.add_argument("--scale", type=float, default=0.01)
+    args = parser.parse_args()
+
+    addresses = [f"서울 강남구 역삼동 {i}" for i in range(args.n)]
+    rng = random.Random(42)
+    parcel = {a for a in addresses if rng.random() < args.parcel_ratio}
+    geocoding_vworld.VWORLD_KEY = "bench"
+    geocoding_vworld.GEOCODE_HEDGE_DELAY *= args.scale
+    geocoding_vworld.GEOCODE_PREFER_WINDOW *= args.scale
+
+    print(f"n={args.n} parcel_ratio={args.parcel_ratio} scale={args.scale} (표시 단위: 실제 환산 ms)")
+    for hedge in (False, True):
+        # 캐시를 비워 매 실행이 VWorld 호출을 하도록
+        geocoding_vworld.GEOCODE_CACHE = TieredCache("geocode", path=None)
+        geocoding_vworld.GEOCODE_TYPE_HINTS = TieredCache("geocode_type", path=None)
+        geocoding_vworld._call_vworld = _make_fake_vworld(random.Random(7), args.scale, parcel)
+        latencies = asyncio.run(_run(hedge, addresses))
+        to_ms = 1000.0 / args.scale
+        print(
+            f"{'hedged    ' if hedge else 'sequential'} "
+            f"p50={_percentile(latencies, 0.50) * to_ms:8.1f}ms "
+            f"p95={_percentile(latencies, 0.95) * to_ms:8.1f}ms "
+            f"p99={_percentile(latencies, 0.99) * to_ms:8.1f}ms "
+            f"mean={statistics.mean(latencies) * to_ms:8.1f}ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+latlon_to_grid 스칼라(매 호출 상수 계산 / 상수 호이스팅) vs NumPy 배치 변환 처리량 비교.
+
+실행: python benchmarks/bench_grid_projection.py [--n 200000]
+"""
+import argparse, os, random, sys, time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+from python_ai_server.grid_projection import latlon_to_grid, latlon_to_grid_batch
+
+def _baseline_latlon_to_grid(lat, lon):
+    # 기존 weather_kma.latlon_to_grid (투영 상수를 매번 계산)
+    import math as _m
+    RE = 6371.00877; GRID = 5.0
+    SLAT1, SLAT2 = 30.0, 60.0; OLON, OLAT = 126.0, 38.0
+    XO, YO = 43, 136
+    DEGRAD = _m.pi / 180.0
+    re = RE / GRID
+    slat1 = SLAT1 * DEGRAD; slat2 = SLAT2 * DEGRAD
+    olon = OLON * DEGRAD;  olat = OLAT * DEGRAD
+    sn = _m.log(_m.cos(slat1)/_m.cos(slat2)) / _m.log(
+        _m.tan(_m.pi*0.25+slat2*0.5)/_m.tan(_m.pi*0.25+slat1*0.5)
+    )
+    sf = (_m.cos(slat1)*(_m.tan(_m.pi*0.25+slat1*0.5)**sn))/sn
+    ro = re*sf/(_m.tan(_m.pi*0.25+olat*0.5)**sn)
+    ra = re*sf/(_m.tan(_m.pi*0.25+(lat*DEGRAD)*0.5)**sn)
+    theta = (lon*DEGRAD)-olon
+    if theta > _m.pi: theta -= 2.0*_m.pi
+    if theta < -_m.pi: theta += 2.0*_m.pi
+    theta *= sn
+    x = ra*_m.sin(theta)+XO+0.5
+    y = ro - ra*_m.cos(theta)+YO+0.5
+    return int(x), int(y)
+
+def _rate(label, n, seconds):
+    print(f"{label:<22} {seconds * 1000:9.1f}ms  {n / seconds / 1e6:7.2f}M pts/s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    points = [(rng.uniform(33.0, 38.6), rng.uniform(124.5, 131.0)) for _ in range(args.n)]
+    lats = np.array([p[0] for p in points]); lons = np.array([p[1] for p in points])
+
+    started = time.perf_counter()
+    expected = [_baseline_latlon_to_grid(lat, lon) for lat, lon in points]
+    _rate("scalar (baseline)", args.n, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    scalar = [latlon_to_grid(lat, lon) for lat, lon in points]
+    _rate("scalar (hoisted)", args.n, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    nx, ny = latlon_to_grid_batch(lats, lons)
+    _rate("batch (numpy)", args.n, time.perf_counter() - started)
+
+    assert scalar == expected == list(zip(nx.tolist(), ny.tolist()))
+
+if __name__ == "__main__":
+    main()
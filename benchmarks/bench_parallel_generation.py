@@ -0,0 +1,91 @@
+"""
+한 번에 3코스(single) vs 코스별 동시 생성(parallel) 지연시간 비교 (네트워크 없이 OpenAI 지연을 모사).
+
+실행: python benchmarks/bench_parallel_generation.py [--n 40] [--scale 0.01] [--ms-per-token 20] [--invalid-ratio 0.1]
+- 모사 지연 = 첫 토큰 지연(400~900ms) + 출력 토큰 수 × ms-per-token (출력이 길수록 선형으로 증가)
+- invalid-ratio: 코스 하나가 규칙을 어겨 수리(재생성)가 필요한 비율
+- scale: 실제 초 단위 지연에 곱하는 값(기본 0.01)
+"""
+import argparse, asyncio, itertools, json, os, random, statistics, sys, time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from types import SimpleNamespace
+from python_ai_server.recommendations import places
+
+PLACES = [
+    ("서울숲", "공원"), ("카페 어니언 성수점", "카페"), ("국립중앙박물관", "박물관"), ("서울스카이", "야경"),
+    ("하이디라오 강남점", "식당"), ("봉은사", "기타"), ("코엑스 아쿠아리움", "액티비티"), ("찰스바 청담점", "바"),
+    ("리움미술관", "박물관"), ("북서울꿈의숲", "공원"), ("블루보틀 삼청점", "카페"), ("을지면옥 본점", "식당"),
+]
+
+_branch = itertools.count(1)
+
+def _course(rng: random.Random, index: int, invalid: bool) -> dict:
+    # 지점 번호를 붙여 코스 간 장소가 겹치지 않게(카테고리 구성은 가끔 겹쳐 중복 수리도 포함됨)
+    picks = rng.sample(PLACES, 5)
+    stops = [
+        {"장소명": f"{name} {next(_branch)}호점", "설명": "벤치마크용 설명 문장입니다", "권장체류시간": 60, "권장시간대": "오후", "카테고리": category}
+        for name, category in picks
+    ]
+    if invalid:
+        stops[0]["장소명"] = "역삼동"
+    return {"코스명": f"코스 {index} {rng.random():.6f}", "총예상소요시간": 60 * len(stops) + 60, "스톱": stops}
+
+def _fake_client(rng: random.Random, scale: float, ms_per_token: float, invalid_ratio: float):
+    class Completions:
+        async def create(self, **kwargs):
+            single = kwargs.get("response_format", {}).get("json_schema") is places.JSON_SCHEMA
+            if single:
+                body = {"courses": [_course(rng, i, rng.random() < invalid_ratio) for i in range(3)]}
+            else:
+                body = {"course": _course(rng, 0, rng.random() < invalid_ratio)}
+            content = json.dumps(body, ensure_ascii=False)
+            output_tokens = len(content) // 2  # 한글 JSON 대략치
+            await asyncio.sleep((rng.uniform(0.4, 0.9) + output_tokens * ms_per_token / 1000.0) * scale)
+            usage = SimpleNamespace(prompt_tokens=1500, completion_tokens=output_tokens, total_tokens=1500 + output_tokens)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    async def close():
+        pass
+    return lambda **kwargs: SimpleNamespace(chat=SimpleNamespace(completions=Completions()), close=close)
+
+async def _run(mode: str, n: int) -> tuple:
+    latencies, tokens = [], []
+    for _ in range(n):
+        usage: dict = {}
+        started = time.perf_counter()
+        await places.get_place_recommendations_async("서울 강남역", "2025-08-17", "15:00", weather_text="맑음", usage=usage, mode=mode)
+        latencies.append(time.perf_counter() - started)
+        tokens.append(usage.get("total_tokens", 0))
+    return latencies, tokens
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=40)
+    parser.add_argument("--scale", type=float, default=0.01)
+    parser.add_argument("--ms-per-token", type=float, default=20.0)
+    parser.add_argument("--invalid-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    async def no_photos(result, api_key):
+        return None
+    places.enrich_photos_async = no_photos
+
+    print(f"n={args.n} ms_per_token={args.ms_per_token} invalid_ratio={args.invalid_ratio} scale={args.scale} (표시 단위: 실제 환산 ms)")
+    for mode in ("single", "parallel"):
+        places.AsyncOpenAI = _fake_client(random.Random(7), args.scale, args.ms_per_token, args.invalid_ratio)
+        latencies, tokens = asyncio.run(_run(mode, args.n))
+        to_ms = 1000.0 / args.scale
+        print(
+            f"{mode:8} "
+            f"p50={_percentile(latencies, 0.50) * to_ms:8.1f}ms "
+            f"p95={_percentile(latencies, 0.95) * to_ms:8.1f}ms "
+            f"mean={statistics.mean(latencies) * to_ms:8.1f}ms "
+            f"tokens/req={statistics.mean(tokens):7.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+후처리/격자 변환 핫패스 마이크로 벤치마크 (배포 전 성능 회귀 확인용).
+
+실행: python benchmarks/bench_postprocess_micro.py [--number 2000] [--repeat 5] [--max-size 64000]
+- validate_course_schema / fallback_parse / 기존 필드명 변환 / normalize_result / latlon_to_grid
+- 각 함수의 호출당 소요시간(µs) 최솟값과 중앙값을 출력합니다(repeat회 측정, 회당 number번 호출).
+- 규모 테스트: 큰 응답/깨진 응답 길이를 두 배씩 늘리며 기존 정규식 폴백 파서와 extract_json을 비교합니다.
+  길이가 두 배일 때 시간도 약 두 배(비율 ~2)면 선형, ~4면 제곱입니다.
+"""
+import argparse, json, os, re, statistics, sys, time, timeit
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from python_ai_server.grid_projection import latlon_to_grid
+from python_ai_server.recommendations.places import (
+    FIELD_MAP, extract_json, fallback_parse, normalize_result, validate_course_schema,
+)
+from stand_ins import course_result
+
+_ENGLISH = {korean: english for english, korean in FIELD_MAP.items()}
+
+def _to_english(data):
+    if isinstance(data, dict):
+        return {_ENGLISH.get(k, k): _to_english(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_to_english(item) for item in data]
+    return data
+
+def _baseline_convert_fields_to_korean(data):
+    # 기존 convert_fields_to_korean (변환만 하는 재귀 순회, 검증은 따로 한 번 더)
+    if isinstance(data, dict):
+        out = {}
+        for k, v in data.items():
+            new_key = FIELD_MAP.get(k, k)
+            if new_key is None:
+                continue
+            out[str(new_key)] = _baseline_convert_fields_to_korean(v)
+        return out
+    if isinstance(data, list):
+        return [_baseline_convert_fields_to_korean(item) for item in data]
+    return data
+
+def cases() -> dict:
+    result = course_result(1)
+    assert validate_course_schema(result)
+    english = _to_english(result)
+    # 모델이 설명문 + 코드펜스로 감싸 보낸 응답(json.loads 실패 -> fallback_parse 경로)
+    fenced = "추천 코스입니다.\n```json\n" + json.dumps(english, ensure_ascii=False, indent=2) + "\n```\n즐거운 하루 되세요."
+    assert fallback_parse(fenced) == english
+    return {
+        "validate_course_schema": lambda: validate_course_schema(result),
+        "fallback_parse": lambda: fallback_parse(fenced),
+        "convert_fields_to_korean (기존)": lambda: _baseline_convert_fields_to_korean(english),
+        "convert+validate (기존 2회 순회)": lambda: validate_course_schema(_baseline_convert_fields_to_korean(english)),
+        "normalize_result (1회 순회)": lambda: normalize_result(english),
+        "latlon_to_grid": lambda: latlon_to_grid(37.4979, 127.0276),
+    }
+
+def _baseline_fallback_parse(text):
+    # 기존 fallback_parse (탐욕적 [\s\S]+ 정규식 + json.loads 여러 번)
+    codeblock = re.search(r"```(?:json)?\s*([\s\S]+?)```", text)
+    if codeblock:
+        text = codeblock.group(1)
+    if text.strip().startswith("["):
+        try:
+            return {"courses": json.loads(text)}
+        except Exception:
+            pass
+    obj_match = re.search(r"({[\s\S]+})", text)
+    arr_match = re.search(r"(\[[\s\S]+\])", text)
+    try:
+        if obj_match:
+            return json.loads(obj_match.group(1))
+        elif arr_match:
+            return {"courses": json.loads(arr_match.group(1))}
+    except Exception:
+        pass
+    return None
+
+def scaling_inputs(size: int) -> dict:
+    course = json.dumps(_to_english(course_result(2)["courses"][0]), ensure_ascii=False)
+    repeated = ", ".join([course] * max(1, size // len(course)))
+    return {
+        "큰 응답(설명문+코드펜스)": "설명입니다.\n```json\n{\"courses\": [" + repeated + "]}\n```",
+        "잘린 응답(닫히지 않음)": '{"courses": [' + repeated,
+        "여는 괄호만 반복": "{" * size,
+        "짝 안 맞는 괄호 반복": "{ ] " * (size // 4),
+    }
+
+def _time_once(fn, text: str) -> float:
+    started = time.perf_counter()
+    fn(text)
+    return time.perf_counter() - started
+
+def scaling(max_size: int) -> None:
+    sizes = []
+    size = 1000
+    while size <= max_size:
+        sizes.append(size)
+        size *= 2
+    for name in scaling_inputs(1000):
+        print(f"\n[{name}]")
+        for label, fn in (("기존 정규식", _baseline_fallback_parse), ("extract_json", fallback_parse)):
+            previous, row = None, []
+            for size in sizes:
+                text = scaling_inputs(size)[name]
+                took = min(_time_once(fn, text) for _ in range(3))
+                ratio = f" x{took / previous:.1f}" if previous else ""
+                row.append(f"{size // 1000}k={took * 1000:.2f}ms{ratio}")
+                previous = took
+                if took > 2.0:  # 제곱으로 늘어나는 경우 더 큰 크기는 생략
+                    row.append("...")
+                    break
+            print(f"  {label:12} " + "  ".join(row))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-size", type=int, default=64000)
+    args = parser.parse_args()
+
+    for name, fn in cases().items():
+        runs = [t / args.number * 1e6 for t in timeit.repeat(fn, number=args.number, repeat=args.repeat)]
+        print(f"{name:32} min={min(runs):9.2f}µs median={statistics.median(runs):9.2f}µs")
+    scaling(args.max_size)
+
+if __name__ == "__main__":
+    main()
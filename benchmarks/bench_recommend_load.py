@@ -0,0 +1,103 @@
+"""
+/recommend 부하 테스트 (로컬 업스트림 대역 서버 사용, 외부 네트워크/API 키 불필요).
+
+실행: python benchmarks/bench_recommend_load.py [--concurrency 1,8,32] [--requests 64] [--distinct 0] [--scale 0.1]
+                                               [--upstream openai=4000,0.35,0.02 ...] [--target http://host:port]
+- 대역 서버(stand_ins.py)를 띄우고 업스트림 URL 환경변수를 그쪽으로 돌린 뒤, 같은 프로세스에서 앱을 uvicorn으로 띄웁니다.
+- 동시성 단계마다 처리량, p50/p95/p99 지연, 업스트림별 호출/실패 수, 단계별(Server-Timing) 평균/p95를 출력합니다.
+- distinct: 단계마다 서로 다른 주소 수(0이면 요청마다 다른 주소 = 캐시 미스 경로). 작게 주면 캐시 적중 경로를 잽니다.
+- scale: 모든 업스트림 지연 중앙값에 곱하는 값(기본 0.1 -> OpenAI 4초가 0.4초). 출력 지연은 실측값 그대로입니다.
+- target: 이미 떠 있는 서버를 대상으로(업스트림 URL은 대역 서버의 환경변수 출력값으로 직접 맞춰야 함).
+"""
+import argparse, asyncio, os, re, statistics, sys, tempfile, time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import httpx
+from stand_ins import DEFAULT_PROFILES, StandIns, UpstreamProfile, free_port, parse_profile, serve_in_thread
+
+_TIMING_RE = re.compile(r'([\w-]+)(?:;desc="([^"]*)")?;dur=([\d.]+)')
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+async def _drive(base_url: str, level: int, requests: int, distinct: int, date: str) -> dict:
+    semaphore = asyncio.Semaphore(level)
+    latencies, statuses = [], Counter()
+    stages = defaultdict(list)  # "stage/outcome" -> [ms]
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, trust_env=False) as client:
+        async def one(i: int) -> None:
+            body = {"location": f"부하시험로 {level}-{i % distinct if distinct else i}", "date": date, "time": "15:00"}
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    r = await client.post("/recommend", json=body)
+                    statuses[r.status_code] += 1
+                    for stage, outcome, dur in _TIMING_RE.findall(r.headers.get("server-timing", "")):
+                        stages[f"{stage}/{outcome}" if outcome else stage].append(float(dur))
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+    return {"latencies": latencies, "statuses": statuses, "stages": stages, "elapsed": elapsed}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--distinct", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=0.1)
+    parser.add_argument("--upstream", type=parse_profile, action="append", default=[])
+    parser.add_argument("--sample", type=float, default=1.0, help="TRACE_SAMPLE_RATE (단계별 지연 수집 비율)")
+    parser.add_argument("--target", default=None)
+    args = parser.parse_args()
+
+    scaled = {
+        name: UpstreamProfile(p.median_ms * args.scale, p.sigma, p.failure_rate)
+        for name, p in {**DEFAULT_PROFILES, **dict(args.upstream)}.items()
+    }
+    stand_ins = StandIns(scaled).serve_in_thread()
+    if args.target:
+        base_url = args.target.rstrip("/")
+        for key, value in stand_ins.env().items():
+            print(f"{key}={value}")
+    else:
+        # 앱 모듈은 import 시점에 URL/키/샘플링 환경변수를 읽음. 디스크 캐시도 비어 있는 임시 디렉터리로
+        os.environ.update(stand_ins.env())
+        os.environ["TRACE_SAMPLE_RATE"] = str(args.sample)
+        os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_cache_")
+        from python_ai_server.app import app
+        port = free_port()
+        serve_in_thread(app, port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    # 내일 오후: KMA 단기예보 범위 안이라 KMA 경로를 탐(오늘 지난 시각이면 Open-Meteo로 폴백)
+    date = (datetime.now(timezone(timedelta(hours=9))) + timedelta(days=1)).strftime("%Y-%m-%d")
+    print("업스트림 지연(중앙값ms/sigma/실패율): " + ", ".join(f"{n}={p.median_ms:.0f}/{p.sigma}/{p.failure_rate}" for n, p in scaled.items()))
+    for level in (int(c) for c in args.concurrency.split(",")):
+        before = Counter(stand_ins.calls), Counter(stand_ins.failures)
+        run = asyncio.run(_drive(base_url, level, args.requests, args.distinct, date))
+        latencies = run["latencies"]
+        print(
+            f"\nconcurrency={level:<3} requests={args.requests} "
+            f"throughput={args.requests / run['elapsed']:7.2f} req/s "
+            f"p50={_percentile(latencies, 0.50) * 1000:8.1f}ms "
+            f"p95={_percentile(latencies, 0.95) * 1000:8.1f}ms "
+            f"p99={_percentile(latencies, 0.99) * 1000:8.1f}ms "
+            f"status={dict(run['statuses'])}"
+        )
+        calls = stand_ins.calls - before[0]
+        failures = stand_ins.failures - before[1]
+        print("  업스트림 호출: " + ", ".join(f"{name}={calls[name]}(실패 {failures[name]})" for name in scaled))
+        for stage, durations in sorted(run["stages"].items()):
+            print(f"  {stage:28} n={len(durations):4} mean={statistics.mean(durations):8.1f}ms p95={_percentile(durations, 0.95):8.1f}ms")
+    stand_ins.stop()
+
+if __name__ == "__main__":
+    main()
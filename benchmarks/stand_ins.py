@@ -0,0 +1,224 @@
+"""
+부하 테스트용 로컬 업스트림 대역 서버 (VWorld / KMA / Open-Meteo / Google Places / OpenAI chat completions).
+
+업스트림마다 지연 분포(로그정규: 중앙값 ms, sigma)와 실패율을 따로 줄 수 있고, 호출/실패 수를 셉니다.
+python_ai_server는 import하지 않습니다(앱 모듈은 import 시점에 업스트림 URL 환경변수를 읽으므로
+bench_recommend_load.py가 대역 서버를 먼저 띄우고 환경변수를 설정한 뒤 앱을 import 합니다).
+
+단독 실행: python benchmarks/stand_ins.py [--port 8900] [--upstream openai=3000,0.35,0.01 ...]
+"""
+import argparse, asyncio, hashlib, json, random, socket, threading, time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+@dataclass
+class UpstreamProfile:
+    median_ms: float
+    sigma: float = 0.5
+    failure_rate: float = 0.0
+
+    def delay(self, rng: random.Random) -> float:
+        return rng.lognormvariate(0.0, self.sigma) * self.median_ms / 1000.0 if self.median_ms > 0 else 0.0
+
+DEFAULT_PROFILES: Dict[str, UpstreamProfile] = {
+    "vworld": UpstreamProfile(120, 0.5),
+    "kma": UpstreamProfile(250, 0.6),
+    "open_meteo": UpstreamProfile(150, 0.5),
+    "google_places": UpstreamProfile(90, 0.5),
+    "openai": UpstreamProfile(4000, 0.35),
+}
+
+def parse_profile(spec: str) -> tuple:
+    """'openai=3000,0.35,0.01' -> ("openai", UpstreamProfile(3000, 0.35, 0.01)). sigma/실패율은 생략 가능."""
+    name, _, values = spec.partition("=")
+    if name not in DEFAULT_PROFILES or not values:
+        raise argparse.ArgumentTypeError(f"형식: <{'|'.join(DEFAULT_PROFILES)}>=중앙값ms[,sigma[,실패율]]")
+    parts = [float(v) for v in values.split(",")]
+    default = DEFAULT_PROFILES[name]
+    return name, UpstreamProfile(parts[0], parts[1] if len(parts) > 1 else default.sigma, parts[2] if len(parts) > 2 else 0.0)
+
+# ---------- 응답 본문 ----------
+_PLACES = [
+    ("카페 어니언", "카페"), ("하이디라오", "식당"), ("국립중앙박물관", "박물관"), ("서울숲", "공원"),
+    ("서울스카이", "야경"), ("찰스바", "바"), ("코엑스 아쿠아리움", "액티비티"), ("봉은사", "기타"),
+]
+_TIMES = ["오후", "오후", "저녁", "밤"]
+
+def _address_point(address: str) -> tuple:
+    # 주소마다 고정된 남한 내륙 좌표 (서로 다른 주소는 대개 다른 격자/근접 셀로 흩어짐)
+    digest = hashlib.sha1(address.encode("utf-8")).digest()
+    lat = 34.8 + digest[0] / 255 * 2.9 + digest[1] / 255 * 0.01
+    lon = 126.6 + digest[2] / 255 * 2.3 + digest[3] / 255 * 0.01
+    return lat, lon
+
+def course_result(seed: int) -> dict:
+    """스키마/품질 규칙을 통과하는 3코스 결과 (seed마다 장소명이 다름)."""
+    rng = random.Random(seed)
+    courses = []
+    for i in range(3):
+        picks = rng.sample(_PLACES, 4)
+        stops = [
+            {"장소명": f"{name} {seed % 1000}-{i}{j}호점", "설명": "부하 테스트용 설명 문장입니다", "권장체류시간": 60, "권장시간대": _TIMES[j], "카테고리": category}
+            for j, (name, category) in enumerate(picks)
+        ]
+        courses.append({"코스명": f"대역 코스 {seed}-{i}", "총예상소요시간": 60 * len(stops) + 60, "스톱": stops})
+    return {"courses": courses}
+
+def _kma_items(base_date: str, base_time: str, nx: str, ny: str) -> list:
+    start = datetime.strptime(base_date + base_time, "%Y%m%d%H%M") + timedelta(hours=1)
+    items = []
+    for h in range(72):
+        t = start + timedelta(hours=h)
+        for category, value in (("TMP", str(15 + t.hour % 10)), ("SKY", "1"), ("PTY", "0")):
+            items.append({
+                "baseDate": base_date, "baseTime": base_time, "category": category,
+                "fcstDate": t.strftime("%Y%m%d"), "fcstTime": t.strftime("%H00"), "fcstValue": value, "nx": nx, "ny": ny,
+            })
+    return items
+
+def _open_meteo_hourly() -> dict:
+    start = datetime.now().replace(minute=0, second=0, microsecond=0, hour=0)
+    times = [(start + timedelta(hours=h)).strftime("%Y-%m-%dT%H:00") for h in range(7 * 24)]
+    return {"time": times, "temperature_2m": [20.0] * len(times), "weathercode": [0] * len(times)}
+
+# ---------- 서버 ----------
+class StandIns:
+    """
+    업스트림 대역 FastAPI 앱 + 통계. serve_in_thread()로 백그라운드 스레드에서 실행합니다.
+    URL: env()가 앱에 넘길 환경변수(VWORLD_URL 등)를 돌려줍니다.
+    """
+    def __init__(self, profiles: Optional[Dict[str, UpstreamProfile]] = None, seed: int = 7):
+        self.profiles = dict(DEFAULT_PROFILES, **(profiles or {}))
+        self.calls: Counter = Counter()
+        self.failures: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._seq = 0
+        self.port: Optional[int] = None
+        self._server: Optional[uvicorn.Server] = None
+        self.app = self._build_app()
+
+    async def _upstream(self, name: str) -> Optional[JSONResponse]:
+        """지연을 흉내 내고, 실패로 뽑히면 503 응답을 돌려줌(성공이면 None)."""
+        profile = self.profiles[name]
+        self.calls[name] += 1
+        await asyncio.sleep(profile.delay(self._rng))
+        if self._rng.random() < profile.failure_rate:
+            self.failures[name] += 1
+            return JSONResponse({"error": f"{name} stand-in failure"}, status_code=503)
+        return None
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/vworld/req/address")
+        async def vworld(address: str, type: str = "ROAD"):
+            failed = await self._upstream("vworld")
+            if failed:
+                return failed
+            lat, lon = _address_point(address)
+            return {"response": {"status": "OK", "result": {"point": {"x": f"{lon:.6f}", "y": f"{lat:.6f}"}}}}
+
+        @app.get("/kma/getVilageFcst")
+        async def kma(base_date: str, base_time: str, nx: str, ny: str, pageNo: int = 1, numOfRows: int = 1000):
+            failed = await self._upstream("kma")
+            if failed:
+                return failed
+            items = _kma_items(base_date, base_time, nx, ny)
+            page = items[(pageNo - 1) * numOfRows:pageNo * numOfRows]
+            return {"response": {
+                "header": {"resultCode": "00", "resultMsg": "NORMAL_SERVICE"},
+                "body": {"items": {"item": page}, "totalCount": len(items), "pageNo": pageNo, "numOfRows": numOfRows},
+            }}
+
+        @app.get("/open-meteo/v1/forecast")
+        async def open_meteo(latitude: float, longitude: float):
+            failed = await self._upstream("open_meteo")
+            if failed:
+                return failed
+            return {"latitude": latitude, "longitude": longitude, "hourly": _open_meteo_hourly()}
+
+        @app.get("/places/findplacefromtext/json")
+        async def places(input: str):
+            failed = await self._upstream("google_places")
+            if failed:
+                return failed
+            ref = hashlib.sha1(input.encode("utf-8")).hexdigest()[:16]
+            return {"candidates": [{"place_id": ref, "photos": [{"photo_reference": ref}]}], "status": "OK"}
+
+        @app.post("/openai/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            failed = await self._upstream("openai")
+            if failed:
+                return failed
+            self._seq += 1
+            schema = (body.get("response_format") or {}).get("json_schema") or {}
+            result = course_result(self._seq)
+            if schema.get("name") == "course_schema":
+                result = {"course": result["courses"][0]}
+            content = json.dumps(result, ensure_ascii=False)
+            completion_tokens = len(content) // 2
+            return {
+                "id": f"chatcmpl-standin-{self._seq}", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model", "stand-in"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 1500, "completion_tokens": completion_tokens, "total_tokens": 1500 + completion_tokens},
+            }
+
+        return app
+
+    def env(self) -> Dict[str, str]:
+        base = f"http://127.0.0.1:{self.port}"
+        return {
+            "VWORLD_URL": f"{base}/vworld/req/address",
+            "VWORLD_API_KEY": "stand-in",
+            "KMA_URL": f"{base}/kma/getVilageFcst",
+            "KMA_SERVICE_KEY": "stand-in",
+            "OPEN_METEO_URL": f"{base}/open-meteo/v1/forecast",
+            "PLACES_SEARCH_URL": f"{base}/places/findplacefromtext/json",
+            "GOOGLE_MAPS_API_KEY": "stand-in",
+            "OPENAI_BASE_URL": f"{base}/openai/v1",
+            "OPENAI_API_KEY": "stand-in",
+            "NO_PROXY": "127.0.0.1,localhost",
+        }
+
+    def serve_in_thread(self, port: int = 0) -> "StandIns":
+        self.port = port or free_port()
+        self._server = serve_in_thread(self.app, self.port)
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def serve_in_thread(app, port: int) -> uvicorn.Server:
+    """uvicorn을 데몬 스레드(자체 이벤트 루프)에서 띄우고 요청을 받을 수 있을 때까지 기다립니다."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError(f"서버 시작 실패 (port {port})")
+        time.sleep(0.01)
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--upstream", type=parse_profile, action="append", default=[])
+    args = parser.parse_args()
+    stand_ins = StandIns(dict(args.upstream))
+    stand_ins.port = args.port
+    for key, value in stand_ins.env().items():
+        print(f"{key}={value}")
+    uvicorn.run(stand_ins.app, host="127.0.0.1", port=args.port, log_level="warning")
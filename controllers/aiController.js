@@ -24,3 +24,90 @@ export async function getRecommendations(req, res) {
     res.status(500).json({ error: 'AI 추천 서버 오류' });
   }
 }
+
+// 코스가 완성되는 대로 SSE 이벤트(meta/course/photo/done/error)를 그대로 중계
+export async function getRecommendationsStream(req, res) {
+  const { location, date, time } = req.body;
+  const controller = new AbortController();
+  // 클라이언트가 끊기면(응답 종료 포함) 업스트림 요청도 중단
+  res.on('close', () => controller.abort());
+  try {
+    const upstream = await axios.post('http://43.201.86.145:5000/recommend/stream', { location, date, time }, {
+      responseType: 'stream',
+      signal: controller.signal,
+    });
+    res.writeHead(200, {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      Connection: 'keep-alive',
+      'X-Accel-Buffering': 'no',
+    });
+    // 파이썬 서버가 중간에 죽거나 연결이 리셋되면 클라이언트 응답도 닫음(처리 안 된 'error' 이벤트 방지)
+    upstream.data.on('error', () => res.end());
+    upstream.data.pipe(res);
+  } catch (error) {
+    if (controller.signal.aborted) return;
+    res.status(500).json({ error: 'AI 추천 서버 오류' });
+  }
+}
+
+// 여러 (위치, 날짜, 시간) 조합을 한 번에 추천 (배치 작업용). stream=true면 NDJSON을 그대로 중계
+export async function getRecommendationsBatch(req, res) {
+  const { items, stream = false } = req.body;
+  const controller = new AbortController();
+  res.on('close', () => controller.abort());
+  try {
+    const response = await axios.post('http://43.201.86.145:5000/recommend/batch', { items, stream }, {
+      responseType: stream ? 'stream' : 'json',
+      signal: controller.signal,
+    });
+    if (stream) {
+      res.writeHead(200, { 'Content-Type': 'application/x-ndjson', 'Cache-Control': 'no-cache' });
+      response.data.on('error', () => res.end());
+      response.data.pipe(res);
+      return;
+    }
+    res.json(response.data);
+  } catch (error) {
+    if (controller.signal.aborted) return;
+    const status = error.response?.status === 400 ? 400 : 500;
+    res.status(status).json({ error: 'AI 추천 서버 오류' });
+  }
+}
+
+// 작업 모드: 추천을 큐에 넣고 job_id만 바로 받음(202). 생성 중에 연결을 붙잡지 않음. 큐가 가득 차면 429 + Retry-After 중계
+export async function createRecommendationJob(req, res) {
+  const { location, date, time, priority = 'normal' } = req.body;
+  try {
+    const response = await axios.post('http://43.201.86.145:5000/recommend/jobs', { location, date, time, priority });
+    res.status(202).json(response.data);
+  } catch (error) {
+    const status = error.response?.status;
+    if (status === 429) {
+      const retryAfter = error.response.headers['retry-after'];
+      if (retryAfter) res.set('Retry-After', retryAfter);
+      res.status(429).json({ error: '추천 작업이 많습니다. 잠시 후 다시 시도해 주세요.' });
+      return;
+    }
+    res.status(status === 422 ? 400 : 500).json({ error: 'AI 추천 서버 오류' });
+  }
+}
+
+// 작업 상태/결과 조회. wait=초를 주면 끝날 때까지 최대 그만큼 기다림(롱폴링)
+export async function getRecommendationJob(req, res) {
+  const { jobId } = req.params;
+  const wait = Number(req.query.wait) || 0;
+  try {
+    const response = await axios.get(`http://43.201.86.145:5000/recommend/jobs/${encodeURIComponent(jobId)}`, {
+      params: { wait },
+      timeout: (wait + 10) * 1000,
+    });
+    res.json(response.data);
+  } catch (error) {
+    if (error.response?.status === 404) {
+      res.status(404).json({ error: '작업을 찾을 수 없습니다.' });
+      return;
+    }
+    res.status(500).json({ error: 'AI 추천 서버 오류' });
+  }
+}
@@ -1,15 +1,28 @@
 
 
-from fastapi import FastAPI, HTTPException
+import asyncio, json, time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
-from python_ai_server.recommendations.places import get_place_recommendations
+from typing import List, Literal, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from python_ai_server import metrics
+from python_ai_server.forecast_prewarm import POPULAR_CELLS, start_prewarm
+from python_ai_server.cache import flush_caches, start_cache_purge
+from python_ai_server.http_clients import HTTP_CLIENTS
+from python_ai_server.tracing import current_trace, finish_trace, start_trace
+from python_ai_server.recommendations.places import OPENAI_CLIENT, get_place_recommendations_async
+from python_ai_server.recommendations.result_cache import RECOMMEND_CACHE, make_key as make_recommend_key
+from python_ai_server.recommendations.streaming import stream_place_recommendations
+from python_ai_server.recommendations.proximity import NEARBY_RESULTS, reuse_or_generate
+from python_ai_server.recommendations.batch import BATCH_LLM_CONCURRENCY, BATCH_MAX_ITEMS, memoize_async, run_batch
+from python_ai_server.recommendations.jobs import JOB_LONG_POLL_MAX, JOB_QUEUE
 import os
 from dotenv import load_dotenv
 from python_ai_server.geocoding_vworld import geocode_vworld
 from python_ai_server.weather_kma import latlon_to_grid, fetch_vilage_fcst, map_condition, nearest_fcst_time
-from python_ai_server.langchain_logic import get_place_recommendations
 from python_ai_server.weather_provider import fetch_simple_weather
 from python_ai_server.weather_kma import latlon_to_grid, nearest_fcst_time  # 격자/시간만 사용
 
@@ -18,7 +31,31 @@ env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(env_path)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 업스트림별 keep-alive 커넥션 풀을 앱 수명 동안 공유
+    await HTTP_CLIENTS.start()
+    await OPENAI_CLIENT.start()
+    # 인기 격자 셀의 예보를 발표 직후 미리 받아 두는 스케줄러 (PREWARM_ENABLED=0이면 끔)
+    prewarm = start_prewarm()
+    # /recommend/jobs 작업 큐 워커 (JOB_WORKERS개)
+    JOB_QUEUE.start(lambda body: recommend_one(body))
+    # 만료된 SQLite 캐시 행 정리 (CACHE_PURGE_INTERVAL초마다, 0이면 끔)
+    purge = start_cache_purge()
+    try:
+        yield
+    finally:
+        await JOB_QUEUE.stop()
+        for task in (prewarm, purge):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        await OPENAI_CLIENT.aclose()
+        await HTTP_CLIENTS.aclose()
+        # SQLite 캐시 쓰기 대기열(write-behind)을 비우고 종료
+        await asyncio.to_thread(flush_caches)
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS 허용
 app.add_middleware(
@@ -29,24 +66,78 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+@app.middleware("http")
+async def trace_recommend(request: Request, call_next):
+    """
+    /recommend* 요청의 단계별 소요시간을 TRACE_SAMPLE_RATE 비율로 측정해 Server-Timing 헤더로 돌려줌.
+    X-Debug-Timing: 1 헤더를 보내면 항상 측정하고 /recommend 응답에 _timing 필드도 추가.
+    스트리밍 응답(SSE/NDJSON)은 헤더가 나갈 때 생성이 아직 안 끝났으므로 헤더 대신 스트림이 끝날 때 기록하고,
+    SSE + 디버그면 마지막에 timing 이벤트로 보냄.
+    """
+    if not request.url.path.startswith("/recommend"):
+        return await call_next(request)
+    trace = start_trace(debug=request.headers.get("x-debug-timing") == "1")
+    response = await call_next(request)
+    if trace is None:
+        return response
+    media_type = response.headers.get("content-type", "").split(";")[0]
+    if media_type in _STREAMING_TYPES:
+        response.body_iterator = _finish_trace_after(response.body_iterator, trace, request.url.path, media_type == "text/event-stream")
+        return response
+    finish_trace(trace, request.url.path)
+    response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+async def _finish_trace_after(body, trace, route: str, sse: bool):
+    try:
+        async for chunk in body:
+            yield chunk
+        if sse and trace.debug:
+            yield _sse("timing", trace.breakdown()).encode("utf-8")
+    finally:
+        finish_trace(trace, route)
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 class RecommendRequest(BaseModel):
     location: str
     date: str
     time: str
 
-@app.post("/recommend")
-async def recommend(body: RecommendRequest):
+class RecommendJobRequest(RecommendRequest):
+    priority: Literal["high", "normal", "low"] = "normal"
+
+class BatchRecommendRequest(BaseModel):
+    items: List[RecommendRequest]
+    stream: bool = False  # True면 끝나는 순서대로 NDJSON 한 줄씩
+
+@dataclass
+class RecommendContext:
+    lat: float
+    lon: float
+    nx: int
+    ny: int
+    condition: str
+    weather_text: str
+
+async def prepare_context(body: RecommendRequest, geocode=geocode_vworld, weather=fetch_simple_weather) -> RecommendContext:
+    """요청 -> 좌표/격자/날씨 상태/날씨 텍스트. 지오코딩/날씨는 각 모듈의 캐시와 single-flight를 거칩니다."""
     # 1) 주소 → VWorld
-    lat, lon = await geocode_vworld(body.location)
+    lat, lon = await geocode(body.location)
 
-    # 2) 격자 변환(지금은 Open-Meteo만 쓰더라도 lat/lon은 어차피 있음)
+    # 2) 격자 변환 (셀 인기도는 예보 미리 받기 스케줄러가 사용)
     nx, ny = latlon_to_grid(lat, lon)
+    POPULAR_CELLS.record(nx, ny, lat, lon)
 
     yyyymmdd = body.date.replace("-", "")
     fcst_time = nearest_fcst_time(body.time)
 
-    # 3) 날씨(우선 Open-Meteo 폴백으로 확보)
-    wx = await fetch_simple_weather(lat, lon, yyyymmdd, fcst_time)
+    # 3) 날씨 (KMA 우선, 실패 시 Open-Meteo 폴백)
+    wx = await weather(lat, lon, yyyymmdd, fcst_time)
     temperature_c = None
     tmp_value = wx.get("TMP")
 
@@ -67,7 +158,123 @@ async def recommend(body: RecommendRequest):
         weather_text = f"{temperature_c:.0f}°C"
     else:
         weather_text = "날씨 정보 없음"
+    return RecommendContext(lat, lon, nx, ny, condition, weather_text)
+
+async def recommend_one(body: RecommendRequest, context=None, llm_slots: Optional[asyncio.Semaphore] = None) -> dict:
+    ctx = await (context or prepare_context(body))
+    weather_text = ctx.weather_text
+
+    # 5) 추천 호출 (비동기: 생성 중에도 이벤트 루프를 막지 않음)
+    #    같은 격자/날짜/시간대/날씨 상태면 캐시된 결과를 재사용 (오래된 항목은 반환 후 백그라운드 갱신)
+    #    정확 키가 없으면 반경 안의 최근 결과를 재사용하고, 그것도 없을 때만 생성
+    async def generate():
+        usage: dict = {}
+        # 배치에서는 OpenAI 동시 호출 수 제한(llm_slots는 completion 호출 동안만 잡힘)
+        generated = await get_place_recommendations_async(body.location, body.date, body.time, weather_text=weather_text, usage=usage, coords=(ctx.lat, ctx.lon), llm_slots=llm_slots)  # Ensure weather_text is always passed
+        return generated, usage.get("total_tokens", 0), time.time()
+
+    async def reuse_or_generate_nearby():
+        return await reuse_or_generate(NEARBY_RESULTS, ctx.lat, ctx.lon, body.date, body.time, ctx.condition, generate)
+
+    cache_key = make_recommend_key(ctx.nx, ctx.ny, body.date, body.time, ctx.condition)
+    result = await RECOMMEND_CACHE.get_or_generate(cache_key, reuse_or_generate_nearby)
+    result["weather_text"] = weather_text
+    return result
 
-    # 5) 추천 호출
-    result = get_place_recommendations(body.location, body.date, body.time, weather_text=weather_text)  # Ensure weather_text is always passed
+@app.post("/recommend")
+async def recommend(body: RecommendRequest):
+    result = await recommend_one(body)
+    trace = current_trace()
+    if trace is not None and trace.debug:
+        result["_timing"] = trace.breakdown()
     return JSONResponse(content=result)
+
+@app.post("/recommend/jobs", status_code=202)
+async def create_recommend_job(body: RecommendJobRequest):
+    """
+    /recommend를 작업 큐에 넣고 job_id를 바로 돌려줍니다(202). 결과는 GET /recommend/jobs/{job_id}로 조회.
+    큐가 가득 차면 429 + Retry-After. priority: high > normal > low 순서로 처리(low는 큐가 절반 차면 거절).
+    """
+    request = RecommendRequest(location=body.location, date=body.date, time=body.time)
+    job = JOB_QUEUE.submit(request, body.priority)
+    return JSONResponse(status_code=202, content=JOB_QUEUE.view(job), headers={"Location": f"/recommend/jobs/{job.id}"})
+
+@app.get("/recommend/jobs/{job_id}")
+async def get_recommend_job(job_id: str, wait: float = 0):
+    """
+    작업 상태: queued(position 포함) | running | done(result 포함) | failed(error 포함).
+    wait=초를 주면 끝날 때까지 최대 그만큼(JOB_LONG_POLL_MAX 상한) 기다렸다가 응답합니다(롱폴링).
+    없거나 결과 보관 시간(JOB_RESULT_TTL)이 지난 작업은 404.
+    """
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다(만료되었거나 없는 ID).")
+    await JOB_QUEUE.wait(job, min(max(wait, 0.0), JOB_LONG_POLL_MAX))
+    return JSONResponse(content=JOB_QUEUE.view(job))
+
+@app.post("/recommend/batch")
+async def recommend_batch(body: BatchRecommendRequest):
+    """
+    여러 RecommendRequest를 한 번에 처리합니다.
+    같은 주소의 지오코딩, 같은 좌표/날짜/예보시각의 날씨는 배치 안에서 한 번만 호출하고,
+    항목은 BATCH_CONCURRENCY개씩, OpenAI 호출은 BATCH_LLM_CONCURRENCY개까지만 동시에 실행합니다(같은 캐시 키는 생성 하나를 공유).
+    stream=false: {"results": [...]} (입력 순서), stream=true: 끝나는 순서대로 NDJSON.
+    """
+    if len(body.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"배치 항목은 최대 {BATCH_MAX_ITEMS}개입니다.")
+    geocode = memoize_async(geocode_vworld)
+    weather = memoize_async(fetch_simple_weather)
+    llm_slots = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+    async def handle(item: RecommendRequest) -> dict:
+        return await recommend_one(item, prepare_context(item, geocode, weather), llm_slots)
+
+    if body.stream:
+        async def lines():
+            async for _, entry in run_batch(body.items, handle):
+                yield json.dumps(entry, ensure_ascii=False) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    results: list = [None] * len(body.items)
+    async for index, entry in run_batch(body.items, handle):
+        results[index] = entry
+    return JSONResponse(content={"results": results})
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/recommend/stream")
+async def recommend_stream(body: RecommendRequest):
+    """
+    /recommend의 SSE 버전. 이벤트: meta -> course(코스 완성 즉시) -> photo(사진 패치) -> done | error
+    캐시에 결과가 있으면 모든 코스를 바로 내보냅니다.
+    """
+    ctx = await prepare_context(body)
+    weather_text = ctx.weather_text
+    cache_key = make_recommend_key(ctx.nx, ctx.ny, body.date, body.time, ctx.condition)
+    cached = RECOMMEND_CACHE.peek(cache_key)
+    if cached is None:
+        nearby = NEARBY_RESULTS.find(ctx.lat, ctx.lon, body.date, body.time, ctx.condition)
+        cached = nearby[0] if nearby is not None else None
+
+    async def events():
+        yield _sse("meta", {"weather_text": weather_text, "cached": cached is not None})
+        if cached is not None:
+            for index, course in enumerate(cached["courses"]):
+                yield _sse("course", {"index": index, "course": course})
+            yield _sse("done", {"courses": len(cached["courses"]), "complete": True, "rejected": 0})
+            return
+        usage: dict = {}
+
+        def on_stream_result(result: dict, tokens: int) -> None:
+            RECOMMEND_CACHE.store(cache_key, result, tokens)
+            NEARBY_RESULTS.add(ctx.lat, ctx.lon, body.date, body.time, ctx.condition, result, tokens)
+
+        stream = stream_place_recommendations(
+            body.location, body.date, body.time, weather_text=weather_text, usage=usage, coords=(ctx.lat, ctx.lon),
+            on_result=lambda result: on_stream_result(result, usage.get("total_tokens", 0)),
+        )
+        async for event, data in stream:
+            yield _sse(event, data)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
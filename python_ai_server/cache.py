@@ -0,0 +1,274 @@
+# cache.py
+# 메모리 LRU + SQLite 영속 저장소 2단 캐시 (사진/지오코딩 등 외부 API 결과 재사용)
+import asyncio, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from python_ai_server import metrics
+
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache"))
+CACHE_DISK_MAX_ROWS = int(os.getenv("CACHE_DISK_MAX_ROWS", "100000"))       # 캐시(namespace)별 SQLite 행 수 상한, 넘으면 만료가 가장 이른 행부터 삭제
+CACHE_PURGE_INTERVAL = float(os.getenv("CACHE_PURGE_INTERVAL", "3600"))    # 초, 만료된 SQLite 행을 지우는 주기
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    항목별 만료시각을 갖는 메모리 LRU. maxsize를 넘으면 가장 오래 안 쓴 항목부터 제거.
+    """
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set_until(self, key: str, value: Any, expires_at: float) -> None:
+        self.set(key, value, expires_at - time.time())
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class SqliteStore:
+    """
+    (namespace, key) -> JSON 값 + 만료시각. 프로세스 재시작 후에도 유지됩니다.
+    연결은 첫 사용 시점에 엽니다(import만으로 파일을 만들지 않도록).
+    set()은 쓰기 대기열에만 넣고 바로 반환(write-behind): 백그라운드 스레드가 모아서 한 트랜잭션으로 commit.
+    아직 안 쓴 값도 get()에서 보이고, flush()/close()는 대기열이 빌 때까지 기다립니다.
+    쓰기 묶음마다 행 수가 max_rows를 넘으면 만료가 가장 이른 행부터 지웁니다(만료 행 정리는 purge_expired).
+    """
+    def __init__(self, path: str, namespace: str, max_rows: int = CACHE_DISK_MAX_ROWS):
+        self.path = path
+        self.namespace = namespace
+        self.max_rows = max_rows
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[Any, float]] = {}  # 쓰기 대기 중인 값 (키당 마지막 값만)
+        self._cond = threading.Condition()
+        self._writer: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS kv_expires ON kv (namespace, expires_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Tuple[Any, float]:
+        """반환: (값, 만료시각). 없거나 만료면 (_MISSING, 0). 디스크를 읽으므로 이벤트 루프에서는 to_thread로."""
+        with self._cond:
+            pending = self._pending.get(key)
+        if pending is not None:
+            value, expires_at = pending
+        else:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT value, expires_at FROM kv WHERE namespace=? AND key=?",
+                    (self.namespace, key),
+                ).fetchone()
+            if row is None:
+                return _MISSING, 0.0
+            value, expires_at = json.loads(row[0]), row[1]
+        if expires_at <= time.time():
+            return _MISSING, 0.0
+        return value, expires_at
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        with self._cond:
+            self._pending[key] = (value, expires_at)
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name=f"cache-writer-{self.namespace}", daemon=True)
+                self._writer.start()
+            self._cond.notify_all()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch = dict(self._pending)
+            try:
+                with self._lock:
+                    conn = self._connect()
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                        [(self.namespace, key, json.dumps(value, ensure_ascii=False), expires_at) for key, (value, expires_at) in batch.items()],
+                    )
+                    self._evict_over_limit(conn)
+                    conn.commit()
+            except Exception as e:
+                print(f"[캐시 저장 실패] {self.namespace}: {e}")
+            with self._cond:
+                for key, item in batch.items():
+                    if self._pending.get(key) is item:  # 쓰는 동안 새 값이 들어왔으면 남겨 둠
+                        del self._pending[key]
+                self._cond.notify_all()
+
+    def _evict_over_limit(self, conn: sqlite3.Connection) -> None:
+        (rows,) = conn.execute("SELECT COUNT(*) FROM kv WHERE namespace=?", (self.namespace,)).fetchone()
+        if rows > self.max_rows:
+            conn.execute(
+                "DELETE FROM kv WHERE namespace=? AND key IN"
+                " (SELECT key FROM kv WHERE namespace=? ORDER BY expires_at LIMIT ?)",
+                (self.namespace, self.namespace, rows - self.max_rows),
+            )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """쓰기 대기열이 빌 때까지 기다림. 시간 안에 비었으면 True."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def purge_expired(self) -> int:
+        """만료된 행을 지우고 지운 행 수를 돌려줌. 디스크를 쓰므로 이벤트 루프에서는 to_thread로."""
+        self.flush()
+        with self._lock:
+            conn = self._connect()
+            cur = conn.execute(
+                "DELETE FROM kv WHERE namespace=? AND expires_at<=?", (self.namespace, time.time())
+            )
+            conn.commit()
+            return cur.rowcount
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# 이름 -> 캐시 (지표 수집용, 같은 이름이면 마지막 인스턴스)
+CACHES: Dict[str, "TieredCache"] = {}
+
+def _collect_cache_events() -> Dict[Tuple[str, ...], float]:
+    return {(name, event): count for name, cache in CACHES.items() for event, count in cache.stats.items()}
+
+metrics.counter("cache_events_total", "캐시 적중/미스/저장 수", ("cache", "event"), fn=_collect_cache_events)
+
+class TieredCache:
+    """
+    메모리 LRU(1차) + SQLite(2차). 값이 None이면 '결과 없음'으로 보고 negative_ttl을 적용합니다.
+    path=None이면 메모리 전용.
+    """
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 86400, negative_ttl: float = 3600, path: Optional[str] = os.path.join(CACHE_DIR, "cache.sqlite3")):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory = LRUCache(maxsize)
+        self.store = SqliteStore(path, name) if path else None
+        self.stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "negative_hits": 0, "misses": 0, "sets": 0}
+        self._stats_lock = threading.Lock()  # get()/set()은 to_thread 워커에서도 불릴 수 있음
+        CACHES[name] = self
+
+    def get(self, key: str) -> Any:
+        """
+        반환: 캐시된 값(None이면 negative 캐시 적중). 캐시에 없으면 _MISSING.
+        메모리에 없으면 SQLite를 읽으므로 async 코드에서는 aget()을 씁니다.
+        """
+        value = self.memory.get(key, _MISSING)
+        from_disk = False
+        if value is _MISSING and self.store is not None:
+            value = self._load(key)
+            from_disk = value is not _MISSING
+        return self._count(value, from_disk)
+
+    async def aget(self, key: str) -> Any:
+        """get()의 비동기 버전: 메모리 적중은 바로, SQLite 조회만 스레드에서 (이벤트 루프를 막지 않음)."""
+        value = self.memory.get(key, _MISSING)
+        from_disk = False
+        if value is _MISSING and self.store is not None:
+            value = await asyncio.to_thread(self._load, key)
+            from_disk = value is not _MISSING
+        return self._count(value, from_disk)
+
+    def _load(self, key: str) -> Any:
+        # 스레드에서 실행될 수 있으므로 통계는 여기서 세지 않고 호출 측(_count)에서
+        value, expires_at = self.store.get(key)
+        if value is not _MISSING:
+            self.memory.set_until(key, value, expires_at)
+        return value
+
+    def _count(self, value: Any, from_disk: bool = False) -> Any:
+        with self._stats_lock:
+            if value is _MISSING:
+                self.stats["misses"] += 1
+                return _MISSING
+            self.stats["hits"] += 1
+            if from_disk:
+                self.stats["disk_hits"] += 1
+            if value is None:
+                self.stats["negative_hits"] += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """메모리에 바로 저장, SQLite에는 write-behind(호출 측은 디스크를 기다리지 않음)."""
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        expires_at = time.time() + ttl
+        self.memory.set_until(key, value, expires_at)
+        if self.store is not None:
+            self.store.set(key, value, expires_at)
+        with self._stats_lock:
+            self.stats["sets"] += 1
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+def is_missing(value: Any) -> bool:
+    return value is _MISSING
+
+def flush_caches(timeout: Optional[float] = 5.0) -> None:
+    """모든 캐시의 SQLite 쓰기 대기열을 비움(앱 종료 시)."""
+    for cache in list(CACHES.values()):
+        if cache.store is not None:
+            cache.store.flush(timeout)
+
+def purge_caches() -> int:
+    """모든 캐시의 만료된 SQLite 행을 지우고 지운 행 수 합계를 돌려줌."""
+    return sum(cache.store.purge_expired() for cache in list(CACHES.values()) if cache.store is not None)
+
+async def run_cache_purge(interval: float = CACHE_PURGE_INTERVAL) -> None:
+    # 시작 직후 한 번, 이후 interval마다. 디스크 작업은 스레드에서
+    while True:
+        try:
+            purged = await asyncio.to_thread(purge_caches)
+            if purged:
+                print(f"[캐시 정리] 만료된 행 {purged}개 삭제")
+        except Exception as e:
+            print(f"[캐시 정리 실패] {e}")
+        await asyncio.sleep(interval)
+
+def start_cache_purge() -> Optional[asyncio.Task]:
+    return asyncio.create_task(run_cache_purge()) if CACHE_PURGE_INTERVAL > 0 else None
@@ -0,0 +1,118 @@
+# forecast_prewarm.py
+# 예보 미리 받기 스케줄러: 요청이 많은 격자 셀의 예보를 새 발표분이 나온 직후 백그라운드로 받아 둠
+# - 셀 인기도: /recommend 계열 요청의 latlon_to_grid 결과를 셈(갱신 주기마다 감쇠해 최근 요청 위주)
+# - KMA가 기본 프로바이더면 발표 시각(BASE_TIMES + KMA_PUBLISH_DELAY) 직후, 아니면 Open-Meteo 갱신 주기 직후
+# - 실행 시각에 0~PREWARM_JITTER초 지터, 동시에 PREWARM_CONCURRENCY개까지만 업스트림 호출
+# - FastAPI lifespan에서 start_prewarm()으로 시작하고, 종료 시 작업을 취소
+import asyncio, heapq, os, random, time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from python_ai_server import metrics, weather_kma, weather_provider
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_TOP_CELLS = int(os.getenv("PREWARM_TOP_CELLS", "50"))       # 주기마다 미리 받을 셀 수
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "4"))    # 동시에 갱신할 셀 수
+PREWARM_JITTER = float(os.getenv("PREWARM_JITTER", "30"))           # 초, 인스턴스끼리 같은 순간에 몰리지 않게
+PREWARM_DECAY = float(os.getenv("PREWARM_DECAY", "0.8"))            # 주기마다 요청 수에 곱하는 값
+PREWARM_MAX_TRACKED = int(os.getenv("PREWARM_MAX_TRACKED", "5000"))
+
+Cell = Tuple[int, int]
+
+RUNS = metrics.counter("forecast_prewarm_runs_total", "예보 미리 받기 실행 횟수")
+REFRESHES = metrics.counter("forecast_prewarm_refresh_total", "예보 미리 받기 셀 갱신 결과", ("provider", "result"))
+LAG_SECONDS = metrics.histogram(
+    "forecast_prewarm_lag_seconds", "예정 시각(발표분 조회 가능 시각)부터 인기 셀 갱신 완료까지 걸린 시간",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600),
+)
+
+class PopularCells:
+    """격자 셀별 (감쇠) 요청 수와 대표 좌표(Open-Meteo 조회용, 마지막 요청 좌표)."""
+    def __init__(self, max_tracked: int = PREWARM_MAX_TRACKED):
+        self.max_tracked = max_tracked
+        self._scores: Dict[Cell, float] = {}
+        self._points: Dict[Cell, Tuple[float, float]] = {}
+
+    def record(self, nx: int, ny: int, lat: float, lon: float) -> None:
+        cell = (nx, ny)
+        self._scores[cell] = self._scores.get(cell, 0.0) + 1.0
+        self._points[cell] = (lat, lon)
+        if len(self._scores) > self.max_tracked:
+            # 넘치면 하위 10%를 한 번에 정리(요청마다 정리하지 않도록)
+            for drop in heapq.nsmallest(max(1, self.max_tracked // 10), self._scores, key=self._scores.get):
+                self._scores.pop(drop, None)
+                self._points.pop(drop, None)
+
+    def top(self, n: int) -> List[Tuple[Cell, Tuple[float, float]]]:
+        return [(cell, self._points[cell]) for cell in heapq.nlargest(n, self._scores, key=self._scores.get)]
+
+    def decay(self, factor: float = PREWARM_DECAY) -> None:
+        for cell in list(self._scores):
+            score = self._scores[cell] * factor
+            if score < 0.05:
+                del self._scores[cell]
+                del self._points[cell]
+            else:
+                self._scores[cell] = score
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+POPULAR_CELLS = PopularCells()
+metrics.gauge("forecast_prewarm_tracked_cells", "인기도를 추적 중인 격자 셀 수", fn=lambda: {(): len(POPULAR_CELLS)})
+
+def _uses_kma() -> bool:
+    return weather_provider.WEATHER_PRIMARY == "kma" and bool(weather_kma.KMA_SERVICE_KEY)
+
+def next_run_at(now: float) -> float:
+    """다음 갱신 예정 시각(epoch초, 지터 제외): 다음 KMA 발표분 조회 가능 시각 또는 다음 Open-Meteo 갱신 시각."""
+    if _uses_kma():
+        base_date, base_time = weather_kma.latest_base_date_time(datetime.fromtimestamp(now, weather_kma.KST))
+        return weather_kma.next_publish_at(base_date, base_time).timestamp()
+    return weather_provider._next_update_at(now)
+
+async def refresh_cell(cell: Cell, point: Tuple[float, float]) -> str:
+    """셀 하나의 최신 예보를 캐시에 채움. 사용한 프로바이더 이름을 반환."""
+    if _uses_kma():
+        # 발표분을 명시해 직전 발표분(stale) 대신 새 발표분을 실제로 받아 옴
+        base_date, base_time = weather_kma.latest_base_date_time()
+        await weather_kma.get_forecast_index(*cell, base_date, base_time)
+        return "kma"
+    await weather_provider.get_cell_forecast(*point)
+    return "open_meteo"
+
+async def prewarm_once(cells: PopularCells = POPULAR_CELLS, scheduled_at: Optional[float] = None, top: Optional[int] = None) -> Dict[str, int]:
+    """인기 셀 상위 top개를 동시성 제한 안에서 갱신. {"ok": n, "error": n}"""
+    semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+    counts = {"ok": 0, "error": 0}
+
+    async def one(cell: Cell, point: Tuple[float, float]) -> None:
+        async with semaphore:
+            provider = "kma" if _uses_kma() else "open_meteo"
+            try:
+                provider = await refresh_cell(cell, point)
+                counts["ok"] += 1
+                REFRESHES.inc(provider, "ok")
+            except Exception as e:
+                counts["error"] += 1
+                REFRESHES.inc(provider, "error")
+                print(f"[예보 미리 받기 실패] {cell}: {e}")
+
+    await asyncio.gather(*(one(cell, point) for cell, point in cells.top(top or PREWARM_TOP_CELLS)))
+    RUNS.inc()
+    if scheduled_at is not None:
+        LAG_SECONDS.observe(max(0.0, time.time() - scheduled_at))
+    cells.decay()
+    return counts
+
+async def run_scheduler(cells: PopularCells = POPULAR_CELLS) -> None:
+    while True:
+        due = next_run_at(time.time())
+        await asyncio.sleep(max(0.0, due - time.time()) + random.uniform(0, PREWARM_JITTER))
+        try:
+            counts = await prewarm_once(cells, scheduled_at=due)
+            print(f"[예보 미리 받기] 셀 {counts['ok']}개 갱신, 실패 {counts['error']}개")
+        except Exception as e:
+            print(f"[예보 미리 받기 실행 실패] {e}")
+
+def start_prewarm() -> Optional[asyncio.Task]:
+    return asyncio.create_task(run_scheduler()) if PREWARM_ENABLED else None
@@ -1,13 +1,67 @@
 # geocoding_vworld.py
-import os, httpx
+import asyncio, os, re, unicodedata
+from typing import Optional
 from fastapi import HTTPException
 from dotenv import load_dotenv, find_dotenv
+from python_ai_server.cache import TieredCache, is_missing
+from python_ai_server.http_clients import upstream_client
+from python_ai_server.resilience import PROVIDERS
+from python_ai_server.singleflight import SingleFlight
+from python_ai_server.tracing import stage
 
 # app.py에서 이미 로드한다면 생략 가능
 load_dotenv(find_dotenv())
 
 VWORLD_KEY = os.getenv("VWORLD_API_KEY")
-VWORLD_URL = "https://api.vworld.kr/req/address"
+VWORLD_URL = os.getenv("VWORLD_URL", "https://api.vworld.kr/req/address")
+
+# 지오코딩 캐시: 정규화 주소 -> {"lat", "lon", "type"} / 결과 없음(None)은 짧게만 보관
+GEOCODE_CACHE = TieredCache(
+    "geocode",
+    maxsize=int(os.getenv("GEOCODE_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("GEOCODE_CACHE_TTL", str(30 * 86400))),
+    negative_ttl=float(os.getenv("GEOCODE_CACHE_NEGATIVE_TTL", "600")),
+)
+# 캐시 항목이 만료돼도 어떤 주소 유형(ROAD/PARCEL)이 맞았는지는 더 오래 기억
+GEOCODE_TYPE_HINTS = TieredCache("geocode_type", maxsize=4096, ttl=180 * 86400)
+
+# 헤지 모드: ROAD 응답을 기다리는 동안 PARCEL도 병렬로 요청
+GEOCODE_HEDGE = os.getenv("GEOCODE_HEDGE", "1") == "1"
+GEOCODE_HEDGE_DELAY = float(os.getenv("GEOCODE_HEDGE_DELAY", "0.2"))     # 초, 0이면 즉시 병렬
+GEOCODE_PREFER_WINDOW = float(os.getenv("GEOCODE_PREFER_WINDOW", "0.15"))  # 초, 이 안에 우선 유형도 오면 그쪽 사용
+
+# 같은 (정규화) 주소로 동시에 들어온 조회는 VWorld 호출 하나를 공유
+_geocode_flight = SingleFlight("geocode")
+
+# 시/도 표기 변형 -> 대표 표기 (첫 토큰에만 적용)
+_REGION_ALIASES = {
+    "서울특별시": "서울", "서울시": "서울",
+    "부산광역시": "부산", "부산시": "부산",
+    "대구광역시": "대구", "대구시": "대구",
+    "인천광역시": "인천", "인천시": "인천",
+    "광주광역시": "광주", "광주시": "광주",
+    "대전광역시": "대전", "대전시": "대전",
+    "울산광역시": "울산", "울산시": "울산",
+    "세종특별자치시": "세종", "세종시": "세종",
+    "경기도": "경기",
+    "강원도": "강원", "강원특별자치도": "강원",
+    "충청북도": "충북", "충청남도": "충남",
+    "전라북도": "전북", "전북특별자치도": "전북", "전라남도": "전남",
+    "경상북도": "경북", "경상남도": "경남",
+    "제주도": "제주", "제주특별자치도": "제주",
+}
+_PUNCT_RE = re.compile(r"[^\w\s-]")
+
+def normalize_address(address: str) -> str:
+    """
+    캐시 키용 주소 정규화: NFKC, 구두점 제거, 공백 축약, 시/도 표기 통일.
+    예) '서울특별시  강남구, 역삼동' -> '서울 강남구 역삼동'
+    """
+    text = unicodedata.normalize("NFKC", address).lower()
+    tokens = _PUNCT_RE.sub(" ", text).split()
+    if tokens:
+        tokens[0] = _REGION_ALIASES.get(tokens[0], tokens[0])
+    return " ".join(tokens)
 
 async def _call_vworld(address: str, addr_type: str) -> tuple[float, float]:
     params = {
@@ -22,26 +76,147 @@ async def _call_vworld(address: str, addr_type: str) -> tuple[float, float]:
         "simple": "false",
         "key": VWORLD_KEY,
     }
-    async with httpx.AsyncClient(timeout=10) as c:
-        r = await c.get(VWORLD_URL, params=params)
-    if r.status_code != 200:
-        raise HTTPException(r.status_code, f"VWorld error: {r.text}")
-    data = r.json()
+    # 브레이커가 열려 있으면 503으로 바로 실패(캐시된 주소는 이 함수까지 오지 않음)
+    with PROVIDERS["vworld"].guard() as timeout:
+        async with upstream_client("vworld") as c:
+            r = await c.get(VWORLD_URL, params=params, timeout=timeout)
+        if r.status_code != 200:
+            raise HTTPException(r.status_code, f"VWorld error: {r.text}")
+        return _point_from_response(r.json(), address, addr_type)
+
+def _point_from_response(data: dict, address: str, addr_type: str) -> tuple[float, float]:
+    """
+    VWorld 응답 -> (lat, lon). status NOT_FOUND만 404(결과 없음 -> negative 캐시).
+    ERROR(INVALID_KEY, 호출 한도 초과 등은 HTTP 200으로 옴)나 형식이 깨진 응답은 502: 캐시하지 않고 브레이커가 셈.
+    """
+    response = data.get("response") if isinstance(data, dict) else None
+    status = response.get("status") if isinstance(response, dict) else None
+    if status == "NOT_FOUND":
+        raise HTTPException(404, f"VWorld 결과 없음({addr_type}): {address}")
+    if status != "OK":
+        error = response.get("error") if isinstance(response, dict) else None
+        raise HTTPException(502, f"VWorld 오류({addr_type}): {status} {error or ''}".strip())
     try:
-        p = data["response"]["result"]["point"]  # x=lon, y=lat
+        p = response["result"]["point"]  # x=lon, y=lat
         lon, lat = float(p["x"]), float(p["y"])
         return lat, lon
-    except Exception:
-        raise HTTPException(404, f"VWorld 결과 없음({addr_type}): {address}")
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(502, f"VWorld 응답 형식 오류({addr_type}): {address}")
+
+def _both_failed(first: BaseException, second: BaseException) -> BaseException:
+    """
+    두 유형이 모두 실패했을 때 올릴 예외. 둘 다 404(결과 없음)일 때만 404 -> negative 캐시.
+    한쪽이라도 일시 오류(5xx 등)면 그 오류를 올려, 잠깐의 장애로 '결과 없음'이 캐시되지 않게 합니다.
+    """
+    for e in (first, second):
+        if not (isinstance(e, HTTPException) and e.status_code == 404):
+            return e
+    return second
+
+async def _call_fallback(address: str, addr_type: str, first_error: BaseException) -> tuple[float, float]:
+    try:
+        return await _call_vworld(address, addr_type)
+    except Exception as e:
+        raise _both_failed(first_error, e)
+
+async def _geocode_sequential(address: str, addr_types: list[str]) -> tuple[float, float, str]:
+    try:
+        lat, lon = await _call_vworld(address, addr_types[0])
+        return lat, lon, addr_types[0]
+    except HTTPException as e:
+        lat, lon = await _call_fallback(address, addr_types[1], e)
+        return lat, lon, addr_types[1]
+
+async def _cancel(task: asyncio.Task) -> None:
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+async def _geocode_hedged(address: str, addr_types: list[str], hedge_delay: float, prefer_window: float) -> tuple[float, float, str]:
+    """
+    addr_types[0](우선 유형)을 먼저 보내고, hedge_delay 안에 성공하지 못하면 addr_types[1]도 병렬로 보냅니다.
+    먼저 성공한 쪽이 이기지만, 차순위가 먼저 오면 prefer_window 동안 우선 유형을 더 기다립니다.
+    진 쪽 요청은 취소합니다. 둘 다 실패하면 순차 모드와 같은 예외를 올립니다(_both_failed).
+    """
+    preferred, other = addr_types
+    preferred_task = asyncio.create_task(_call_vworld(address, preferred))
+    other_task: Optional[asyncio.Task] = None
+    try:
+        try:
+            lat, lon = await asyncio.wait_for(asyncio.shield(preferred_task), timeout=hedge_delay)
+            return lat, lon, preferred
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            lat, lon = await _call_fallback(address, other, e)
+            return lat, lon, other
+
+        other_task = asyncio.create_task(_call_vworld(address, other))
+        done, _ = await asyncio.wait({preferred_task, other_task}, return_when=asyncio.FIRST_COMPLETED)
+        if preferred_task in done and preferred_task.exception() is None:
+            lat, lon = preferred_task.result()
+            return lat, lon, preferred
+        if other_task in done and other_task.exception() is None:
+            if not preferred_task.done():
+                await asyncio.wait({preferred_task}, timeout=prefer_window)
+            if preferred_task.done() and not preferred_task.cancelled() and preferred_task.exception() is None:
+                lat, lon = preferred_task.result()
+                return lat, lon, preferred
+            lat, lon = other_task.result()
+            return lat, lon, other
+        # 먼저 끝난 쪽이 실패 -> 남은 쪽 결과를 따르고, 그쪽도 실패하면 두 오류를 함께 판단
+        if not preferred_task.done():
+            try:
+                lat, lon = await preferred_task
+            except Exception as e:
+                raise _both_failed(other_task.exception(), e)
+            return lat, lon, preferred
+        try:
+            lat, lon = await other_task
+        except Exception as e:
+            raise _both_failed(preferred_task.exception(), e)
+        return lat, lon, other
+    finally:
+        # 진 쪽 요청과, 호출 측이 취소된 경우(첫 대기 중 포함) 남은 요청을 모두 정리
+        for task in (preferred_task, other_task):
+            if task is not None and not task.done():
+                await _cancel(task)
 
-async def geocode_vworld(address: str) -> tuple[float, float]:
+async def geocode_vworld(address: str, hedge: Optional[bool] = None) -> tuple[float, float]:
     """
     주소 -> (lat, lon) (WGS84)
     1) 도로명(ROAD) 시도, 2) 없으면 지번(PARCEL) 폴백
+    같은 주소(정규화 기준)는 캐시에서 바로 반환하고, 지난번에 성공한 유형을 먼저 시도합니다.
+    hedge(기본 GEOCODE_HEDGE)면 두 유형을 병렬로 요청해 ROAD 실패를 기다리지 않습니다.
     """
-    if not VWORLD_KEY:
-        raise HTTPException(500, "VWORLD_API_KEY 미설정")
+    with stage("geocode") as span:
+        key = normalize_address(address)
+        cached = await GEOCODE_CACHE.aget(key)
+        if not is_missing(cached):
+            if cached is None:
+                raise HTTPException(404, f"VWorld 결과 없음(캐시): {address}")
+            span.outcome = "cache"
+            return cached["lat"], cached["lon"]
+
+        if not VWORLD_KEY:
+            raise HTTPException(500, "VWORLD_API_KEY 미설정")
+        if hedge is None:
+            hedge = GEOCODE_HEDGE
+        lat, lon, span.outcome = await _geocode_flight.do(key, lambda: _geocode_uncached(address, key, hedge))
+        return lat, lon
+
+async def _geocode_uncached(address: str, key: str, hedge: bool) -> tuple[float, float, str]:
+    addr_types = ["ROAD", "PARCEL"]
+    if await GEOCODE_TYPE_HINTS.aget(key) == "PARCEL":
+        addr_types.reverse()
     try:
-        return await _call_vworld(address, "ROAD")
-    except HTTPException:
-        return await _call_vworld(address, "PARCEL")
+        if hedge:
+            lat, lon, addr_type = await _geocode_hedged(address, addr_types, GEOCODE_HEDGE_DELAY, GEOCODE_PREFER_WINDOW)
+        else:
+            lat, lon, addr_type = await _geocode_sequential(address, addr_types)
+    except HTTPException as e:
+        if e.status_code == 404:  # 시도한 유형이 모두 NOT_FOUND일 때만 404
+            GEOCODE_CACHE.set(key, None)
+        raise
+    GEOCODE_CACHE.set(key, {"lat": lat, "lon": lon, "type": addr_type})
+    GEOCODE_TYPE_HINTS.set(key, addr_type)
+    return lat, lon, addr_type
@@ -0,0 +1,85 @@
+# grid_projection.py
+# 기상청 격자(Lambert Conformal Conic) 변환. 투영 상수는 import 시 한 번만 계산합니다.
+import math
+from typing import Tuple
+import numpy as np
+
+# ---------- 투영 상수 (weather_kma.latlon_to_grid와 같은 식/같은 연산 순서) ----------
+RE = 6371.00877; GRID = 5.0
+SLAT1, SLAT2 = 30.0, 60.0; OLON, OLAT = 126.0, 38.0
+XO, YO = 43, 136
+DEGRAD = math.pi / 180.0
+RADDEG = 180.0 / math.pi
+
+_re = RE / GRID
+_slat1 = SLAT1 * DEGRAD; _slat2 = SLAT2 * DEGRAD
+_olon = OLON * DEGRAD;  _olat = OLAT * DEGRAD
+SN = math.log(math.cos(_slat1)/math.cos(_slat2)) / math.log(
+    math.tan(math.pi*0.25+_slat2*0.5)/math.tan(math.pi*0.25+_slat1*0.5)
+)
+SF = (math.cos(_slat1)*(math.tan(math.pi*0.25+_slat1*0.5)**SN))/SN
+RE_SF = _re*SF
+RO = RE_SF/(math.tan(math.pi*0.25+_olat*0.5)**SN)
+OLON_RAD = _olon
+
+# 배치 결과가 정수 경계에 이만큼 가까우면 스칼라 식으로 다시 계산(라이브러리별 ulp 차이 대비)
+_BOUNDARY_EPS = 1e-9
+
+def latlon_to_grid(lat: float, lon: float) -> Tuple[int, int]:
+    ra = RE_SF/(math.tan(math.pi*0.25+(lat*DEGRAD)*0.5)**SN)
+    theta = (lon*DEGRAD)-OLON_RAD
+    if theta > math.pi: theta -= 2.0*math.pi
+    if theta < -math.pi: theta += 2.0*math.pi
+    theta *= SN
+    x = ra*math.sin(theta)+XO+0.5
+    y = RO - ra*math.cos(theta)+YO+0.5
+    return int(x), int(y)
+
+def latlon_to_grid_batch(lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    위경도 배열 -> (nx 배열, ny 배열). 한 번의 벡터 연산으로 변환하며 결과는 latlon_to_grid와 같습니다.
+    """
+    lat = np.asarray(lats, dtype=np.float64)
+    lon = np.asarray(lons, dtype=np.float64)
+    ra = RE_SF/np.power(np.tan(math.pi*0.25+(lat*DEGRAD)*0.5), SN)
+    theta = (lon*DEGRAD)-OLON_RAD
+    theta = np.where(theta > math.pi, theta - 2.0*math.pi, theta)
+    theta = np.where(theta < -math.pi, theta + 2.0*math.pi, theta)
+    theta = theta*SN
+    x = ra*np.sin(theta)+XO+0.5
+    y = RO - ra*np.cos(theta)+YO+0.5
+    nx = np.trunc(x).astype(np.int64)
+    ny = np.trunc(y).astype(np.int64)
+
+    # NumPy의 sin/cos/pow 구현이 libm과 마지막 비트에서 다를 수 있으므로 경계 근처만 스칼라로 보정
+    near = (np.abs(x - np.round(x)) < _BOUNDARY_EPS) | (np.abs(y - np.round(y)) < _BOUNDARY_EPS)
+    for i in np.flatnonzero(near):
+        idx = np.unravel_index(i, x.shape)
+        nx[idx], ny[idx] = latlon_to_grid(float(lat[idx]), float(lon[idx]))
+    return nx, ny
+
+def grid_to_latlon(nx: float, ny: float) -> Tuple[float, float]:
+    """격자 (nx, ny) -> (lat, lon). 격자점 좌표를 돌려줍니다."""
+    xn = nx - XO
+    yn = RO - ny + YO
+    ra = math.sqrt(xn*xn + yn*yn)
+    if SN < 0.0: ra = -ra
+    alat = 2.0*math.atan((RE_SF/ra)**(1.0/SN)) - math.pi*0.5
+    if abs(xn) <= 0.0:
+        theta = 0.0
+    elif abs(yn) <= 0.0:
+        theta = math.pi*0.5 if xn > 0 else -math.pi*0.5
+    else:
+        theta = math.atan2(xn, yn)
+    alon = theta/SN + OLON_RAD
+    return alat*RADDEG, alon*RADDEG
+
+def grid_to_latlon_batch(nxs, nys) -> Tuple[np.ndarray, np.ndarray]:
+    xn = np.asarray(nxs, dtype=np.float64) - XO
+    yn = RO - np.asarray(nys, dtype=np.float64) + YO
+    ra = np.sqrt(xn*xn + yn*yn)
+    if SN < 0.0: ra = -ra
+    alat = 2.0*np.arctan(np.power(RE_SF/ra, 1.0/SN)) - math.pi*0.5
+    theta = np.arctan2(xn, yn)  # xn=0이면 0, yn=0이면 ±π/2 (스칼라 분기와 동일)
+    alon = theta/SN + OLON_RAD
+    return alat*RADDEG, alon*RADDEG
@@ -0,0 +1,111 @@
+# http_clients.py
+# 업스트림별 공유 httpx.AsyncClient 레지스트리 (FastAPI lifespan이 열고 닫음)
+import asyncio, os, ssl
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+import httpx
+from python_ai_server import metrics
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    timeout: float
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    tls12_only: bool = False   # KMA HTTPS는 TLS 1.2로 고정해야 협상이 됨
+    trust_env: bool = True
+    retries: int = 0
+    user_agent: Optional[str] = None
+
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "vworld": UpstreamConfig(timeout=10),
+    "kma": UpstreamConfig(timeout=15, tls12_only=True, trust_env=False, retries=1, user_agent="Mozilla/5.0"),
+    "kma_http": UpstreamConfig(timeout=15, user_agent="Mozilla/5.0"),
+    "open_meteo": UpstreamConfig(timeout=10),
+    "google_places": UpstreamConfig(
+        timeout=3,
+        max_connections=int(os.getenv("PLACES_MAX_CONNECTIONS", "16")),
+        max_keepalive_connections=int(os.getenv("PLACES_MAX_CONNECTIONS", "16")),
+    ),
+}
+
+REQUESTS = metrics.counter("upstream_http_requests_total", "업스트림 HTTP 요청 수", ("upstream",))
+CONNECTIONS = metrics.counter("upstream_http_connections_opened_total", "새로 연 TCP 커넥션 수(요청 수와의 차이 = 재사용)", ("upstream",))
+TLS_HANDSHAKES = metrics.counter("upstream_tls_handshakes_total", "TLS 핸드셰이크 수", ("upstream",))
+
+def _ssl_context(config: UpstreamConfig):
+    if not config.tls12_only:
+        return True
+    ctx = ssl.create_default_context()
+    ctx.minimum_version = ssl.TLSVersion.TLSv1_2
+    ctx.maximum_version = ssl.TLSVersion.TLSv1_2
+    return ctx
+
+def _event_hooks(name: str) -> Dict[str, list]:
+    async def trace(event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            CONNECTIONS.inc(name)
+        elif event == "connection.start_tls.complete":
+            TLS_HANDSHAKES.inc(name)
+
+    async def on_request(request: httpx.Request) -> None:
+        REQUESTS.inc(name)
+        request.extensions["trace"] = trace
+
+    return {"request": [on_request]}
+
+def build_client(name: str, config: Optional[UpstreamConfig] = None) -> httpx.AsyncClient:
+    config = config or UPSTREAMS[name]
+    limits = httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=config.keepalive_expiry,
+    )
+    verify = _ssl_context(config)
+    transport = httpx.AsyncHTTPTransport(verify=verify, limits=limits, http2=False, retries=config.retries, trust_env=config.trust_env)
+    headers = {"User-Agent": config.user_agent} if config.user_agent else None
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=config.timeout,
+        trust_env=config.trust_env,
+        headers=headers,
+        event_hooks=_event_hooks(name),
+    )
+
+class ClientRegistry:
+    """
+    업스트림마다 keep-alive 커넥션 풀을 가진 클라이언트 하나씩. start()를 호출한 이벤트 루프에서만 공유됩니다.
+    """
+    def __init__(self, upstreams: Dict[str, UpstreamConfig]):
+        self.upstreams = upstreams
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        for name, config in self.upstreams.items():
+            self._clients[name] = build_client(name, config)
+
+    async def aclose(self) -> None:
+        clients, self._clients, self._loop = self._clients, {}, None
+        await asyncio.gather(*(c.aclose() for c in clients.values()), return_exceptions=True)
+
+    def shared(self, name: str) -> Optional[httpx.AsyncClient]:
+        if self._loop is None or self._loop is not asyncio.get_running_loop():
+            return None
+        return self._clients.get(name)
+
+HTTP_CLIENTS = ClientRegistry(UPSTREAMS)
+
+@asynccontextmanager
+async def upstream_client(name: str) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    공유 클라이언트가 있으면 그대로 쓰고, 앱 밖(asyncio.run 등)에서는 같은 설정의 임시 클라이언트를 씁니다.
+    """
+    client = HTTP_CLIENTS.shared(name)
+    if client is not None:
+        yield client
+        return
+    async with build_client(name, HTTP_CLIENTS.upstreams.get(name)) as client:
+        yield client
@@ -0,0 +1,140 @@
+# metrics.py
+# Prometheus 텍스트 포맷 지표 (외부 의존성 없이 /metrics로 노출)
+import bisect, threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labelnames: Sequence[str], labelvalues: LabelValues, extra: str = "") -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._fn = fn
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def collect(self) -> Dict[LabelValues, float]:
+        if self._fn is not None:
+            return self._fn()
+        with self._lock:
+            return dict(self._values)
+
+    def value(self, *labelvalues: str) -> float:
+        return self.collect().get(tuple(labelvalues), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), fn=None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames, fn)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # 버킷별 개수(누적 아님) + [합, 개수]
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self) -> Dict[LabelValues, float]:
+        """라벨별 관측 횟수 (value()용)."""
+        with self._lock:
+            return {labelvalues: series[-1] for labelvalues, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            snapshot = {labelvalues: list(series) for labelvalues, series in self._series.items()}
+        for labelvalues, series in sorted(snapshot.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labelvalues)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labelvalues)} {_format_value(series[-1])}")
+        return lines
+
+REGISTRY: Dict[str, _Metric] = {}
+_registry_lock = threading.Lock()
+
+def _register(cls, name: str, help: str, labelnames: Sequence[str], fn):
+    # 같은 이름은 한 번만 등록(모듈 재import 시에도 같은 객체를 돌려줌)
+    with _registry_lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = cls(name, help, labelnames, fn)
+            REGISTRY[name] = metric
+        elif fn is not None:
+            metric._fn = fn
+        return metric
+
+def counter(name: str, help: str, labelnames: Sequence[str] = (), fn=None) -> Counter:
+    return _register(Counter, name, help, labelnames, fn)
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = (), fn=None) -> Gauge:
+    return _register(Gauge, name, help, labelnames, fn)
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    with _registry_lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = REGISTRY[name] = Histogram(name, help, labelnames, buckets=buckets)
+        return metric
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in list(REGISTRY.values()):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
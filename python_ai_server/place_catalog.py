@@ -0,0 +1,262 @@
+# place_catalog.py
+# 로컬 장소 카탈로그: CSV/JSON 덤프 -> 메모리 맵 저장소(공간 색인 + 이름 n-gram 색인)
+# LLM이 만든 장소명을 네트워크 없이 검증/보정하고 좌표를 붙이며, 주변 후보를 프롬프트에 넣는 데 씁니다.
+#
+# 저장소 디렉터리 구성 (모두 np.load(mmap_mode="r")로 열어 필요한 페이지만 읽음)
+#   places.npy      레코드 배열 (격자 셀 키 순으로 정렬)
+#   names.bin       UTF-8 장소명 이어붙인 것 (레코드의 name_off/name_len으로 슬라이스)
+#   gram_keys.npy   정렬된 bigram 키
+#   gram_offsets.npy, postings.npy   bigram -> 레코드 번호 목록 (CSR)
+#
+# 빌드: python -m python_ai_server.place_catalog build <places.csv|places.json> <출력 디렉터리>
+import csv, json, math, mmap, os, re, sys, unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+PLACE_CATALOG_PATH = os.getenv("PLACE_CATALOG_PATH", os.path.join(os.path.dirname(__file__), ".cache", "place_catalog"))
+PLACE_MATCH_THRESHOLD = float(os.getenv("PLACE_MATCH_THRESHOLD", "0.6"))  # 이름 유사도(Dice) 하한
+PLACE_MATCH_RADIUS_M = float(os.getenv("PLACE_MATCH_RADIUS_M", "3000"))   # 이름 매칭 시 기준 좌표로부터의 반경
+PLACE_CANDIDATES = int(os.getenv("PLACE_CANDIDATES", "20"))                # 프롬프트에 넣을 주변 후보 수
+PLACE_GRAM_POSTINGS_LIMIT = int(os.getenv("PLACE_GRAM_POSTINGS_LIMIT", "2000"))  # 이보다 흔한 gram은 후보 수집에서 제외
+
+CATEGORIES = ["카페", "식당", "박물관", "공원", "야경", "바", "액티비티", "기타"]  # places.CATEGORY_ENUM과 같은 순서
+CELL_DEG = 0.01           # 공간 색인 격자 크기(도). 위도 방향 약 1.1km
+_LON_CELLS = 100000       # 셀 키 = 위도 셀 * _LON_CELLS + 경도 셀
+EARTH_RADIUS_M = 6371008.8
+
+RECORD_DTYPE = np.dtype([
+    ("lat", "<f8"), ("lon", "<f8"), ("cell", "<i8"),
+    ("name_off", "<u4"), ("name_len", "<u2"), ("grams", "<u2"),
+    ("category", "u1"), ("open_min", "<i2"), ("close_min", "<i2"),  # 영업시간(분), 모르면 -1
+])
+
+_STRIP = re.compile(r"[\s\-_·.,()\[\]'\"&/]+")
+
+def normalize_name(name: str) -> str:
+    """NFKC + 소문자 + 공백/구두점 제거 ('스타벅스 강남역 2호점' == '스타벅스강남역2호점')."""
+    return _STRIP.sub("", unicodedata.normalize("NFKC", name).lower())
+
+def name_grams(normalized: str) -> List[int]:
+    """경계 표시를 붙인 문자 bigram 키 목록(중복 제거). 한 글자 이름도 두 개의 gram을 가짐."""
+    padded = "\x02" + normalized + "\x03"
+    return sorted({(ord(a) << 21) | ord(b) for a, b in zip(padded, padded[1:])})
+
+def cell_key(lat: float, lon: float) -> int:
+    return int(math.floor((lat + 90.0) / CELL_DEG)) * _LON_CELLS + int(math.floor((lon + 180.0) / CELL_DEG))
+
+def parse_hhmm(value: Any) -> int:
+    if not value:
+        return -1
+    match = re.match(r"^\s*(\d{1,2}):?(\d{2})\s*$", str(value))
+    if not match:
+        return -1
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+def _format_hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+@dataclass
+class Place:
+    id: int
+    name: str
+    category: str
+    lat: float
+    lon: float
+    open_min: int = -1
+    close_min: int = -1
+    distance_m: Optional[float] = None
+
+    def opening_hours(self) -> Optional[str]:
+        if self.open_min < 0 or self.close_min < 0:
+            return None
+        return f"{_format_hhmm(self.open_min)}-{_format_hhmm(self.close_min)}"
+
+    def is_open_at(self, minutes: int) -> Optional[bool]:
+        """영업 중이면 True, 영업시간을 모르면 None. 자정을 넘기는 영업(예: 18:00-02:00)도 처리."""
+        if self.open_min < 0 or self.close_min < 0:
+            return None
+        if self.open_min <= self.close_min:
+            return self.open_min <= minutes < self.close_min
+        return minutes >= self.open_min or minutes < self.close_min
+
+# ---------- 빌드 ----------
+
+def read_records(path: str) -> Iterable[Dict[str, Any]]:
+    """CSV(헤더: name,category,lat,lon[,open,close]) 또는 JSON 배열. 한글 헤더(장소명/카테고리/위도/경도/영업시작/영업종료)도 허용."""
+    aliases = {"장소명": "name", "카테고리": "category", "위도": "lat", "경도": "lon", "영업시작": "open", "영업종료": "close"}
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+    for row in rows:
+        yield {aliases.get(k, k): v for k, v in row.items()}
+
+def build_catalog(records: Iterable[Dict[str, Any]], out_dir: str) -> int:
+    """레코드 -> 저장소 파일. 이름/좌표가 없는 레코드는 건너뜀. 저장한 레코드 수를 반환."""
+    rows = []
+    for record in records:
+        name = str(record.get("name") or "").strip()
+        try:
+            lat, lon = float(record["lat"]), float(record["lon"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not name or not normalize_name(name):
+            continue
+        category = record.get("category") or "기타"
+        rows.append((cell_key(lat, lon), name, lat, lon, CATEGORIES.index(category) if category in CATEGORIES else CATEGORIES.index("기타"), parse_hhmm(record.get("open")), parse_hhmm(record.get("close"))))
+    rows.sort(key=lambda row: row[0])
+
+    places = np.zeros(len(rows), dtype=RECORD_DTYPE)
+    blob = bytearray()
+    postings_by_gram: Dict[int, List[int]] = {}
+    for i, (cell, name, lat, lon, category, open_min, close_min) in enumerate(rows):
+        encoded = name.encode("utf-8")
+        grams = name_grams(normalize_name(name))
+        places[i] = (lat, lon, cell, len(blob), len(encoded), len(grams), category, open_min, close_min)
+        blob += encoded
+        for gram in grams:
+            postings_by_gram.setdefault(gram, []).append(i)
+
+    gram_keys = np.array(sorted(postings_by_gram), dtype=np.int64)
+    lengths = [len(postings_by_gram[gram]) for gram in gram_keys.tolist()]
+    gram_offsets = np.zeros(len(gram_keys) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=gram_offsets[1:])
+    postings = np.fromiter((i for gram in gram_keys.tolist() for i in postings_by_gram[gram]), dtype=np.uint32, count=int(gram_offsets[-1]))
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "places.npy"), places)
+    np.save(os.path.join(out_dir, "gram_keys.npy"), gram_keys)
+    np.save(os.path.join(out_dir, "gram_offsets.npy"), gram_offsets)
+    np.save(os.path.join(out_dir, "postings.npy"), postings)
+    with open(os.path.join(out_dir, "names.bin"), "wb") as f:
+        f.write(bytes(blob) or b"\0")  # 빈 파일은 mmap 불가
+    return len(rows)
+
+# ---------- 조회 ----------
+
+class PlaceCatalog:
+    """
+    nearby(lat, lon, radius_m): 격자 셀 키로 정렬돼 있으므로 위도 셀 행마다 searchsorted 한 번으로 범위를 잘라 거리 계산
+    match(name, lat, lon): bigram 역색인으로 후보를 모아 Dice 유사도가 가장 높은 장소(같으면 가까운 쪽)
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.places = np.load(os.path.join(path, "places.npy"), mmap_mode="r")
+        self.gram_keys = np.load(os.path.join(path, "gram_keys.npy"), mmap_mode="r")
+        self.gram_offsets = np.load(os.path.join(path, "gram_offsets.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r")
+        self._names_file = open(os.path.join(path, "names.bin"), "rb")
+        self._names = mmap.mmap(self._names_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._cells = self.places["cell"]
+
+    def close(self) -> None:
+        self._names.close()
+        self._names_file.close()
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def place(self, i: int, distance_m: Optional[float] = None) -> Place:
+        record = self.places[i]
+        off, length = int(record["name_off"]), int(record["name_len"])
+        return Place(
+            int(i), self._names[off:off + length].decode("utf-8"), CATEGORIES[int(record["category"])],
+            float(record["lat"]), float(record["lon"]), int(record["open_min"]), int(record["close_min"]), distance_m,
+        )
+
+    def _within(self, lat: float, lon: float, radius_m: float) -> Tuple[np.ndarray, np.ndarray]:
+        """반경 안 레코드 번호와 거리(m)."""
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        lat_lo, lat_hi = int(math.floor((lat - dlat + 90.0) / CELL_DEG)), int(math.floor((lat + dlat + 90.0) / CELL_DEG))
+        lon_lo, lon_hi = int(math.floor((lon - dlon + 180.0) / CELL_DEG)), int(math.floor((lon + dlon + 180.0) / CELL_DEG))
+        spans = []
+        for row in range(lat_lo, lat_hi + 1):
+            start = np.searchsorted(self._cells, row * _LON_CELLS + lon_lo, side="left")
+            stop = np.searchsorted(self._cells, row * _LON_CELLS + lon_hi, side="right")
+            if stop > start:
+                spans.append(np.arange(start, stop))
+        if not spans:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        ids = np.concatenate(spans)
+        distances = haversine_m(lat, lon, self.places["lat"][ids], self.places["lon"][ids])
+        keep = distances <= radius_m
+        return ids[keep], distances[keep]
+
+    def nearby(self, lat: float, lon: float, radius_m: float = 1000.0, limit: int = PLACE_CANDIDATES, categories: Optional[Iterable[str]] = None) -> List[Place]:
+        ids, distances = self._within(lat, lon, radius_m)
+        if categories is not None:
+            wanted = np.array([CATEGORIES.index(c) for c in categories if c in CATEGORIES], dtype=np.uint8)
+            keep = np.isin(self.places["category"][ids], wanted)
+            ids, distances = ids[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")[:limit]
+        return [self.place(ids[k], float(distances[k])) for k in order]
+
+    def match(self, name: str, lat: Optional[float] = None, lon: Optional[float] = None, radius_m: float = PLACE_MATCH_RADIUS_M, threshold: float = PLACE_MATCH_THRESHOLD) -> Optional[Tuple[Place, float]]:
+        """장소명 -> (가장 비슷한 장소, 유사도 0~1). 좌표를 주면 반경 안에서만 찾음. 하한 미만이면 None."""
+        grams = np.array(name_grams(normalize_name(name)), dtype=np.int64)
+        if not len(self.gram_keys) or not len(grams):
+            return None
+        pos = np.searchsorted(self.gram_keys, grams)
+        found = pos < len(self.gram_keys)
+        found[found] = self.gram_keys[pos[found]] == grams[found]
+        pos = pos[found]
+        if not len(pos):
+            return None
+        lists = [self.postings[self.gram_offsets[p]:self.gram_offsets[p + 1]] for p in pos]
+        # 후보는 흔하지 않은 gram('지점', '호점' 같은 흔한 gram 제외)에서만 모으고, 겹친 gram 수는 모든 목록에서 셈
+        rare = [postings for postings in lists if len(postings) <= PLACE_GRAM_POSTINGS_LIMIT]
+        if rare:
+            ids = np.unique(np.concatenate(rare))
+        elif lat is not None and lon is not None:
+            ids = np.sort(self._within(lat, lon, radius_m)[0])
+        else:
+            ids = np.array(min(lists, key=len))
+        common = np.zeros(len(ids))
+        for postings in lists:  # 각 목록은 레코드 번호 오름차순
+            idx = np.minimum(np.searchsorted(postings, ids), len(postings) - 1)
+            common += postings[idx] == ids
+        scores = 2.0 * common / (len(grams) + self.places["grams"][ids])
+        distances = np.zeros(len(ids))
+        if lat is not None and lon is not None:
+            distances = haversine_m(lat, lon, self.places["lat"][ids], self.places["lon"][ids])
+            keep = distances <= radius_m
+            ids, scores, distances = ids[keep], scores[keep], distances[keep]
+        if not len(ids):
+            return None
+        best = np.lexsort((distances, -scores))[0]
+        if scores[best] < threshold:
+            return None
+        return self.place(ids[best], float(distances[best]) if lat is not None else None), float(scores[best])
+
+def haversine_m(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    p1, p2 = math.radians(lat), np.radians(lats)
+    dp, dl = p2 - p1, np.radians(lons - lon)
+    a = np.sin(dp / 2) ** 2 + math.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+_catalog: Optional[PlaceCatalog] = None
+_catalog_loaded = False
+
+def get_catalog() -> Optional[PlaceCatalog]:
+    """PLACE_CATALOG_PATH의 저장소를 처음 호출 시 한 번 엽니다. 없으면 None(카탈로그 없이 동작)."""
+    global _catalog, _catalog_loaded
+    if not _catalog_loaded:
+        _catalog_loaded = True
+        if os.path.exists(os.path.join(PLACE_CATALOG_PATH, "places.npy")):
+            try:
+                _catalog = PlaceCatalog(PLACE_CATALOG_PATH)
+                print(f"[장소 카탈로그] {len(_catalog)}건 로드: {PLACE_CATALOG_PATH}")
+            except Exception as e:
+                print(f"[장소 카탈로그 로드 실패] {e}")
+    return _catalog
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        print("사용법: python -m python_ai_server.place_catalog build <places.csv|places.json> <출력 디렉터리>")
+        sys.exit(1)
+    count = build_catalog(read_records(sys.argv[2]), sys.argv[3])
+    print(f"{count}건 저장: {sys.argv[3]}")
@@ -0,0 +1,53 @@
+# batch.py
+# /recommend/batch: 여러 요청을 한 번에 처리. 항목 간 지오코딩/날씨 호출을 합치고 LLM 동시 호출 수를 제한
+import asyncio, os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))  # 배치 하나가 동시에 여는 OpenAI 호출 수
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))         # 배치 하나가 동시에 처리하는 항목 수(지오코딩/날씨/사진 포함)
+
+def memoize_async(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    같은 인자의 호출을 작업 하나로 합칩니다(배치 한 번 동안만 유지).
+    실패도 그대로 공유하므로 같은 주소의 항목들은 같은 오류를 받습니다.
+    """
+    tasks: Dict[Hashable, asyncio.Task] = {}
+
+    async def call(*args: Any) -> Any:
+        task = tasks.get(args)
+        if task is None:
+            task = tasks[args] = asyncio.ensure_future(fn(*args))
+        return await asyncio.shield(task)
+
+    return call
+
+def item_error(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, HTTPException):
+        return {"status": e.status_code, "detail": e.detail}
+    return {"status": 500, "detail": str(e) or type(e).__name__}
+
+async def run_batch(items: Sequence[Any], handle: Callable[[Any], Awaitable[Dict[str, Any]]], concurrency: Optional[int] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    항목을 최대 concurrency개(기본 BATCH_CONCURRENCY)씩 처리하고 끝나는 순서대로 (index, 항목 결과)를 내보냅니다.
+    항목 결과: {"index", "result"} 또는 {"index", "error": {"status", "detail"}}. 한 항목의 실패가 배치를 멈추지 않습니다.
+    """
+    slots = asyncio.Semaphore(concurrency or BATCH_CONCURRENCY)
+
+    async def one(index: int, item: Any) -> Tuple[int, Dict[str, Any]]:
+        async with slots:
+            try:
+                return index, {"index": index, "result": await handle(item)}
+            except Exception as e:
+                return index, {"index": index, "error": item_error(e)}
+
+    tasks: List[asyncio.Task] = [asyncio.create_task(one(i, item)) for i, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # NDJSON 클라이언트가 끊기면 남은 항목은 취소
+        for task in tasks:
+            if not task.done():
+                task.cancel()
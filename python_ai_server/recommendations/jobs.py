@@ -0,0 +1,184 @@
+# jobs.py
+# /recommend/jobs: 추천 요청을 큐에 넣고 작업 ID를 바로 돌려주는 비동기 작업 모드
+# - 워커 JOB_WORKERS개가 우선순위 레인(high > normal > low) 순서로 꺼내 처리. 같은 레인 안에서는 먼저 온 순서
+# - 대기 작업이 JOB_QUEUE_MAX_DEPTH개면 429 + Retry-After(low 레인은 JOB_LOW_LANE_SHARE 비율에서 먼저 거절)
+# - 끝난 작업 결과는 JOB_RESULT_TTL초 동안 조회 가능, 이후 404
+# - 몰릴 때 요청이 타임아웃으로 끊기는 대신 큐에서 기다림. 클라이언트는 GET ?wait=초 로 롱폴링
+import asyncio, heapq, itertools, math, os, time, uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from python_ai_server import metrics
+from python_ai_server.recommendations.batch import item_error
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))                        # 동시에 처리할 작업 수(= 작업 모드의 OpenAI 동시 호출 수)
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "200"))      # 대기 작업 수 상한
+JOB_LOW_LANE_SHARE = float(os.getenv("JOB_LOW_LANE_SHARE", "0.5"))      # 대기 작업이 상한의 이 비율 이상이면 low 레인 거절
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "600"))              # 초, 끝난 작업 결과 보관 시간
+JOB_LONG_POLL_MAX = float(os.getenv("JOB_LONG_POLL_MAX", "30"))         # 초, GET ?wait= 상한
+
+LANES = ("high", "normal", "low")
+_LANE_RANK = {lane: rank for rank, lane in enumerate(LANES)}
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+JOBS_TOTAL = metrics.counter("recommend_jobs_total", "작업 모드 요청 결과(accepted/rejected/done/failed/expired)", ("lane", "result"))
+WAIT_SECONDS = metrics.histogram(
+    "recommend_job_wait_seconds", "작업이 큐에서 기다린 시간", ("lane",),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+RUN_SECONDS = metrics.histogram("recommend_job_run_seconds", "작업 처리 시간", buckets=(0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60))
+
+class QueueFullError(HTTPException):
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(429, f"추천 작업 큐가 가득 찼습니다({lane}). {retry_after}초 후 다시 시도하세요.", headers={"Retry-After": str(retry_after)})
+
+@dataclass
+class Job:
+    id: str
+    lane: str
+    payload: Any
+    lane_seq: int
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    status: str = QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+class JobQueue:
+    """
+    우선순위 레인이 있는 제한된 작업 큐 + 워커 풀.
+    start(handler)로 워커를 띄우고, handler(payload)의 반환값(dict)이 작업 결과가 됩니다.
+    """
+    def __init__(self, max_depth: int = JOB_QUEUE_MAX_DEPTH, workers: int = JOB_WORKERS, result_ttl: float = JOB_RESULT_TTL):
+        self.max_depth = max_depth
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self._heap: List[Tuple[int, int, Job]] = []  # (레인 순위, 전체 순번, 작업)
+        self._seq = itertools.count()
+        self._ready: Optional[asyncio.Semaphore] = None
+        self._jobs: Dict[str, Job] = {}
+        self._expiry: Deque[Tuple[float, str]] = deque()  # 끝난 순서 = 만료 순서 (TTL이 고정이라)
+        self._queued = {lane: 0 for lane in LANES}
+        self._enqueued = {lane: 0 for lane in LANES}  # 레인별 누적 넣은 수/꺼낸 수 -> 대기 순번 계산
+        self._dequeued = {lane: 0 for lane in LANES}
+        self._avg_run = 5.0  # 초, Retry-After 추정용 처리 시간 이동 평균
+        self._tasks: List[asyncio.Task] = []
+
+    def depth(self, lane: Optional[str] = None) -> int:
+        return self._queued[lane] if lane else sum(self._queued.values())
+
+    def position(self, job: Job) -> int:
+        """앞에 있는 대기 작업 수(0이면 다음 차례). 대기 중이 아니면 0."""
+        if job.status != QUEUED:
+            return 0
+        ahead = sum(self._queued[lane] for lane in LANES[:_LANE_RANK[job.lane]])
+        return ahead + job.lane_seq - self._dequeued[job.lane]
+
+    def retry_after(self) -> int:
+        return max(1, min(120, math.ceil(self.depth() / max(1, self.workers) * self._avg_run)))
+
+    def submit(self, payload: Any, lane: str = "normal") -> Job:
+        self._expire()
+        depth = self.depth()
+        limit = self.max_depth * JOB_LOW_LANE_SHARE if lane == "low" else self.max_depth
+        if depth >= limit:
+            JOBS_TOTAL.inc(lane, "rejected")
+            raise QueueFullError(lane, self.retry_after())
+        job = Job(uuid.uuid4().hex, lane, payload, self._enqueued[lane])
+        self._enqueued[lane] += 1
+        self._queued[lane] += 1
+        self._jobs[job.id] = job
+        heapq.heappush(self._heap, (_LANE_RANK[lane], next(self._seq), job))
+        self._semaphore().release()
+        JOBS_TOTAL.inc(lane, "accepted")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """끝날 때까지 최대 timeout초 기다림(롱폴링). 시간이 지나도 예외 없이 현재 상태 그대로 돌려줌."""
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def view(self, job: Job) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"job_id": job.id, "status": job.status, "lane": job.lane}
+        if job.status == QUEUED:
+            data["position"] = self.position(job)
+        elif job.status == DONE:
+            data["result"] = job.result
+        elif job.status == FAILED:
+            data["error"] = job.error
+        return data
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # 이벤트 루프 안에서 처음 쓸 때 생성 (모듈 import 시점에는 루프가 없을 수 있음)
+        if self._ready is None:
+            self._ready = asyncio.Semaphore(0)
+        return self._ready
+
+    def _expire(self) -> None:
+        now = time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, job_id = self._expiry.popleft()
+            job = self._jobs.pop(job_id, None)
+            if job is not None:
+                JOBS_TOTAL.inc(job.lane, "expired")
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        self._expiry.append((job.finished_at + self.result_ttl, job.id))
+        job.done.set()
+        JOBS_TOTAL.inc(job.lane, status)
+
+    async def _work(self, handler: Callable[[Any], Awaitable[Dict[str, Any]]]) -> None:
+        while True:
+            await self._semaphore().acquire()
+            _, _, job = heapq.heappop(self._heap)
+            self._queued[job.lane] -= 1
+            self._dequeued[job.lane] += 1
+            job.status = RUNNING
+            job.started_at = time.time()
+            WAIT_SECONDS.observe(job.started_at - job.created_at, job.lane)
+            try:
+                job.result = await handler(job.payload)
+            except asyncio.CancelledError:
+                job.error = {"status": 503, "detail": "서버 종료로 작업이 취소되었습니다."}
+                self._finish(job, FAILED)
+                raise
+            except Exception as e:
+                job.error = item_error(e)
+                self._finish(job, FAILED)
+            else:
+                self._finish(job, DONE)
+            elapsed = job.finished_at - job.started_at
+            RUN_SECONDS.observe(elapsed)
+            self._avg_run = 0.8 * self._avg_run + 0.2 * elapsed
+
+    def start(self, handler: Callable[[Any], Awaitable[Dict[str, Any]]]) -> None:
+        self._tasks = [asyncio.create_task(self._work(handler)) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._ready = None  # 다음 start는 다른 이벤트 루프일 수 있음(테스트)
+        for _, _, job in self._heap:
+            job.error = {"status": 503, "detail": "서버 종료로 작업이 취소되었습니다."}
+            self._finish(job, FAILED)
+        self._heap.clear()
+        self._queued = {lane: 0 for lane in LANES}
+        self._dequeued = dict(self._enqueued)
+
+JOB_QUEUE = JobQueue()
+metrics.gauge("recommend_job_queue_depth", "레인별 대기 작업 수", ("lane",), fn=lambda: {(lane,): JOB_QUEUE.depth(lane) for lane in LANES})
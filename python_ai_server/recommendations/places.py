@@ -1,27 +1,7 @@
-# 구조 보정 함수: 코스/스톱 개수 및 필수 필드 강제
-def fix_schema_structure(data):
-    courses = data.get("courses", [])
-    while len(courses) < 3:
-        courses.append({
-            "코스명": f"기본 코스 {len(courses)+1}",
-            "총예상소요시간": 360,
-            "스톱": []
-        })
-    data["courses"] = courses[:3]
-    for course in data["courses"]:
-        stops = course.get("스톱", [])
-        while len(stops) < 3:
-            stops.append({
-                "장소명": f"기본 장소 {len(stops)+1}",
-                "설명": "기본 설명",
-                "권장체류시간": 60,
-                "권장시간대": "오후",
-                "카테고리": "기타",
-                "photo_url": ""
-            })
-        course["스톱"] = stops[:7]
-    return data
-# 영문→한글 필드명 매핑 및 후처리 변환 함수
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# 영문→한글 필드명 매핑 (변환은 normalize_course/normalize_result가 검증과 함께 한 번에)
 FIELD_MAP = {
     "title": "코스명",
     "total_estimated_minutes": "총예상소요시간",
@@ -33,53 +13,97 @@ FIELD_MAP = {
     "category": "카테고리"
 }
 
-def convert_fields_to_korean(data):
-    if isinstance(data, dict):
-        out = {}
-        for k, v in data.items():
-            new_key = FIELD_MAP.get(k, k)
-            if new_key is None:
-                continue  # None 키는 무시
-            out[str(new_key)] = convert_fields_to_korean(v)
-        return out
-    elif isinstance(data, list):
-        return [convert_fields_to_korean(item) for item in data]
-    return data
 import os
-import requests
+import unicodedata
+import httpx
+from fastapi import HTTPException
+from python_ai_server import metrics
+from python_ai_server.cache import TieredCache, is_missing
+from python_ai_server.http_clients import upstream_client
+from python_ai_server.place_catalog import PLACE_CANDIDATES, get_catalog
+from python_ai_server.recommendations.routing import route_courses
+from python_ai_server.resilience import PROVIDERS, CircuitOpenError
+from python_ai_server.tracing import stage
+from python_ai_server.singleflight import SingleFlight
 # Google Places API를 활용한 장소 사진 가져오기
-def get_photo_url(place_name: str, api_key: str) -> str:
-    """
-    Google Places API를 통해 장소명으로 대표 사진 URL을 반환합니다.
-    - place_name: 장소명(예: '카페 드 파리')
-    - api_key: 구글 API 키
-    """
-    search_url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
-    params = {
+PLACES_SEARCH_URL = os.getenv("PLACES_SEARCH_URL", "https://maps.googleapis.com/maps/api/place/findplacefromtext/json")
+
+def _photo_search_params(place_name: str, api_key: str) -> Dict[str, str]:
+    return {
         "input": place_name,
         "inputtype": "textquery",
         "fields": "photos,place_id",
         "key": api_key
     }
+
+def _photo_ref_from_response(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Places 응답 -> photo_reference (사진 없음은 None -> negative 캐시).
+    REQUEST_DENIED/OVER_QUERY_LIMIT 등은 HTTP 200으로 와도 502로 올려 캐시하지 않고 브레이커가 세게 함.
+    """
+    status = data.get("status")
+    if status not in ("OK", "ZERO_RESULTS"):
+        raise HTTPException(status_code=502, detail=f"Places API 오류: {status} {data.get('error_message', '')}".strip())
+    candidates = data.get("candidates")
+    if candidates and isinstance(candidates, list) and len(candidates) > 0:
+        photos = candidates[0].get("photos")
+        if photos and isinstance(photos, list) and len(photos) > 0:
+            return photos[0].get("photo_reference") or None
+    return None
+
+def _photo_url(photo_ref: Optional[str], api_key: str) -> str:
+    if not photo_ref:
+        return ""
+    return f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=400&photoreference={photo_ref}&key={api_key}"
+
+# 사진 참조 캐시: 정규화된 장소명 -> photo_reference (사진 없음은 None으로 negative 캐시)
+# URL에는 API 키가 들어가므로 캐시에는 참조값만 저장합니다.
+PHOTO_CACHE = TieredCache(
+    "place_photo",
+    maxsize=int(os.getenv("PHOTO_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PHOTO_CACHE_TTL", str(7 * 86400))),
+    negative_ttl=float(os.getenv("PHOTO_CACHE_NEGATIVE_TTL", str(86400))),
+)
+
+def normalize_place_name(place_name: str) -> str:
+    """캐시 키용 장소명 정규화: 유니코드 NFKC, 소문자, 공백 축약."""
+    return " ".join(unicodedata.normalize("NFKC", place_name).lower().split())
+
+# 같은 장소명을 동시에 조회하면 Places 호출 하나를 공유 (시간 예산으로 기다림이 끊겨도 조회는 끝까지 진행돼 캐시됨)
+_photo_flight = SingleFlight("place_photo")
+
+async def get_photo_url_async(place_name: str, api_key: str, client: httpx.AsyncClient) -> str:
+    """
+    Google Places API를 통해 장소명으로 대표 사진 URL을 반환합니다(사진이 없거나 실패하면 "").
+    - place_name: 장소명(예: '카페 드 파리')
+    - api_key: 구글 API 키
+    - client: 공유 커넥션 풀의 클라이언트(upstream_client("google_places")). 호출 측에서 넘겨준 것을 재사용
+    """
+    key = normalize_place_name(place_name)
+    cached = await PHOTO_CACHE.aget(key)
+    if not is_missing(cached):
+        return _photo_url(cached, api_key)
+
+    async def lookup() -> Optional[str]:
+        with PROVIDERS["google_places"].guard() as timeout:
+            resp = await client.get(PLACES_SEARCH_URL, params=_photo_search_params(place_name, api_key), timeout=timeout)
+            resp.raise_for_status()
+            photo_ref = _photo_ref_from_response(resp.json())
+        PHOTO_CACHE.set(key, photo_ref)
+        return photo_ref
+
     try:
-        resp = requests.get(search_url, params=params, timeout=3)
-        data = resp.json()
-        candidates = data.get("candidates")
-        if candidates and isinstance(candidates, list) and len(candidates) > 0:
-            photos = candidates[0].get("photos")
-            if photos and isinstance(photos, list) and len(photos) > 0:
-                photo_ref = photos[0].get("photo_reference")
-                if photo_ref:
-                    photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=400&photoreference={photo_ref}&key={api_key}"
-                    return photo_url
+        return _photo_url(await _photo_flight.do(key, lookup), api_key)
     except Exception as e:
         print(f"[사진 가져오기 실패] {place_name}: {e}")
     return ""
+import asyncio
 import json
 import re
 import time
-from typing import Any, Dict, List, Optional
-from openai import OpenAI
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from openai import AsyncOpenAI
 
 JSON_SCHEMA = {
     "name": "itinerary_schema",
@@ -135,80 +159,238 @@ FORBIDDEN_SUFFIXES = ["동", "읍", "면", "리", "거리", "타운", "스퀘어
 CATEGORY_ENUM = ["카페", "식당", "박물관", "공원", "야경", "바", "액티비티", "기타"]
 TIME_ENUM = ["아침", "오후", "저녁", "밤"]
 
+# 코스 하나만 다시 생성할 때 쓰는 스키마 (구조화 출력의 최상위는 object여야 함)
+COURSE_SCHEMA = {
+    "name": "course_schema",
+    "schema": {
+        "type": "object",
+        "properties": {"course": JSON_SCHEMA["schema"]["properties"]["courses"]["items"]},
+        "required": ["course"],
+        "additionalProperties": False
+    },
+    "strict": True
+}
+
 # 품질 검증 함수
 
-def validate_course_schema(data: Dict[str, Any]) -> bool:
+_COURSE_FIELDS = ("코스명", "총예상소요시간", "스톱")
+_STOP_FIELDS = ("장소명", "설명", "권장체류시간", "권장시간대", "카테고리")
+_FORBIDDEN_SUFFIX_TUPLE = tuple(FORBIDDEN_SUFFIXES)  # str.endswith(tuple): 접미사 전체를 C 루프 한 번으로 검사
+_TIME_SET = frozenset(TIME_ENUM)
+_CATEGORY_SET = frozenset(CATEGORY_ENUM)
+
+def _rename(data: Dict[str, Any]) -> Dict[str, Any]:
+    """한 단계만 영문 -> 한글 필드명 (하위 값은 그대로)."""
+    return {FIELD_MAP.get(k, k): v for k, v in data.items()}
+
+def _strip_travel(stop: Dict[str, Any]) -> Dict[str, Any]:
+    stop.pop("travel_min", None)
+    return stop
+
+def normalize_course(course: Any, rename: bool = True) -> Tuple[Any, List[str]]:
+    """
+    코스 하나의 필드명 변환(영문/한글 모두 허용) + 검증을 한 번의 순회로.
+    검증 항목: 스톱 수/필수 필드/enum/금지 접미사/카테고리 다양성/소요시간.
+    rename=True(모델 응답)면 travel_total_min/travel_min도 버립니다: 동선 계산(routing)만 채우는 값이라,
+    모델이 보낸 값으로 이동시간 검증이 걸리거나 로컬 보정이 막히지 않게.
+    rename=False면 변환 없이 한글 필드명만 인정(이미 변환된 결과의 검증, 캐시 저장 전 확인).
+    Returns: (한글 필드명 코스, 위반 규칙 문장 목록 — 빈 리스트면 통과)
+    """
+    if not isinstance(course, dict):
+        return course, ["코스가 객체가 아님"]
+    if rename:
+        course = _rename(course)
+        course.pop("travel_total_min", None)
+    errors: List[str] = []
+    name = course.get("코스명")
+    if not isinstance(name, str) or not name:
+        errors.append("코스명 누락")
+    stops = course.get("스톱")
+    if not isinstance(stops, list) or not (3 <= len(stops) <= 7):
+        return course, errors + ["스톱은 3~7개여야 함"]
+    if rename:
+        stops = course["스톱"] = [_strip_travel(_rename(stop)) if isinstance(stop, dict) else stop for stop in stops]
+    categories = set()
+    total_stop_minutes = 0
+    for j, stop in enumerate(stops, start=1):
+        if not isinstance(stop, dict):
+            errors.append(f"스톱{j}: 객체가 아님")
+            continue
+        missing = [key for key in _STOP_FIELDS if key not in stop]
+        if missing:
+            errors.append(f"스톱{j}: 필드 누락 {', '.join(missing)}")
+            continue
+        place = stop["장소명"]
+        if not isinstance(place, str) or not place:
+            errors.append(f"스톱{j}: 장소명 누락")
+        else:
+            place = place.strip()
+            if place.endswith(_FORBIDDEN_SUFFIX_TUPLE):
+                suffix = next(suffix for suffix in FORBIDDEN_SUFFIXES if place.endswith(suffix))
+                errors.append(f"스톱{j}: 장소명 '{stop['장소명']}'이(가) 포괄 지명 접미사 '{suffix}'로 끝남")
+        if not isinstance(stop["설명"], str) or not stop["설명"]:
+            errors.append(f"스톱{j}: 설명 누락")
+        minutes = stop["권장체류시간"]
+        if not isinstance(minutes, int) or not (15 <= minutes <= 240):
+            errors.append(f"스톱{j}: 권장체류시간은 15~240분 정수여야 함")
+        else:
+            total_stop_minutes += minutes
+        time_of_day, category = stop["권장시간대"], stop["카테고리"]
+        if not isinstance(time_of_day, str) or time_of_day not in _TIME_SET:
+            errors.append(f"스톱{j}: 권장시간대 '{time_of_day}'은(는) 허용값이 아님")
+        if not isinstance(category, str) or category not in _CATEGORY_SET:
+            errors.append(f"스톱{j}: 카테고리 '{category}'은(는) 허용값이 아님")
+        categories.add(category if isinstance(category, str) else repr(category))
+    if len(categories) < 2:
+        errors.append("카테고리가 2종류 이상이어야 함")
+    est = course.get("총예상소요시간")
+    travel = course.get("travel_total_min")
+    if not isinstance(est, int) or not (120 <= est <= 900):
+        errors.append("총예상소요시간은 120~900분 정수여야 함")
+    elif isinstance(travel, int):
+        # 동선 계산(routing)을 거친 코스: 체류시간 합 + 실제 이동시간
+        if est != total_stop_minutes + travel:
+            errors.append(f"총예상소요시간 {est}분이 체류시간 합({total_stop_minutes}분)+이동시간({travel}분)과 다름")
+    elif not (total_stop_minutes + 30 <= est <= total_stop_minutes + 120):
+        errors.append(f"총예상소요시간 {est}분이 체류시간 합({total_stop_minutes}분)+30~120분 범위 밖")
+    return course, errors
+
+def course_errors(course: Any) -> List[str]:
+    """
+    코스 하나에 대한 검증. 위반한 규칙을 사람이 읽을 수 있는 문장으로 모두 돌려줍니다. 빈 리스트면 통과.
+    필드명은 한글만 인정합니다(영문 필드명 응답은 normalize_course로 먼저 변환).
+    """
+    return normalize_course(course, rename=False)[1]
+
+def validate_course(course: Any) -> bool:
+    return not course_errors(course)
+
+def normalize_result(data: Any, rename: bool = True) -> Tuple[Any, Dict[Optional[int], List[str]]]:
+    """
+    응답 전체의 필드명 변환 + 검증(한 번의 순회). 배열 응답은 {"courses": [...]}로 감쌉니다.
+    Returns: (한글 필드명 결과, schema_errors와 같은 형식의 위반 목록)
+    """
+    if isinstance(data, list):
+        data = {"courses": data}
     if not isinstance(data, dict):
-        return False
+        return data, {None: ["응답이 객체가 아님"]}
+    if rename:
+        data = _rename(data)
     courses = data.get("courses")
     if not isinstance(courses, list) or len(courses) != 3:
+        return data, {None: ["courses는 정확히 3개여야 함"]}
+    errors: Dict[Optional[int], List[str]] = {}
+    normalized = []
+    for i, course in enumerate(courses):
+        course, found = normalize_course(course, rename)
+        normalized.append(course)
+        if found:
+            errors[i] = found
+    if rename:
+        data["courses"] = normalized
+    return data, errors
+
+def schema_errors(data: Any) -> Dict[Optional[int], List[str]]:
+    """
+    {코스 인덱스: 위반 규칙 목록}. 키 None은 응답 전체의 구조 오류(코스 수 등)로, 부분 수리가 불가능합니다.
+    한글 필드명만 인정하므로, 영문 필드명 결과는 캐시 등에 저장되지 않습니다.
+    """
+    if not isinstance(data, dict):
+        return {None: ["응답이 객체가 아님"]}
+    return normalize_result(data, rename=False)[1]
+
+def validate_course_schema(data: Dict[str, Any]) -> bool:
+    return not schema_errors(data)
+
+def fix_course_locally(course: Any) -> bool:
+    """
+    모델을 다시 부르지 않고 고칠 수 있는 규칙만 보정합니다(고쳤으면 True).
+    - 총예상소요시간: 체류시간 합 + 60분(이동 여유)으로 다시 계산해 120~900 범위에 맞춤
+    """
+    if not isinstance(course, dict) or not isinstance(course.get("스톱"), list) or "travel_total_min" in course:
+        return False
+    minutes = [stop.get("권장체류시간") for stop in course["스톱"] if isinstance(stop, dict)]
+    if len(minutes) != len(course["스톱"]) or not all(isinstance(m, int) and 15 <= m <= 240 for m in minutes):
+        return False
+    total = sum(minutes)
+    est = course.get("총예상소요시간")
+    if isinstance(est, int) and 120 <= est <= 900 and total + 30 <= est <= total + 120:
         return False
-    for course in courses:
-        if not isinstance(course, dict):
-            return False
-        stops = course.get("스톱")
-        if not isinstance(stops, list) or not (3 <= len(stops) <= 7):
-            return False
-        categories = set()
-        total_stop_minutes = 0
-        for stop in stops:
-            if not isinstance(stop, dict):
-                return False
-            for key in ["장소명", "설명", "권장체류시간", "권장시간대", "카테고리"]:
-                if key not in stop:
-                    return False
-            if not isinstance(stop["장소명"], str) or not stop["장소명"]:
-                return False
-            if not isinstance(stop["설명"], str) or not stop["설명"]:
-                return False
-            if not isinstance(stop["권장체류시간"], int) or not (15 <= stop["권장체류시간"] <= 240):
-                return False
-            if stop["권장시간대"] not in TIME_ENUM:
-                return False
-            if stop["카테고리"] not in CATEGORY_ENUM:
-                return False
-            for suffix in FORBIDDEN_SUFFIXES:
-                if stop["장소명"].strip().endswith(suffix):
-                    return False
-            categories.add(stop["카테고리"])
-            total_stop_minutes += stop["권장체류시간"]
-        if len(categories) < 2:
-            return False
-        est = course.get("총예상소요시간")
-        if not isinstance(est, int) or not (120 <= est <= 900):
-            return False
-        if not (total_stop_minutes + 30 <= est <= total_stop_minutes + 120):
-            return False
-        if not isinstance(course.get("코스명"), str) or not course["코스명"]:
-            return False
+    fixed = min(max(total + 60, 120), 900)
+    if not (120 <= fixed <= 900 and total + 30 <= fixed <= total + 120):
+        return False
+    course["총예상소요시간"] = fixed
     return True
 
-# 폴백 파서: 코드블록/본문/배열 추출
+# 폴백 파서: 설명문/코드블록이 섞인 응답에서 JSON 본문 추출
 
-def fallback_parse(text: str) -> Optional[Dict[str, Any]]:
-    # 코드블록 내 JSON 추출
-    codeblock = re.search(r"```(?:json)?\s*([\s\S]+?)```", text)
-    if codeblock:
-        text = codeblock.group(1)
-    # 배열만 응답 시
-    if text.strip().startswith("["):
-        try:
-            arr = json.loads(text)
-            return {"courses": arr}
-        except Exception:
-            pass
-    # 본문 {...} 또는 [...] 추출
-    obj_match = re.search(r"({[\s\S]+})", text)
-    arr_match = re.search(r"(\[[\s\S]+\])", text)
+_JSON_TOKEN_RE = re.compile(r'[{}\[\]"\\]')
+_JSON_OPENER_RE = re.compile(r"[{\[]")
+_JSON_DECODER = json.JSONDecoder()
+
+def _looks_like_courses(value: Any) -> bool:
+    return isinstance(value, list) or (isinstance(value, dict) and ("courses" in value or "course" in value))
+
+def extract_json(text: str) -> Any:
+    """
+    한 번의 훑기로 괄호 짝이 맞는 최상위 {...}/[...] 구간을 찾고, 구간이 닫힐 때마다 raw_decode를 한 번만 시도합니다.
+    구간끼리 겹치지 않으므로 전체 작업량은 응답 길이에 비례합니다(잘리거나 깨진 응답에서도).
+    JSON 바깥(설명문/코드펜스)의 따옴표와 짝이 안 맞는 괄호는 무시.
+    코스 목록으로 보이는 값(배열, courses/course 키가 있는 객체)을 우선 반환하고, 없으면 처음 해석된 값. 없으면 None.
+    """
+    # 빠른 경로: 첫 여는 괄호부터 바로 해석되는 흔한 경우(설명문/코드펜스 + 정상 JSON)는 C 디코더 한 번으로 끝
+    opener = _JSON_OPENER_RE.search(text)
+    if opener is None:
+        return None
     try:
-        if obj_match:
-            return json.loads(obj_match.group(1))
-        elif arr_match:
-            arr = json.loads(arr_match.group(1))
-            return {"courses": arr}
-    except Exception:
+        value, _ = _JSON_DECODER.raw_decode(text, opener.start())
+        if _looks_like_courses(value):
+            return value
+    except (ValueError, RecursionError):  # 너무 깊은 중첩도 해석 실패로
         pass
-    return None
+    first = None
+    depth_kinds: List[str] = []  # 열린 괄호 종류 스택
+    start = skip = -1
+    in_string = False
+    for m in _JSON_TOKEN_RE.finditer(text):
+        i, c = m.start(), m.group()
+        if i == skip:  # 이스케이프된 문자
+            continue
+        if in_string:
+            if c == "\\":
+                skip = i + 1
+            elif c == '"':
+                in_string = False
+            continue
+        if c == '"':
+            in_string = bool(depth_kinds)
+        elif c in "{[":
+            if not depth_kinds:
+                start = i
+            depth_kinds.append(c)
+        elif c in "}]" and depth_kinds:
+            if (c == "}") != (depth_kinds[-1] == "{"):
+                depth_kinds.clear()  # 짝이 안 맞는 구간은 버리고 다음 여는 괄호부터 다시
+                continue
+            depth_kinds.pop()
+            if depth_kinds:
+                continue
+            try:
+                value, _ = _JSON_DECODER.raw_decode(text, start)
+            except (ValueError, RecursionError):  # 너무 깊은 중첩도 해석 실패로
+                continue
+            if _looks_like_courses(value):
+                return value
+            if first is None:
+                first = value
+    return first
+
+def fallback_parse(text: str) -> Optional[Dict[str, Any]]:
+    """json.loads로 안 되는 응답 -> dict (배열만 있으면 {"courses": [...]}). 못 찾으면 None."""
+    value = extract_json(text)
+    if isinstance(value, list):
+        return {"courses": value}
+    return value if isinstance(value, dict) else None
 
 # 입력 폴백 로딩
 
@@ -217,93 +399,191 @@ def load_example_input() -> Dict[str, str]:
     with open(example_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-# 메인 함수
+# 프롬프트 구성
+# 정적 접두부(SYSTEM_PROMPT)는 모든 호출에서 바이트 단위로 같아야 OpenAI 프롬프트 캐시에 적중합니다.
+# 요청마다 달라지는 값(위치/날짜/시간/날씨)은 user 메시지 끝에만 둡니다.
 
-def get_place_recommendations(location: Optional[str] = None, date: Optional[str] = None, time_str: Optional[str] = None, weather_text: Optional[str] = None) -> Dict[str, Any]:
+EXAMPLE_RESULT = {
+    "courses": [
+        {
+            "코스명": "강남 브런치 코스",
+            "총예상소요시간": 300,
+            "스톱": [
+                {"장소명": "카페 드 파리 강남점", "설명": "분위기 좋은 브런치 카페", "권장체류시간": 60, "권장시간대": "아침", "카테고리": "카페"},
+                {"장소명": "봉은사", "설명": "조용한 분위기의 전통 사찰", "권장체류시간": 90, "권장시간대": "오후", "카테고리": "기타"},
+                {"장소명": "선릉과 정릉", "설명": "조용한 산책로와 역사적인 유적지", "권장체류시간": 90, "권장시간대": "오후", "카테고리": "공원"}
+            ]
+        },
+        {
+            "코스명": "강남 저녁 야경 코스",
+            "총예상소요시간": 360,
+            "스톱": [
+                {"장소명": "서울 스카이", "설명": "서울의 전경을 감상할 수 있는 전망대", "권장체류시간": 120, "권장시간대": "저녁", "카테고리": "야경"},
+                {"장소명": "한남동 소고기 전문점", "설명": "고급스러운 소고기를 즐길 수 있는 식당", "권장체류시간": 90, "권장시간대": "저녁", "카테고리": "식당"},
+                {"장소명": "이태원 바", "설명": "다양한 칵테일을 즐길 수 있는 바", "권장체류시간": 90, "권장시간대": "저녁", "카테고리": "바"}
+            ]
+        },
+        {
+            "코스명": "강남 밤 문화 탐방 코스",
+            "총예상소요시간": 330,
+            "스톱": [
+                {"장소명": "홍대 클럽", "설명": "젊은이들이 모이는 클럽", "권장체류시간": 120, "권장시간대": "밤", "카테고리": "액티비티"},
+                {"장소명": "이태원 펍", "설명": "다양한 맥주를 즐길 수 있는 펍", "권장체류시간": 90, "권장시간대": "밤", "카테고리": "바"},
+                {"장소명": "청담동 디저트 카페", "설명": "고급 디저트를 즐길 수 있는 카페", "권장체류시간": 60, "권장시간대": "밤", "카테고리": "카페"}
+            ]
+        }
+    ]
+}
+
+SYSTEM_PROMPT = (
+    "너는 반드시 한글로만 답한다. 제공된 JSON 스키마에 정확히 맞는 JSON만 반환한다(여분의 텍스트/주석/설명 금지).\n"
+    "규칙:\n"
+    "- 반드시 3개 코스, 각 코스는 3~7개 스톱\n"
+    "- 필드명: 코스명, 총예상소요시간, 스톱, 장소명, 설명, 권장체류시간, 권장시간대, 카테고리 (모든 필드명과 값은 한글)\n"
+    f"- 카테고리 값: {', '.join(CATEGORY_ENUM)} 중 하나\n"
+    f"- 권장시간대 값: {', '.join(TIME_ENUM)} 중 하나\n"
+    "- 권장체류시간은 15~240분, 총예상소요시간은 스톱 체류시간 합 + 이동시간 30~120분\n"
+    "- 행정동/상권/거리/타운/프라자 등 포괄 지명 금지, 지점명(브랜치명) 명확히\n"
+    "- 코스마다 카테고리 2종류 이상, 동선 합리성(이동 과도하지 않게) 고려\n"
+    "- 현재 시간대/요일에 어울리는 스팟 우선\n"
+    "- 비/눈/악천후 등 날씨에 따라 실내/실외/야경/카페/박물관 등 코스 구성을 다르게 추천\n"
+    "예시 JSON(구조와 필드명만 참고, 장소는 요청 위치에 맞게 새로 작성): "
+    + json.dumps(EXAMPLE_RESULT, ensure_ascii=False, separators=(",", ":"))
+)
+
+def build_prompts(location: str, date: str, time_str: str, weather_text: Optional[str], coords: Optional[Tuple[float, float]] = None) -> tuple[str, str]:
+    user_prompt = (
+        f"사용자의 현재 위치: {location}\n"
+        f"날짜: {date}\n"
+        f"현재 시간: {time_str}\n"
+        f"현지 날씨: {weather_text if weather_text else '날씨 정보 없음'}"
+    )
+    candidates = catalog_candidates_text(coords)
+    if candidates:
+        user_prompt += "\n" + candidates
+    return SYSTEM_PROMPT, user_prompt
+
+# 로컬 장소 카탈로그 접지 (카탈로그가 없으면 아무것도 하지 않음)
+CATALOG_CANDIDATE_RADIUS_M = float(os.getenv("CATALOG_CANDIDATE_RADIUS_M", "1500"))
+CATALOG_MATCHES = metrics.counter("place_catalog_matches_total", "카탈로그 장소명 대조 결과(verified=일치, corrected=이름 보정, conflict=보정하면 규칙 위반이라 생략, unknown=없음)", ("result",))
+
+def catalog_candidates_text(coords: Optional[Tuple[float, float]]) -> str:
+    """기준 좌표 주변의 실제 장소 후보를 프롬프트 한 줄로. 카탈로그/좌표가 없으면 ""."""
+    catalog = get_catalog()
+    if catalog is None or coords is None:
+        return ""
+    nearby = catalog.nearby(coords[0], coords[1], CATALOG_CANDIDATE_RADIUS_M, PLACE_CANDIDATES)
+    if not nearby:
+        return ""
+    return "주변 실제 장소 후보(가능하면 이 중에서 선택): " + ", ".join(f"{place.name}({place.category})" for place in nearby)
+
+def ground_courses(result: Dict[str, Any], coords: Optional[Tuple[float, float]], taken: Optional[Set[str]] = None) -> int:
     """
-    Returns:
-      {
-        "courses": [ ... ]
-      }
+    각 스톱의 장소명을 카탈로그와 대조합니다. 찾으면 카탈로그 표기로 보정하고 lat/lon(및 영업시간)을 붙임.
+    verified 필드: True(카탈로그에 있음) / False(없음). 카탈로그가 없으면 아무것도 안 함. 찾은 스톱 수를 반환.
+    검증을 통과한 결과에 적용하므로, 보정한 이름이 금지 접미사로 끝나거나 다른 스톱(taken: 이미 내보낸
+    코스의 정규화 장소명 포함)과 겹치면 보정하지 않고 카탈로그에 없는 것으로 둡니다.
     """
-    if location is None or date is None or time_str is None:
-        example = load_example_input()
-        location = example.get("location")
-        date = example.get("date")
-        time_str = example.get("time")
+    catalog = get_catalog()
+    if catalog is None:
+        return 0
+    lat, lon = coords if coords is not None else (None, None)
+    used = Counter(normalize_place_name(stop["장소명"]) for course in result.get("courses", []) for stop in course.get("스톱", []))
+    used.update(taken or ())
+    matched = 0
+    for course in result.get("courses", []):
+        for stop in course.get("스톱", []):
+            found = catalog.match(stop["장소명"], lat, lon)
+            if found is None:
+                stop["verified"] = False
+                CATALOG_MATCHES.inc("unknown")
+                continue
+            place, _ = found
+            old_key, new_key = normalize_place_name(stop["장소명"]), normalize_place_name(place.name)
+            if new_key != old_key and (place.name.strip().endswith(_FORBIDDEN_SUFFIX_TUPLE) or used[new_key]):
+                stop["verified"] = False
+                CATALOG_MATCHES.inc("conflict")
+                continue
+            CATALOG_MATCHES.inc("verified" if place.name == stop["장소명"] else "corrected")
+            used[old_key] -= 1
+            used[new_key] += 1
+            stop["장소명"] = place.name
+            stop["verified"] = True
+            stop["lat"], stop["lon"] = place.lat, place.lon
+            if place.opening_hours():
+                stop["opening_hours"] = place.opening_hours()
+            matched += 1
+    return matched
 
-    system_prompt = (
-        "너는 반드시 한글로만 답한다. 아래 스키마와 구조에 '정확히' 맞는 JSON만 반환한다. 모든 필드명, 카테고리, 시간대 값은 반드시 한글로 작성한다.\n"
-        "필드명: 코스명, 총예상소요시간, 스톱, 장소명, 설명, 권장체류시간, 권장시간대, 카테고리\n"
-        "카테고리 값: 카페, 식당, 박물관, 공원, 야경, 바, 액티비티, 기타\n"
-        "시간대 값: 아침, 오후, 저녁, 밤\n"
-        "반드시 3개 코스, 각 코스는 3~7개 스톱으로 구성되어야 하며, 모든 필드명과 값은 한글로 작성되어야 한다.\n"
-        "예시 JSON과 완전히 동일한 구조, 필드명, 값, 배열 개수를 따라야 한다.\n"
-        "예시 JSON: {\n  \"courses\": [\n    {\n      \"코스명\": \"강남 브런치 코스\",\n      \"총예상소요시간\": 360,\n      \"스톱\": [\n        {\n          \"장소명\": \"카페 드 파리\",\n          \"설명\": \"분위기 좋은 브런치 카페\",\n          \"권장체류시간\": 60,\n          \"권장시간대\": \"아침\",\n          \"카테고리\": \"카페\"\n        },\n        {\n          \"장소명\": \"봉은사\",\n          \"설명\": \"조용한 분위기의 전통 사찰\",\n          \"권장체류시간\": 90,\n          \"권장시간대\": \"오후\",\n          \"카테고리\": \"기타\"\n        },\n        {\n          \"장소명\": \"선릉과 정릉\",\n          \"설명\": \"조용한 산책로와 역사적인 유적지\",\n          \"권장체류시간\": 90,\n          \"권장시간대\": \"오후\",\n          \"카테고리\": \"공원\"\n        }\n      ]\n    },\n    {\n      \"코스명\": \"강남 저녁 야경 코스\",\n      \"총예상소요시간\": 420,\n      \"스톱\": [\n        {\n          \"장소명\": \"서울 스카이\",\n          \"설명\": \"서울의 전경을 감상할 수 있는 전망대\",\n          \"권장체류시간\": 120,\n          \"권장시간대\": \"저녁\",\n          \"카테고리\": \"야경\"\n        },\n        {\n          \"장소명\": \"한남동 소고기 전문점\",\n          \"설명\": \"고급스러운 소고기를 즐길 수 있는 식당\",\n          \"권장체류시간\": 90,\n          \"권장시간대\": \"저녁\",\n          \"카테고리\": \"식당\"\n        },\n        {\n          \"장소명\": \"이태원 바\",\n          \"설명\": \"다양한 칵테일을 즐길 수 있는 바\",\n          \"권장체류시간\": 90,\n          \"권장시간대\": \"저녁\",\n          \"카테고리\": \"바\"\n        }\n      ]\n    },\n    {\n      \"코스명\": \"강남 밤 문화 탐방 코스\",\n      \"총예상소요시간\": 360,\n      \"스톱\": [\n        {\n          \"장소명\": \"홍대 클럽\",\n          \"설명\": \"젊은이들이 모이는 클럽\",\n          \"권장체류시간\": 120,\n          \"권장시간대\": \"밤\",\n          \"카테고리\": \"액티비티\"\n        },\n        {\n          \"장소명\": \"이태원 펍\",\n          \"설명\": \"다양한 맥주를 즐길 수 있는 펍\",\n          \"권장체류시간\": 90,\n          \"권장시간대\": \"밤\",\n          \"카테고리\": \"바\"\n        },\n        {\n          \"장소명\": \"청담동 디저트 카페\",\n          \"설명\": \"고급 디저트를 즐길 수 있는 카페\",\n          \"권장체류시간\": 60,\n          \"권장시간대\": \"밤\",\n          \"카테고리\": \"카페\"\n        }\n      ]\n    }\n  ]\n}\n"
-        "예시와 구조, 필드명, 값, 배열 개수가 하나라도 다르면 반드시 실패.\n"
-        "비/눈/악천후 등 날씨에 따라 실내/실외/야경/카페/박물관 등 코스 구성을 다르게 추천.\n"
-        "오직 지정된 JSON 스키마와 구조에 '정확히' 맞춰 출력한다(여분의 텍스트/주석/설명 금지)."
-    )
-    user_prompt = f"""
-    사용자의 현재 위치: {location}
-    날짜: {date}
-    현재 시간: {time_str}
-    현지 날씨: {weather_text if weather_text else '날씨 정보 없음'}
-
-    요청:
-    - 반드시 3개 코스, 각 코스는 3~7개 스톱으로 구성
-    - 모든 필드명과 값은 한글로 작성
-    - 각 코스/스톱의 구조, 필드명, 값, 배열 개수는 예시 JSON과 완전히 동일하게 작성
-    - 각 스톱은 반드시 아래 한글 필드명만 사용: 장소명, 설명, 권장체류시간, 권장시간대, 카테고리
-    - 행정동/상권/거리/타운/프라자 등 포괄 지명 금지, 지점명(브랜치명) 명확히
-    - 카테고리 값은 반드시: 카페, 식당, 박물관, 공원, 야경, 바, 액티비티, 기타 중 하나
-    - 권장시간대 값은 반드시: 아침, 오후, 저녁, 밤 중 하나
-    - 카테고리 다양성 및 동선 합리성(이동 과도하지 않게) 고려
-    - 현재 시간대/요일에 어울리는 스팟 우선
-    - 출력은 제공된 JSON 스키마에 '정확히' 맞춰 반환
-    - 예시 JSON을 참고해 반드시 동일한 구조와 한글 필드명/값으로 반환
-    """
-
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    max_retries = 3
-    backoff = [0.8, 1.6, 3.2]
-    last_error = None
-    api_key = os.getenv("GOOGLE_MAPS_API_KEY", "")
-    for attempt in range(max_retries):
+OPENAI_MODEL = "gpt-4o-mini"
+OPENAI_TIMEOUT = 30  # 스트림 호출용. 일반 호출은 resilience.PROVIDERS["openai"/"openai_course"]의 적응형 타임아웃
+MAX_RETRIES = 3
+BACKOFF = [0.8, 1.6, 3.2]
+# JSON_SCHEMA를 response_format(구조화 출력)으로 전달할지 여부. 0이면 프롬프트+폴백 파서만 사용
+OPENAI_STRUCTURED_OUTPUT = os.getenv("OPENAI_STRUCTURED_OUTPUT", "1") == "1"
+# 규칙을 어긴 코스 하나를 다시 생성하는 최대 횟수 (이후에는 전체 재생성)
+COURSE_REPAIR_ATTEMPTS = int(os.getenv("COURSE_REPAIR_ATTEMPTS", "2"))
+# single: 한 번의 completion으로 3코스 / parallel: 테마별 코스 3개를 동시에 생성
+RECOMMEND_GENERATION_MODE = os.getenv("RECOMMEND_GENERATION_MODE", "single")
+
+PARSES = metrics.counter("recommend_parse_total", "GPT 응답 파싱 경로(json=바로 파싱, fallback=폴백 파서, failed=실패)", ("path",))
+VALIDATIONS = metrics.counter("recommend_validation_total", "생성 결과 검증(valid=그대로 통과, local_fix=로컬 보정 후 통과, repaired=코스 재생성 후 통과, invalid=실패)", ("outcome",))
+REPAIRS = metrics.counter("recommend_repairs_total", "스키마 위반 수리 횟수(local=로컬 보정, course=코스 단위 재생성, full=전체 재생성)", ("kind",))
+
+def completion_options(schema: Dict[str, Any]) -> Dict[str, Any]:
+    if not OPENAI_STRUCTURED_OUTPUT:
+        return {}
+    return {"response_format": {"type": "json_schema", "json_schema": schema}}
+
+def parse_payload(content: Optional[str]) -> Any:
+    """GPT 응답 본문 -> 파싱된 JSON 값(필드명 변환 전). json.loads 실패 시 extract_json 한 번. 못 찾으면 None."""
+    if content is None:
+        raise ValueError("GPT 응답이 없습니다.")
+    with stage("parse") as span:
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.4,
-                timeout=30
-            )
-            content = response.choices[0].message.content
-            if content is None:
-                raise ValueError("GPT 응답이 없습니다.")
-            # 1차 파싱
-            try:
-                result = json.loads(content)
-            except Exception:
-                result = fallback_parse(content)
-            # 영문/한글 필드명 모두 변환
-            result_kor = convert_fields_to_korean(result) if result else None
-            # 구조 보정 없이, 스키마 검증만 통과한 경우만 반환
-            if isinstance(result_kor, dict) and validate_course_schema(result_kor):
-                for course in result_kor.get("courses", []):
-                    for stop in course.get("스톱", []):
-                        place_name = stop.get("장소명") or stop.get("name")
-                        stop["photo_url"] = get_photo_url(place_name, api_key) if place_name else ""
-                result_kor["weather_text"] = weather_text
-                return result_kor
+            value = json.loads(content)
+            span.outcome = "json"
+        except (ValueError, RecursionError):  # 너무 깊은 중첩도 폴백 파서로
+            value = extract_json(content)
+            span.outcome = "fallback" if value is not None else "failed"
+    PARSES.inc(span.outcome)
+    return value
+
+def prepare_course(raw: Any) -> Tuple[Any, List[str]]:
+    """
+    코스 하나: 필드명 변환 + 검증, 위반이 있으면 로컬 보정 후 그 코스만 다시 검증.
+    Returns: (한글 필드명 코스, 남은 위반 목록)
+    """
+    course, errors = normalize_course(raw)
+    if errors and fix_course_locally(course):
+        REPAIRS.inc("local")
+        errors = course_errors(course)
+    return course, errors
+
+def fix_locally(result: Dict[str, Any], errors: Dict[Optional[int], List[str]]) -> int:
+    """
+    위반이 있는 코스에만 fix_course_locally를 적용하고, 보정한 코스만 다시 검증해 errors를 갱신합니다.
+    보정한 코스 수를 반환.
+    """
+    if None in errors:
+        return 0
+    fixed = 0
+    for index in list(errors):
+        if fix_course_locally(result["courses"][index]):
+            fixed += 1
+            found = course_errors(result["courses"][index])
+            if found:
+                errors[index] = found
             else:
-                last_error = f"스키마 미스매치: {content[:200]}"
-        except Exception as e:
-            last_error = str(e)
-        if attempt < max_retries - 1:
-            time.sleep(backoff[attempt])
+                del errors[index]
+    if fixed:
+        REPAIRS.inc("local", amount=fixed)
+    return fixed
+
+def describe_errors(errors: Dict[Optional[int], List[str]]) -> str:
+    return "; ".join(f"{'전체' if i is None else f'코스{i + 1}'}: {', '.join(found)}" for i, found in errors.items())
+
+def failure_result(last_error: Optional[str], weather_text: Optional[str]) -> Dict[str, Any]:
     # 최종 실패 시 (사진 없음)
     return {
         "courses": [
@@ -325,6 +605,353 @@ def get_place_recommendations(location: Optional[str] = None, date: Optional[str
         "weather_text": weather_text
     }
 
-# TODO: Naver/Kakao/Google Places API로 지점명/영업시간/좌표 검증 및 이동시간 추정.
+def resolve_inputs(location: Optional[str], date: Optional[str], time_str: Optional[str]) -> tuple[str, str, str]:
+    if location is None or date is None or time_str is None:
+        example = load_example_input()
+        location = example.get("location")
+        date = example.get("date")
+        time_str = example.get("time")
+    return location, date, time_str
+
+# 메인 함수
+
+def get_place_recommendations(location: Optional[str] = None, date: Optional[str] = None, time_str: Optional[str] = None, weather_text: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Returns:
+      {
+        "courses": [ ... ]
+      }
+    동기 호출용 래퍼 (생성/수리/사진 조회는 get_place_recommendations_async와 동일).
+    스크립트/테스트 등 이벤트 루프 밖에서만 사용. 실행 중인 루프(FastAPI, Jupyter 등) 안에서는
+    await get_place_recommendations_async(...)를 써야 합니다(RuntimeError).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(get_place_recommendations_async(location, date, time_str, weather_text=weather_text))
+    raise RuntimeError("get_place_recommendations는 동기 전용입니다. 이벤트 루프 안에서는 await get_place_recommendations_async(...)를 사용하세요.")
+
+# 사진 일괄 조회: 동시성 제한 + 이름 중복 제거 + 전체 시간 예산
+PHOTO_CONCURRENCY = int(os.getenv("PHOTO_CONCURRENCY", "8"))
+PHOTO_TIME_BUDGET = float(os.getenv("PHOTO_TIME_BUDGET", "5"))
+
+def stop_place_name(stop: Dict[str, Any]) -> Optional[str]:
+    return stop.get("장소명") or stop.get("name")
+
+async def fetch_photo_urls(place_names: List[str], api_key: str, concurrency: Optional[int] = None, time_budget: Optional[float] = None) -> Dict[str, str]:
+    """
+    장소명 목록 -> {장소명: photo_url}
+    - 같은 이름은 한 번만 조회하고, 공유 커넥션 풀(google_places) 위에서 최대 concurrency개씩 동시에 조회
+    - time_budget(초)이 지나면 남은 조회는 취소되고 결과에서 빠짐
+    """
+    concurrency = concurrency or PHOTO_CONCURRENCY
+    time_budget = PHOTO_TIME_BUDGET if time_budget is None else time_budget
+    unique_names = list(dict.fromkeys(name for name in place_names if name))
+    urls: Dict[str, str] = {}
+    if not unique_names:
+        return urls
+    if not PROVIDERS["google_places"].available():
+        # Places 브레이커가 열려 있으면 캐시에 있는 것만 쓰고 나머지 사진은 생략
+        for name in unique_names:
+            cached = await PHOTO_CACHE.aget(normalize_place_name(name))
+            if not is_missing(cached):
+                urls[name] = _photo_url(cached, api_key)
+        return urls
+
+    semaphore = asyncio.Semaphore(concurrency)
+    async with upstream_client("google_places") as client:
+        async def lookup(name: str) -> None:
+            async with semaphore:
+                urls[name] = await get_photo_url_async(name, api_key, client)
+
+        tasks = [asyncio.create_task(lookup(name)) for name in unique_names]
+        _, pending = await asyncio.wait(tasks, timeout=time_budget)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pending:
+            print(f"[사진 시간 예산 초과] {len(pending)}/{len(unique_names)}건 생략")
+    return urls
+
+async def enrich_photos_async(result: Dict[str, Any], api_key: str) -> None:
+    """
+    모든 스톱에 photo_url을 채웁니다. 시간 예산 안에 못 찾은 스톱은 "".
+    """
+    stops = [stop for course in result.get("courses", []) for stop in course.get("스톱", [])]
+    with stage("photos") as span:
+        urls = await fetch_photo_urls([stop_place_name(stop) for stop in stops], api_key)
+        span.outcome = "complete" if all(stop_place_name(stop) in urls for stop in stops) else "partial"
+    for stop in stops:
+        stop["photo_url"] = urls.get(stop_place_name(stop), "")
+
+TOKENS = metrics.counter("openai_tokens_total", "OpenAI 토큰 사용량(prompt/cached=prompt 중 캐시 적중분/completion)", ("kind",))
+REQUESTS = metrics.counter("openai_requests_total", "OpenAI chat completion 호출 수", ("mode",))
+REQUEST_SECONDS = metrics.counter("openai_request_seconds_total", "OpenAI 호출 소요시간 합(스트림은 첫 토큰까지)", ("mode",))
+
+def add_usage(usage: Optional[Dict[str, int]], response: Any) -> None:
+    """응답의 토큰 사용량을 usage 딕셔너리에 누적 (재시도분 포함)하고 토큰 지표에 반영."""
+    if getattr(response, "usage", None) is None:
+        return
+    details = getattr(response.usage, "prompt_tokens_details", None)
+    counts = {
+        "prompt_tokens": getattr(response.usage, "prompt_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+        "completion_tokens": getattr(response.usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(response.usage, "total_tokens", 0) or 0,
+    }
+    TOKENS.inc("prompt", amount=counts["prompt_tokens"])
+    TOKENS.inc("cached", amount=counts["cached_tokens"])
+    TOKENS.inc("completion", amount=counts["completion_tokens"])
+    if usage is None:
+        return
+    for field, count in counts.items():
+        usage[field] = usage.get(field, 0) + count
+
+def chat_messages(system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+class SharedOpenAI:
+    """
+    AsyncOpenAI 하나를 앱 수명 동안 공유(커넥션 풀/TLS 세션 재사용). FastAPI lifespan이 start()/aclose()를 호출합니다.
+    클라이언트는 첫 호출 때 만듦(키가 없어도 앱은 뜨고, 생성 요청만 실패).
+    """
+    def __init__(self):
+        self._client: Optional[AsyncOpenAI] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def aclose(self) -> None:
+        client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await client.close()
+
+    def shared(self) -> Optional[AsyncOpenAI]:
+        if self._loop is None or self._loop is not asyncio.get_running_loop():
+            return None
+        if self._client is None:
+            self._client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._client
+
+OPENAI_CLIENT = SharedOpenAI()
+
+@asynccontextmanager
+async def openai_client() -> AsyncIterator[AsyncOpenAI]:
+    """공유 클라이언트가 있으면 그대로 쓰고, 앱 밖(asyncio.run 등)에서는 임시 클라이언트를 열고 닫습니다."""
+    client = OPENAI_CLIENT.shared()
+    if client is not None:
+        yield client
+        return
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    try:
+        yield client
+    finally:
+        await client.close()
+
+# 같은 정적 접두부를 쓰는 요청을 같은 캐시 서버로 보내도록 하는 라우팅 힌트
+PROMPT_CACHE_KEY = os.getenv("OPENAI_PROMPT_CACHE_KEY", "course-recommendation-v1")
+
+async def chat_completion(client: AsyncOpenAI, system_prompt: str, user_prompt: str, schema: Dict[str, Any], usage: Optional[Dict[str, int]] = None, llm_slots: Optional[asyncio.Semaphore] = None) -> Any:
+    """
+    공통 completion 호출: 프롬프트 캐시 키/구조화 출력 옵션을 붙이고 소요시간과 토큰을 기록합니다.
+    llm_slots(배치의 OpenAI 동시 호출 제한)는 이 호출 동안만 잡습니다(검증/동선/사진/백오프 대기는 제외).
+    """
+    if llm_slots is not None:
+        async with llm_slots:
+            return await chat_completion(client, system_prompt, user_prompt, schema, usage)
+    started = time.perf_counter()
+    # 3코스 전체와 코스 하나짜리 호출은 지연 창(적응형 타임아웃)과 브레이커를 따로 씀
+    kind = "full" if schema is JSON_SCHEMA else "course"
+    with stage("llm") as span, PROVIDERS["openai" if kind == "full" else "openai_course"].guard() as timeout:
+        span.outcome = kind
+        response = await client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=chat_messages(system_prompt, user_prompt),
+            temperature=0.4,
+            timeout=timeout,
+            prompt_cache_key=PROMPT_CACHE_KEY,
+            **completion_options(schema)
+        )
+    REQUESTS.inc("complete")
+    REQUEST_SECONDS.inc("complete", amount=time.perf_counter() - started)
+    add_usage(usage, response)
+    return response
+
+async def request_course(client: AsyncOpenAI, system_prompt: str, prompt: str, usage: Optional[Dict[str, int]] = None, llm_slots: Optional[asyncio.Semaphore] = None) -> Optional[Dict[str, Any]]:
+    """코스 하나를 COURSE_SCHEMA로 요청. 로컬 보정 후 검증을 통과한 코스 또는 None (최대 COURSE_REPAIR_ATTEMPTS회)."""
+    for _ in range(COURSE_REPAIR_ATTEMPTS):
+        response = await chat_completion(client, system_prompt, prompt, COURSE_SCHEMA, usage, llm_slots)
+        parsed = parse_payload(response.choices[0].message.content)
+        course, errors = prepare_course(parsed.get("course", parsed) if isinstance(parsed, dict) else None)
+        if not errors:
+            return course
+    return None
+
+async def repair_course(client: AsyncOpenAI, system_prompt: str, user_prompt: str, result: Dict[str, Any], index: int, errors: List[str], usage: Optional[Dict[str, int]] = None, llm_slots: Optional[asyncio.Semaphore] = None) -> bool:
+    """
+    규칙을 어긴 코스 하나만 다시 생성해 result["courses"][index]를 교체합니다(성공하면 True).
+    시스템 프롬프트는 원래 요청과 같게 두고, 위반 내용과 나머지 코스(이름/장소)를 알려 겹치지 않게 합니다.
+    """
+    courses = result["courses"]
+    others = [course for k, course in enumerate(courses) if k != index and isinstance(course, dict)]
+    other_places = [stop_place_name(stop) for course in others for stop in course.get("스톱", []) if isinstance(stop, dict)]
+    violations = "\n".join(f"    - {error}" for error in errors)
+    repair_prompt = user_prompt + f"""
+    이전 응답의 {index + 1}번째 코스가 아래 규칙을 어겼습니다:
+{violations}
+    이전 코스: {json.dumps(courses[index], ensure_ascii=False)}
+    다른 코스({', '.join(course.get("코스명", "") for course in others)})와 겹치지 않게 이 코스 하나만 다시 작성해 {{"course": {{...}}}} 형식으로 반환
+    다른 코스에 이미 있는 장소는 쓰지 말 것: {', '.join(name for name in other_places if name)}
+    """
+    REPAIRS.inc("course")
+    course = await request_course(client, system_prompt, repair_prompt, usage, llm_slots)
+    if course is None:
+        return False
+    courses[index] = course
+    return True
+
+# 코스별 병렬 생성 모드의 테마 (코스 하나당 completion 하나)
+COURSE_THEMES = [
+    "낮 시간대 산책/카페/공원 위주 코스",
+    "저녁 식사와 야경 위주 코스",
+    "날씨와 상관없이 즐길 수 있는 실내(박물관/카페/액티비티) 위주 코스",
+]
+
+def cross_course_errors(courses: List[Dict[str, Any]]) -> Dict[int, List[str]]:
+    """
+    코스 간 중복/다양성 검사 (모델 호출 없음). 앞선 코스와 겹치는 뒤쪽 코스에만 위반을 기록합니다.
+    - 같은 장소(정규화한 장소명)가 두 코스 이상에 등장
+    - 코스명이 같음
+    - 카테고리 구성이 완전히 같음
+    """
+    errors: Dict[int, List[str]] = {}
+    seen_places: Dict[str, int] = {}
+    seen_names: Dict[str, int] = {}
+    seen_categories: Dict[tuple, int] = {}
+    for i, course in enumerate(courses):
+        found: List[str] = []
+        for stop in course["스톱"]:
+            key = normalize_place_name(stop["장소명"])
+            if seen_places.get(key, i) != i:
+                found.append(f"장소 '{stop['장소명']}'이(가) 코스{seen_places[key] + 1}와 중복")
+            seen_places.setdefault(key, i)
+        name = course["코스명"].strip()
+        if name in seen_names:
+            found.append(f"코스명이 코스{seen_names[name] + 1}와 같음")
+        seen_names.setdefault(name, i)
+        categories = tuple(sorted(stop["카테고리"] for stop in course["스톱"]))
+        if categories in seen_categories:
+            found.append(f"카테고리 구성이 코스{seen_categories[categories] + 1}와 같음")
+        seen_categories.setdefault(categories, i)
+        if found:
+            errors[i] = found
+    return errors
+
+def theme_prompt(user_prompt: str, theme: str) -> str:
+    return user_prompt + f"""
+    이번 요청에서는 코스 1개만 작성: 주제는 '{theme}'
+    {{"course": {{...}}}} 형식으로 반환
+    """
+
+async def generate_courses_parallel(client: AsyncOpenAI, system_prompt: str, user_prompt: str, usage: Optional[Dict[str, int]] = None, llm_slots: Optional[asyncio.Semaphore] = None) -> tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    코스별 병렬 생성: 테마마다 짧은 completion을 동시에 보내므로 지연시간은 가장 느린 코스 하나에 가깝습니다.
+    코스 간 중복이 있으면 뒤쪽 코스만 다시 생성합니다. Returns: generate_courses와 같음
+    """
+    generated = await asyncio.gather(*(
+        request_course(client, system_prompt, theme_prompt(user_prompt, theme), usage, llm_slots) for theme in COURSE_THEMES
+    ))
+    failed = [COURSE_THEMES[i] for i, course in enumerate(generated) if course is None]
+    if failed:
+        return None, f"코스 생성 실패: {', '.join(failed)}"
+    result_kor = {"courses": list(generated)}
+    duplicates = cross_course_errors(result_kor["courses"])
+    if duplicates:
+        print(f"[코스 간 중복 수리] {describe_errors(duplicates)}")
+        await asyncio.gather(*(
+            repair_course(client, system_prompt, user_prompt, result_kor, index, found, usage, llm_slots)
+            for index, found in duplicates.items()
+        ))
+        duplicates = cross_course_errors(result_kor["courses"])
+        if duplicates:
+            return None, f"코스 간 중복: {describe_errors(duplicates)}"
+    return result_kor, None
+
+async def generate_courses(client: AsyncOpenAI, system_prompt: str, user_prompt: str, usage: Optional[Dict[str, int]] = None, llm_slots: Optional[asyncio.Semaphore] = None) -> tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    한 번의 생성 시도: 전체 생성 -> 로컬 보정 -> 남은 위반 코스만 병렬로 재생성.
+    Returns: (검증 통과한 결과 또는 None, 실패 사유)
+    """
+    response = await chat_completion(client, system_prompt, user_prompt, JSON_SCHEMA, usage, llm_slots)
+    content = response.choices[0].message.content
+    parsed = parse_payload(content)
+    if parsed is None:
+        return None, f"스키마 미스매치: {content[:200]}"
+    with stage("validate") as span:
+        # 필드명 변환 + 검증은 한 번의 순회, 보정한 코스만 다시 검증
+        result_kor, errors = normalize_result(parsed)
+        fixed = fix_locally(result_kor, errors)
+        span.outcome = "invalid" if errors else ("local_fix" if fixed else "valid")
+    if None in errors:
+        VALIDATIONS.inc("invalid")
+        return None, f"스키마 미스매치: {describe_errors(errors)}"
+    if errors:
+        print(f"[코스 단위 수리] {describe_errors(errors)}")
+        await asyncio.gather(*(
+            repair_course(client, system_prompt, user_prompt, result_kor, index, found, usage, llm_slots)
+            for index, found in errors.items()
+        ))
+        errors = schema_errors(result_kor)
+        if errors:
+            VALIDATIONS.inc("invalid")
+            return None, f"스키마 미스매치: {describe_errors(errors)}"
+        VALIDATIONS.inc("repaired")
+        return result_kor, None
+    VALIDATIONS.inc(span.outcome)
+    return result_kor, None
+
+async def get_place_recommendations_async(location: Optional[str] = None, date: Optional[str] = None, time_str: Optional[str] = None, weather_text: Optional[str] = None, usage: Optional[Dict[str, int]] = None, mode: Optional[str] = None, coords: Optional[Tuple[float, float]] = None, llm_slots: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """
+    get_place_recommendations의 비동기 버전(AsyncOpenAI + asyncio.sleep 백오프 + 비동기 사진 조회).
+    /recommend에서 await 하므로 생성 중에도 다른 요청이 같은 워커에서 처리됩니다.
+    규칙 위반은 로컬 보정 -> 코스 단위 재생성으로 먼저 고치고, 그래도 안 되면 전체를 다시 생성합니다.
+    mode: "single"(한 번에 3코스) 또는 "parallel"(코스별 동시 생성). 기본값은 RECOMMEND_GENERATION_MODE.
+    coords: 지오코딩된 (lat, lon). 장소 카탈로그가 있으면 주변 후보를 프롬프트에 넣고 결과 장소명을 대조/보정하며,
+            좌표가 붙은 코스는 동선을 최적화하고 총예상소요시간을 실제 이동시간으로 다시 계산합니다.
+    usage를 넘기면 모든 시도의 토큰 사용량이 누적됩니다.
+    llm_slots: OpenAI 동시 호출 제한(배치). completion 호출 동안만 잡습니다.
+    """
+    generate = generate_courses_parallel if (mode or RECOMMEND_GENERATION_MODE) == "parallel" else generate_courses
+    location, date, time_str = resolve_inputs(location, date, time_str)
+    system_prompt, user_prompt = build_prompts(location, date, time_str, weather_text, coords)
+
+    last_error = None
+    api_key = os.getenv("GOOGLE_MAPS_API_KEY", "")
+    for attempt in range(MAX_RETRIES):
+        try:
+            async with openai_client() as client:
+                result_kor, last_error = await generate(client, system_prompt, user_prompt, usage, llm_slots)
+            if result_kor is not None:
+                ground_courses(result_kor, coords)
+                route_courses(result_kor, coords)
+                await enrich_photos_async(result_kor, api_key)
+                result_kor["weather_text"] = weather_text
+                return result_kor
+        except CircuitOpenError as e:
+            # OpenAI 브레이커가 열려 있으면 재시도/백오프 없이 바로 실패 응답
+            last_error = e.detail
+            break
+        except Exception as e:
+            last_error = str(e)
+        if attempt < MAX_RETRIES - 1:
+            REPAIRS.inc("full")
+            await asyncio.sleep(BACKOFF[attempt])
+    return failure_result(last_error, weather_text)
+
+# TODO: Naver/Kakao/Google Places API로 지점명/영업시간/좌표 검증 (로컬 카탈로그/동선 계산은 place_catalog.py, routing.py).
 # TODO: 좌표 기반 반경 및 영업 중 필터, 시간대별 가중치.
 # TODO: 로깅/샘플링 및 품질 지표 대시보드.
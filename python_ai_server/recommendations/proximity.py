@@ -0,0 +1,185 @@
+# proximity.py
+# 근접 재사용: 반경 안에서 최근 생성된 유효 결과(같은 날짜/시간대/날씨 상태)를 GPT 호출 없이 재사용
+# 주소 표기만 다른 요청("강남역" vs "역삼동 8xx")은 정확 키 캐시(result_cache)에서 놓치므로 좌표로 한 번 더 찾습니다.
+import copy, math, os, time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from python_ai_server import metrics
+from python_ai_server.recommendations.places import validate_course_schema
+from python_ai_server.recommendations.result_cache import Generator, normalize_condition, time_of_day_bucket
+
+PROXIMITY_RADIUS_M = float(os.getenv("PROXIMITY_RADIUS_M", "500"))       # 재사용 반경(m)
+PROXIMITY_MAX_AGE = float(os.getenv("PROXIMITY_MAX_AGE", "1800"))        # 이보다 오래된 결과는 재사용 안 함(초)
+PROXIMITY_INDEX_SIZE = int(os.getenv("PROXIMITY_INDEX_SIZE", "5000"))    # 최대 항목 수(넘치면 오래된 것부터 제거)
+PROXIMITY_REBUILD_EVERY = int(os.getenv("PROXIMITY_REBUILD_EVERY", "500"))  # 제거된 항목이 이만큼 쌓이면 버킷 재구성
+
+EARTH_RADIUS_M = 6371008.8
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+def geohash_cell_m(precision: int, lat: float = 60.0) -> Tuple[float, float]:
+    """geohash 셀의 (남북 높이, 동서 폭) m. 폭은 위도 lat에서의 값(기본 60°: 국내보다 보수적)."""
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    height = 180.0 / 2 ** lat_bits * math.pi / 180 * EARTH_RADIUS_M
+    width = 360.0 / 2 ** lon_bits * math.pi / 180 * EARTH_RADIUS_M * math.cos(math.radians(lat))
+    return height, width
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+@dataclass
+class _Nearby:
+    lat: float
+    lon: float
+    key: Tuple[str, str, str]  # (날짜, 시간대, 날씨 상태)
+    result: Dict[str, Any]
+    tokens: int
+    created_at: float
+    cell: str
+
+class ProximityIndex:
+    """
+    geohash 버킷 공간 색인. 셀 크기가 반경 이상이 되도록 정밀도를 고르므로,
+    조회점 주변 3x3(반경 간격) 표본점이 속한 셀만 보면 반경 안의 모든 항목을 찾습니다.
+    - 만료(max_age)된 항목은 추가/조회 때 오래된 쪽부터 제거(삽입 순 = 생성 순), 항목 수가 maxsize를 넘어도 오래된 것부터 제거
+    - 이렇게 제거돼 버킷에 빈 자리가 rebuild_every개 쌓이면 살아 있는 항목만으로 버킷을 다시 만듦
+    """
+    def __init__(self, radius_m: float = PROXIMITY_RADIUS_M, max_age: float = PROXIMITY_MAX_AGE, maxsize: int = PROXIMITY_INDEX_SIZE, rebuild_every: int = PROXIMITY_REBUILD_EVERY):
+        self.radius_m = radius_m
+        self.max_age = max_age
+        self.maxsize = maxsize
+        self.rebuild_every = rebuild_every
+        self.precision = max([p for p in range(1, 10) if min(geohash_cell_m(p)) >= radius_m] or [1])
+        self._entries: "OrderedDict[int, _Nearby]" = OrderedDict()  # 삽입 순 = 오래된 순
+        self._buckets: Dict[str, List[int]] = {}
+        self._next_id = 0
+        self._dead = 0
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "inserts": 0, "evictions": 0, "expirations": 0, "rebuilds": 0, "saved_tokens": 0}
+
+    @staticmethod
+    def _key(date: str, time_str: str, condition: Optional[str]) -> Tuple[str, str, str]:
+        return date.replace("-", ""), time_of_day_bucket(time_str), normalize_condition(condition)
+
+    def _cells(self, lat: float, lon: float) -> List[str]:
+        dlat = math.degrees(self.radius_m / EARTH_RADIUS_M)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        return list(dict.fromkeys(
+            geohash(lat + i * dlat, lon + j * dlon, self.precision) for i in (-1, 0, 1) for j in (-1, 0, 1)
+        ))
+
+    def add(self, lat: float, lon: float, date: str, time_str: str, condition: Optional[str], result: Dict[str, Any], tokens: int = 0) -> bool:
+        if not validate_course_schema(result):
+            return False
+        cell = geohash(lat, lon, self.precision)
+        entry_id = self._next_id
+        self._next_id += 1
+        now = time.time()
+        self._entries[entry_id] = _Nearby(lat, lon, self._key(date, time_str, condition), copy.deepcopy(result), tokens, now, cell)
+        self._buckets.setdefault(cell, []).append(entry_id)
+        self.stats["inserts"] += 1
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+            self._dead += 1
+        self._expire(now)
+        return True
+
+    def _expire(self, now: float) -> None:
+        oldest = now - self.max_age
+        while self._entries:
+            entry_id, entry = next(iter(self._entries.items()))
+            if entry.created_at >= oldest:
+                break
+            del self._entries[entry_id]
+            self.stats["expirations"] += 1
+            self._dead += 1
+        if self._dead >= self.rebuild_every:
+            self.rebuild()
+
+    def find(self, lat: float, lon: float, date: str, time_str: str, condition: Optional[str]) -> Optional[Tuple[Dict[str, Any], float, float]]:
+        """반경/신선도/키 조건을 만족하는 가장 가까운 결과의 (복사본, 거리 m, 생성 시각). 없으면 None."""
+        key = self._key(date, time_str, condition)
+        now = time.time()
+        self._expire(now)
+        oldest = now - self.max_age
+        best: Optional[_Nearby] = None
+        best_distance = self.radius_m
+        for cell in self._cells(lat, lon):
+            for entry_id in self._buckets.get(cell, ()):
+                entry = self._entries.get(entry_id)
+                if entry is None or entry.key != key or entry.created_at < oldest:
+                    continue
+                distance = haversine_m(lat, lon, entry.lat, entry.lon)
+                if distance <= best_distance:
+                    best, best_distance = entry, distance
+        if best is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self.stats["saved_tokens"] += best.tokens
+        return copy.deepcopy(best.result), best_distance, best.created_at
+
+    def rebuild(self) -> None:
+        """만료된 항목을 지우고 살아 있는 항목만으로 버킷을 다시 구성."""
+        oldest = time.time() - self.max_age
+        for entry_id in [i for i, entry in self._entries.items() if entry.created_at < oldest]:
+            del self._entries[entry_id]
+        buckets: Dict[str, List[int]] = {}
+        for entry_id, entry in self._entries.items():
+            buckets.setdefault(entry.cell, []).append(entry_id)
+        self._buckets = buckets
+        self._dead = 0
+        self.stats["rebuilds"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def reuse_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+NEARBY_RESULTS = ProximityIndex()
+
+async def reuse_or_generate(index: ProximityIndex, lat: float, lon: float, date: str, time_str: str, condition: Optional[str], generate: Generator) -> Tuple[Dict[str, Any], int, float]:
+    """
+    Generator를 감싸 근접 결과가 있으면 그대로 돌려주고(토큰 0, 원래 생성 시각), 없으면 생성해 색인에 추가합니다.
+    result_cache의 생성 함수 자리에 그대로 넣을 수 있습니다.
+    """
+    found = index.find(lat, lon, date, time_str, condition)
+    if found is not None:
+        result, _, created_at = found
+        return result, 0, created_at
+    result, tokens, created_at = await generate()
+    index.add(lat, lon, date, time_str, condition, result, tokens)
+    return result, tokens, created_at
+
+metrics.counter(
+    "proximity_reuse_total", "근접 재사용 색인 이벤트(hits/misses/inserts/evictions/expirations/rebuilds)", ("event",),
+    fn=lambda: {(event,): count for event, count in NEARBY_RESULTS.stats.items() if event != "saved_tokens"},
+)
+metrics.counter("proximity_reuse_saved_tokens_total", "근접 재사용으로 아낀 OpenAI 토큰 수", fn=lambda: {(): NEARBY_RESULTS.stats["saved_tokens"]})
+metrics.gauge("proximity_reuse_ratio", "근접 재사용률(정확 키 캐시 미스 중 재사용된 비율)", fn=lambda: {(): NEARBY_RESULTS.reuse_rate()})
+metrics.gauge("proximity_index_entries", "근접 재사용 색인 항목 수", fn=lambda: {(): len(NEARBY_RESULTS)})
@@ -0,0 +1,139 @@
+# result_cache.py
+# /recommend 전체 결과 캐시 (격자 셀 + 날짜 + 시간대 + 날씨 상태) / stale-while-revalidate
+import asyncio, copy, os, time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from python_ai_server import metrics
+from python_ai_server.cache import LRUCache
+from python_ai_server.recommendations.places import validate_course_schema
+from python_ai_server.singleflight import SingleFlight
+
+RECOMMEND_CACHE_TTL = float(os.getenv("RECOMMEND_CACHE_TTL", "1800"))           # 이 시간 동안은 그대로 반환
+RECOMMEND_CACHE_STALE_TTL = float(os.getenv("RECOMMEND_CACHE_STALE_TTL", "3600"))  # 그 뒤 이만큼은 반환하면서 백그라운드 갱신
+RECOMMEND_CACHE_SIZE = int(os.getenv("RECOMMEND_CACHE_SIZE", "1000"))
+
+RecommendKey = Tuple[int, int, str, str, str]
+# 생성 함수: (결과, 사용 토큰 수, 생성 시각). 근접 재사용 결과는 원래 생성 시각을 그대로 넘겨 신선도가 늘어나지 않게 함
+Generator = Callable[[], Awaitable[Tuple[Dict[str, Any], int, float]]]
+
+def time_of_day_bucket(time_str: str) -> str:
+    """'HH:MM' -> 권장시간대 enum(아침/오후/저녁/밤)."""
+    digits = time_str.replace(":", "")
+    hour = int(digits[:2]) if len(digits) >= 2 and digits[:2].isdigit() else 12
+    if 5 <= hour < 12:
+        return "아침"
+    if 12 <= hour < 17:
+        return "오후"
+    if 17 <= hour < 21:
+        return "저녁"
+    return "밤"
+
+def normalize_condition(condition: Optional[str]) -> str:
+    """날씨 문구(KMA/Open-Meteo 표기 모두) -> 맑음/흐림/비/눈/알수없음."""
+    if not condition:
+        return "알수없음"
+    if "눈" in condition:
+        return "눈"
+    if any(word in condition for word in ("비", "소나기", "뇌우")):
+        return "비"
+    if any(word in condition for word in ("흐림", "구름", "안개")):
+        return "흐림"
+    if "맑음" in condition:
+        return "맑음"
+    return "알수없음"
+
+def make_key(nx: int, ny: int, date: str, time_str: str, condition: Optional[str]) -> RecommendKey:
+    return nx, ny, date.replace("-", ""), time_of_day_bucket(time_str), normalize_condition(condition)
+
+@dataclass
+class _Entry:
+    result: Dict[str, Any]
+    tokens: int
+    fresh_until: float
+
+class RecommendationCache:
+    """
+    스키마 검증을 통과한 결과만 저장합니다("생성 실패" 폴백은 저장 안 함).
+    - fresh: 그대로 반환
+    - stale: 그대로 반환하고 같은 키의 갱신 작업을 백그라운드로 한 번만 실행
+    - miss: 생성 결과를 기다림. 같은 키로 동시에 들어온 요청은 생성 작업 하나를 공유하며,
+      기다리던 클라이언트가 끊겨도 공유 작업은 끝까지 실행돼 캐시에 저장됩니다.
+    """
+    def __init__(self, maxsize: int = RECOMMEND_CACHE_SIZE, ttl: float = RECOMMEND_CACHE_TTL, stale_ttl: float = RECOMMEND_CACHE_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = LRUCache(maxsize)
+        self._refreshing: Set[RecommendKey] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._flight = SingleFlight("recommend")
+        self.stats: Dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "saved_tokens": 0, "rejected": 0}
+
+    def store(self, key: RecommendKey, result: Dict[str, Any], tokens: int, created_at: Optional[float] = None) -> bool:
+        """created_at(기본 지금)부터 ttl 동안 fresh, 이후 stale_ttl 동안 stale. 이미 그 기간이 지났으면 저장하지 않음."""
+        if not validate_course_schema(result):
+            self.stats["rejected"] += 1
+            return False
+        created_at = time.time() if created_at is None else created_at
+        expires_at = created_at + self.ttl + self.stale_ttl
+        if expires_at <= time.time():
+            return False
+        self._entries.set_until(key, _Entry(copy.deepcopy(result), tokens, created_at + self.ttl), expires_at)
+        return True
+
+    def peek(self, key: RecommendKey) -> Optional[Dict[str, Any]]:
+        """신선한 항목이 있으면 복사본을 반환(적중으로 집계). 없거나 stale이면 None."""
+        entry: Optional[_Entry] = self._entries.get(key)
+        if entry is None or entry.fresh_until <= time.time():
+            return None
+        self.stats["hits"] += 1
+        self.stats["saved_tokens"] += entry.tokens
+        return copy.deepcopy(entry.result)
+
+    async def _refresh(self, key: RecommendKey, generate: Generator) -> None:
+        try:
+            result, tokens, created_at = await generate()
+            self.store(key, result, tokens, created_at)
+            self.stats["refreshes"] += 1
+        except Exception as e:
+            print(f"[추천 캐시 갱신 실패] {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def get_or_generate(self, key: RecommendKey, generate: Generator) -> Dict[str, Any]:
+        entry: Optional[_Entry] = self._entries.get(key)
+        if entry is not None:
+            if entry.fresh_until > time.time():
+                self.stats["hits"] += 1
+            else:
+                self.stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    task = asyncio.create_task(self._refresh(key, generate))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            self.stats["saved_tokens"] += entry.tokens
+            return copy.deepcopy(entry.result)
+
+        self.stats["misses"] += 1
+
+        async def load() -> Dict[str, Any]:
+            result, tokens, created_at = await generate()
+            self.store(key, result, tokens, created_at)
+            return result
+
+        # 공유 결과는 호출자마다 복사 (호출 측에서 weather_text 등을 덮어씀)
+        return copy.deepcopy(await self._flight.do(key, load))
+
+    def hit_rate(self) -> float:
+        served = self.stats["hits"] + self.stats["stale_hits"]
+        total = served + self.stats["misses"]
+        return served / total if total else 0.0
+
+RECOMMEND_CACHE = RecommendationCache()
+
+metrics.counter(
+    "recommend_cache_total", "추천 결과 캐시 이벤트(hits/stale_hits/misses/refreshes/rejected)", ("event",),
+    fn=lambda: {(event,): count for event, count in RECOMMEND_CACHE.stats.items() if event != "saved_tokens"},
+)
+metrics.counter("recommend_cache_saved_tokens_total", "캐시 적중으로 아낀 OpenAI 토큰 수", fn=lambda: {(): RECOMMEND_CACHE.stats["saved_tokens"]})
+metrics.gauge("recommend_cache_hit_ratio", "추천 결과 캐시 적중률(stale 포함)", fn=lambda: {(): RECOMMEND_CACHE.hit_rate()})
@@ -0,0 +1,110 @@
+# routing.py
+# 코스 동선 최적화 (외부 경로 API 없음)
+# 스톱 좌표로 이동시간 행렬을 한 번에 만들고, 권장시간대 순서(아침 -> 오후 -> 저녁 -> 밤)를 지키는
+# 최단 방문 순서를 부분집합 DP(Held-Karp)로 구한 뒤 총예상소요시간을 체류시간 + 실제 이동시간으로 다시 계산합니다.
+import math, os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from python_ai_server import metrics
+
+ROUTE_DETOUR = float(os.getenv("ROUTE_DETOUR", "1.3"))                  # 직선거리 -> 실제 경로 거리 보정 계수
+ROUTE_WALK_MAX_M = float(os.getenv("ROUTE_WALK_MAX_M", "1200"))         # 이 거리(경로 기준) 이하는 도보
+ROUTE_WALK_M_PER_MIN = float(os.getenv("ROUTE_WALK_M_PER_MIN", "70"))   # 도보 약 4.2km/h
+ROUTE_TRANSIT_M_PER_MIN = float(os.getenv("ROUTE_TRANSIT_M_PER_MIN", "300"))  # 대중교통/차량 약 18km/h
+ROUTE_TRANSIT_OVERHEAD_MIN = float(os.getenv("ROUTE_TRANSIT_OVERHEAD_MIN", "8"))  # 대기/환승
+ROUTE_MAX_STOPS = 7  # 2^n * n^2 DP. 스키마상 최대 스톱 수
+
+EARTH_RADIUS_M = 6371008.8
+_TIME_RANK = {"아침": 0, "오후": 1, "저녁": 2, "밤": 3}
+
+ROUTES = metrics.counter("route_optimizations_total", "동선 최적화 결과(reordered=순서 변경, kept=기존 순서가 최적, skipped=좌표 없음, out_of_range=총시간이 범위 밖이라 미적용)", ("result",))
+
+def travel_minutes(lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """n개 지점 -> (n, n) 이동시간(분) 행렬. 한 번의 벡터 연산."""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    route_m = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0))) * ROUTE_DETOUR
+    return np.where(
+        route_m <= ROUTE_WALK_MAX_M,
+        route_m / ROUTE_WALK_M_PER_MIN,
+        ROUTE_TRANSIT_OVERHEAD_MIN + route_m / ROUTE_TRANSIT_M_PER_MIN,
+    )
+
+def best_order(minutes: Sequence[Sequence[float]], ranks: Sequence[int], start: Optional[Sequence[float]] = None) -> List[int]:
+    """
+    이동시간 합이 최소인 방문 순서(경로, 원점 복귀 없음). ranks가 줄어들지 않는 순서만 허용.
+    start: 출발점에서 각 스톱까지의 이동시간(첫 스톱 선택에만 반영). 없으면 아무 스톱에서나 시작.
+    """
+    n = len(ranks)
+    full = (1 << n) - 1
+    inf = math.inf
+    cost = [[inf] * n for _ in range(full + 1)]
+    parent = [[-1] * n for _ in range(full + 1)]
+    for j in range(n):
+        cost[1 << j][j] = start[j] if start is not None else 0.0
+    for mask in range(1, full + 1):
+        row = cost[mask]
+        for i in range(n):
+            base = row[i]
+            if base == inf:
+                continue
+            leg = minutes[i]
+            for j in range(n):
+                if mask & (1 << j) or ranks[j] < ranks[i]:
+                    continue
+                nxt = mask | (1 << j)
+                total = base + leg[j]
+                if total < cost[nxt][j]:
+                    cost[nxt][j] = total
+                    parent[nxt][j] = i
+    last = min(range(n), key=lambda j: cost[full][j])
+    order, mask = [], full
+    while last != -1:
+        order.append(last)
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    return order[::-1]
+
+def _coords(stop: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    lat, lon = stop.get("lat"), stop.get("lon")
+    if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+        return float(lat), float(lon)
+    return None
+
+def route_course(course: Dict[str, Any], origin: Optional[Tuple[float, float]] = None) -> bool:
+    """
+    모든 스톱에 lat/lon이 있을 때만 동작(장소 카탈로그 접지 후). 스톱 순서를 바꾸고
+    스톱별 travel_min(직전 스톱에서 오는 이동시간), 코스별 travel_total_min을 채웁니다.
+    총예상소요시간 = 체류시간 합 + travel_total_min. 120~900분 범위를 벗어나면 순서/이동시간/총시간 모두
+    기존 그대로 둡니다(일부만 바꾸면 총시간과 순서가 어긋남). 처리했으면 True.
+    """
+    stops = course.get("스톱", [])
+    coords = [_coords(stop) for stop in stops]
+    if not stops or len(stops) > ROUTE_MAX_STOPS or any(c is None for c in coords):
+        ROUTES.inc("skipped")
+        return False
+    points = coords + ([origin] if origin is not None else [])
+    matrix = travel_minutes([p[0] for p in points], [p[1] for p in points])
+    n = len(stops)
+    ranks = [_TIME_RANK.get(stop.get("권장시간대"), 0) for stop in stops]
+    order = best_order(matrix[:n, :n].tolist(), ranks, matrix[n, :n].tolist() if origin is not None else None)
+
+    # 스톱별 이동시간을 먼저 반올림하고 그 합을 총 이동시간으로 (스톱 값의 합 == travel_total_min)
+    legs = [round(float(matrix[order[k - 1], i])) if k else 0 for k, i in enumerate(order)]
+    travel = sum(legs)
+    total = sum(stop["권장체류시간"] for stop in stops) + travel
+    if not 120 <= total <= 900:
+        ROUTES.inc("out_of_range")
+        return False
+    ROUTES.inc("kept" if order == list(range(n)) else "reordered")
+    for i, leg in zip(order, legs):
+        stops[i]["travel_min"] = leg
+    course["스톱"] = [stops[i] for i in order]
+    course["travel_total_min"] = travel
+    course["총예상소요시간"] = total
+    return True
+
+def route_courses(result: Dict[str, Any], origin: Optional[Tuple[float, float]] = None) -> int:
+    return sum(route_course(course, origin) for course in result.get("courses", []))
@@ -0,0 +1,196 @@
+# streaming.py
+# 스트리밍 추천: OpenAI 스트림에서 코스가 완성되는 즉시 이벤트로 내보내고, 사진은 나중에 패치 이벤트로 보냄
+import asyncio, copy, json, os, time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from python_ai_server.recommendations.routing import route_course
+from python_ai_server.resilience import PROVIDERS
+from python_ai_server.recommendations.places import (
+    OPENAI_MODEL, OPENAI_TIMEOUT, PROMPT_CACHE_KEY, REQUESTS, REQUEST_SECONDS, resolve_inputs, stop_place_name, add_usage, build_prompts, chat_messages,
+    JSON_SCHEMA, completion_options, fetch_photo_urls, ground_courses, normalize_place_name, openai_client, prepare_course, repair_course,
+)
+
+class IncrementalCourseParser:
+    """
+    조각난 JSON 텍스트를 feed()로 받아, 코스 배열의 원소 객체가 닫히는 즉시 dict로 돌려줍니다.
+    코스 배열 = 처음 등장하는 배열 ({"courses": [...]} 또는 루트 배열 [...]). 문자열 안의 괄호/이스케이프는 무시.
+    전체 텍스트는 한 번만 훑습니다(각 문자를 한 번씩만 검사).
+    """
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._courses_depth: Optional[int] = None  # 코스 배열이 열린 깊이 (닫힌 뒤에는 -1)
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._text += chunk
+        text, out = self._text, []
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                continue
+            if c == '"':
+                self._in_string = self._depth > 0  # JSON 바깥(설명문/코드펜스)의 따옴표는 무시
+            elif c in "{[":
+                self._depth += 1
+                if c == "[" and self._courses_depth is None:
+                    self._courses_depth = self._depth
+                elif c == "{" and self._courses_depth is not None and self._depth == self._courses_depth + 1:
+                    self._item_start = i
+            elif c in "}]" and self._depth > 0:
+                if c == "}" and self._item_start is not None and self._depth == self._courses_depth + 1:
+                    try:
+                        out.append(json.loads(text[self._item_start:i + 1]))
+                    except ValueError:
+                        pass
+                    self._item_start = None
+                elif c == "]" and self._depth == self._courses_depth:
+                    self._courses_depth = -1
+                self._depth -= 1
+        self._pos = len(text)
+        return out
+
+Event = Tuple[str, Dict[str, Any]]
+
+async def stream_place_recommendations(
+    location: Optional[str] = None,
+    date: Optional[str] = None,
+    time_str: Optional[str] = None,
+    weather_text: Optional[str] = None,
+    usage: Optional[Dict[str, int]] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    coords: Optional[Tuple[float, float]] = None,
+) -> AsyncIterator[Event]:
+    """
+    이벤트 순서: course(검증 통과한 코스, photo_url="") -> photo(스톱별 사진 패치, 코스 단위로 해결되는 대로) -> done
+    규칙을 어겨 버린 코스는 스트림이 끝난 뒤 /recommend처럼 코스 단위로 다시 생성해(repair_course) 이어서 내보냅니다.
+    스트림 도중 오류는 error 이벤트. 3개 코스가 모두 나오면 on_result(완성 결과)를 호출합니다.
+    """
+    location, date, time_str = resolve_inputs(location, date, time_str)
+    system_prompt, user_prompt = build_prompts(location, date, time_str, weather_text, coords)
+    api_key = os.getenv("GOOGLE_MAPS_API_KEY", "")
+    queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue()
+    courses: List[Dict[str, Any]] = []
+    photo_tasks: List[asyncio.Task] = []
+    failed: List[Tuple[Any, List[str]]] = []  # 검증에서 버린 (원본 코스, 위반 내용) -> 스트림이 끝난 뒤 수리
+    rejected = 0
+
+    async def resolve_photos(index: int, course: Dict[str, Any]) -> None:
+        stops = course["스톱"]
+        urls = await fetch_photo_urls([stop_place_name(stop) for stop in stops], api_key)
+        for j, stop in enumerate(stops):
+            stop["photo_url"] = urls.get(stop_place_name(stop), "")
+            await queue.put(("photo", {"course": index, "stop": j, "photo_url": stop["photo_url"]}))
+
+    async def deltas(client) -> AsyncIterator[str]:
+        """
+        스트림의 텍스트 조각. 스트림 생성부터 마지막 조각까지 openai 브레이커에 기록(읽는 도중의 끊김/오류 포함).
+        일반 3코스 호출과 브레이커를 공유하고, 소요시간은 스트림 길이에 좌우되므로 적응형 타임아웃 계산에서는 제외.
+        """
+        started = time.perf_counter()
+        with PROVIDERS["openai"].guard(record_latency=False):
+            stream = await client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=chat_messages(system_prompt, user_prompt),
+                temperature=0.4,
+                timeout=OPENAI_TIMEOUT,
+                stream=True,
+                stream_options={"include_usage": True},
+                prompt_cache_key=PROMPT_CACHE_KEY,
+                **completion_options(JSON_SCHEMA)
+            )
+            REQUESTS.inc("stream")
+            first_token = True
+            # 클라이언트가 끊겨 중간에 닫혀도 스트림(풀의 커넥션)을 바로 닫음
+            async with stream:
+                async for chunk in stream:
+                    add_usage(usage, chunk)
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    if first_token:
+                        REQUEST_SECONDS.inc("stream", amount=time.perf_counter() - started)  # time-to-first-token
+                        first_token = False
+                    yield delta
+
+    async def accept(raw: Any) -> None:
+        nonlocal rejected
+        course, errors = prepare_course(raw)
+        if len(courses) >= 3 or errors:
+            rejected += 1
+            if errors:
+                failed.append((raw, errors))
+            return
+        await emit(course)
+
+    async def repair_rejected(client) -> None:
+        """버린 코스를 모자란 개수만큼 병렬로 다시 생성(이미 내보낸 코스와 겹치지 않게)하고 통과한 것만 내보냄."""
+        needed = failed[:3 - len(courses)]
+        if not needed:
+            return
+        print(f"[스트림 코스 단위 수리] {len(needed)}개")
+        base = len(courses)
+        result = {"courses": [*courses, *(raw if isinstance(raw, dict) else {} for raw, _ in needed)]}
+        repaired = await asyncio.gather(*(
+            repair_course(client, system_prompt, user_prompt, result, base + k, errors, usage)
+            for k, (_, errors) in enumerate(needed)
+        ))
+        for k, ok in enumerate(repaired):
+            if ok and len(courses) < 3:
+                await emit(result["courses"][base + k])
+
+    async def emit(course: Dict[str, Any]) -> None:
+        # 이미 내보낸 코스의 장소명과 겹치게 보정하지 않도록
+        taken = {normalize_place_name(stop["장소명"]) for done in courses for stop in done["스톱"]}
+        ground_courses({"courses": [course]}, coords, taken)
+        route_course(course, coords)
+        for stop in course["스톱"]:
+            stop["photo_url"] = ""
+        courses.append(course)
+        index = len(courses) - 1
+        await queue.put(("course", {"index": index, "course": copy.deepcopy(course)}))
+        photo_tasks.append(asyncio.create_task(resolve_photos(index, course)))
+
+    async def produce() -> None:
+        try:
+            async with openai_client() as client:
+                parser = IncrementalCourseParser()
+                async with aclosing(deltas(client)) as chunks:
+                    async for delta in chunks:
+                        for raw in parser.feed(delta):
+                            await accept(raw)
+                await repair_rejected(client)
+            await asyncio.gather(*photo_tasks)
+        except Exception as e:
+            # 내부 예외 문구는 로그에만 남기고 클라이언트에는 일반 문구
+            print(f"[스트리밍 추천 실패] {type(e).__name__}: {e}")
+            await queue.put(("error", {"message": "코스 생성 중 오류가 발생했습니다. 잠시 후 다시 시도하세요."}))
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield event
+    finally:
+        # 클라이언트가 끊기면 생성/사진 작업도 정리
+        for task in [producer, *photo_tasks]:
+            if not task.done():
+                task.cancel()
+
+    complete = len(courses) == 3
+    if complete and on_result is not None:
+        on_result({"courses": courses, "weather_text": weather_text})
+    yield ("done", {"courses": len(courses), "complete": complete, "rejected": rejected})
@@ -0,0 +1,193 @@
+# resilience.py
+# 업스트림(프로바이더)별 상태 레지스트리: 최근 지연/오류 창, 관측 지연에서 뽑은 적응형 타임아웃, 서킷 브레이커
+# - 사용: with PROVIDERS["vworld"].guard() as timeout: r = await c.get(..., timeout=timeout)
+# - 브레이커가 열려 있으면 호출 전에 CircuitOpenError(503)로 바로 실패 -> 호출 측이 폴백(KMA -> Open-Meteo, 사진 생략 등)
+# - 클라이언트 오류(4xx, 예: VWorld 결과 없음 404)와 취소(헤지에서 진 요청)는 프로바이더 오류로 세지 않음
+# - 타임아웃으로 끝난 호출은 지연 창에 타임아웃 값으로 기록(중도 절단 표본) -> 느려지면 타임아웃도 다시 늘어남
+import asyncio, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional, Tuple
+import httpx
+from fastapi import HTTPException
+from openai import APITimeoutError
+from python_ai_server import metrics
+from python_ai_server.http_clients import UPSTREAMS
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "50"))                     # 최근 호출 몇 건으로 오류율을 볼지
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))   # 이보다 오래된 결과는 버림
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))               # 창 안 호출이 이보다 적으면 열지 않음
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))          # 이 오류율 이상이면 열림
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))       # 열린 뒤 시험 호출(half-open)까지 대기
+ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("ADAPTIVE_TIMEOUT_MULTIPLIER", "3"))   # 타임아웃 = p99 x 배수
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(os.getenv("ADAPTIVE_TIMEOUT_MIN_SAMPLES", "20"))  # 이만큼 쌓이기 전엔 기본 타임아웃
+LATENCY_WINDOW = 200
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CALLS = metrics.counter("upstream_calls_total", "프로바이더 호출 결과(ok/error/rejected=브레이커가 열려 호출 안 함)", ("provider", "result"))
+TRANSITIONS = metrics.counter("upstream_breaker_transitions_total", "서킷 브레이커 상태 전환 수", ("provider", "state"))
+
+class CircuitOpenError(HTTPException):
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(503, f"{provider} 일시 차단(서킷 브레이커 열림, {retry_in:.0f}초 후 재시도)")
+        self.provider = provider
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """4xx(429 제외)는 요청 자체의 문제라 프로바이더 오류로 보지 않음."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status != 429)
+
+_TIMEOUT_ERRORS = (TimeoutError, asyncio.TimeoutError, httpx.TimeoutException, APITimeoutError)
+
+def is_timeout(exc: BaseException) -> bool:
+    """타임아웃 여부. 호출 측이 HTTPException(502) 등으로 감싼 경우도 원인(__cause__/__context__)을 따라가 확인."""
+    seen = 0
+    while exc is not None and seen < 5:
+        if isinstance(exc, _TIMEOUT_ERRORS):
+            return True
+        exc = exc.__cause__ or exc.__context__
+        seen += 1
+    return False
+
+def _percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class ProviderHealth:
+    """
+    한 프로바이더의 최근 결과 창 + 브레이커 상태.
+    - 타임아웃: 지연 p99 x ADAPTIVE_TIMEOUT_MULTIPLIER를 [min_timeout, base_timeout]로 자른 값
+      (지연 = 성공한 호출의 소요시간 + 타임아웃으로 끝난 호출의 타임아웃 값)
+    - closed -> open: 최근 창(BREAKER_WINDOW건, BREAKER_WINDOW_SECONDS초) 오류율이 BREAKER_ERROR_RATE 이상
+    - open -> half_open: BREAKER_OPEN_SECONDS 후 시험 호출 한 건만 허용. 성공하면 closed, 실패하면 다시 open
+    """
+    def __init__(self, name: str, base_timeout: float, min_timeout: float):
+        self.name = name
+        self.base_timeout = base_timeout
+        self.min_timeout = min_timeout
+        self.state = CLOSED
+        self._timeout = base_timeout
+        self._outcomes: Deque[Tuple[float, bool]] = deque(maxlen=BREAKER_WINDOW)  # (시각, 성공 여부)
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def timeout(self) -> float:
+        return self._timeout
+
+    def error_rate(self) -> float:
+        with self._lock:
+            self._prune(time.monotonic())
+            return self._error_rate()
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and self._outcomes[0][0] < now - BREAKER_WINDOW_SECONDS:
+            self._outcomes.popleft()
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            TRANSITIONS.inc(self.name, state)
+            print(f"[서킷 브레이커] {self.name}: {state}")
+
+    def available(self) -> bool:
+        """지금 호출하면 거절되지 않는지(상태 변경 없음). 사진처럼 생략 가능한 단계를 통째로 건너뛸 때."""
+        return self.state == CLOSED or (self.state == OPEN and time.monotonic() - self._opened_at >= BREAKER_OPEN_SECONDS)
+
+    def acquire(self) -> bool:
+        """호출 허용 여부 확인. 거절이면 CircuitOpenError. half-open 시험 호출이면 True."""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            waited = time.monotonic() - self._opened_at
+            if self.state == OPEN and waited >= BREAKER_OPEN_SECONDS:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+        CALLS.inc(self.name, "rejected")
+        raise CircuitOpenError(self.name, max(0.0, BREAKER_OPEN_SECONDS - waited))
+
+    def record(self, ok: bool, seconds: Optional[float] = None, probe: bool = False) -> None:
+        now = time.monotonic()
+        CALLS.inc(self.name, "ok" if ok else "error")
+        with self._lock:
+            if probe:
+                self._probing = False
+            if seconds is not None:
+                self._latencies.append(seconds)
+                if len(self._latencies) >= ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+                    p99 = _percentile(sorted(self._latencies), 0.99)
+                    self._timeout = min(self.base_timeout, max(self.min_timeout, p99 * ADAPTIVE_TIMEOUT_MULTIPLIER))
+            if self.state == HALF_OPEN and probe:
+                if ok:
+                    self._outcomes.clear()
+                    self._transition(CLOSED)
+                else:
+                    self._opened_at = now
+                    self._transition(OPEN)
+                return
+            self._outcomes.append((now, ok))
+            self._prune(now)
+            if (
+                self.state == CLOSED and not ok
+                and len(self._outcomes) >= BREAKER_MIN_CALLS and self._error_rate() >= BREAKER_ERROR_RATE
+            ):
+                self._opened_at = now
+                self._transition(OPEN)
+
+    @contextmanager
+    def guard(self, record_latency: bool = True) -> Iterator[float]:
+        """
+        with health.guard() as timeout: ... — 브레이커 확인, 적응형 타임아웃 제공, 결과 기록.
+        record_latency=False: 오류/성공만 기록(스트림처럼 소요시간이 다른 호출과 비교되지 않는 경우).
+        """
+        probe = self.acquire()
+        timeout = self._timeout
+        started = time.perf_counter()
+        try:
+            yield timeout
+        except Exception as e:
+            # 타임아웃은 '적어도 timeout초 걸림'으로 지연 창에 남겨, 느려진 업스트림에 맞춰 타임아웃이 늘어나게 함
+            self.record(not is_provider_failure(e), timeout if record_latency and is_timeout(e) else None, probe)
+            raise
+        except BaseException:
+            # 취소(헤지에서 진 요청, 클라이언트 끊김)는 결과로 치지 않음
+            if probe:
+                with self._lock:
+                    self._probing = False
+            raise
+        else:
+            self.record(True, time.perf_counter() - started if record_latency else None, probe)
+
+PROVIDERS: Dict[str, ProviderHealth] = {
+    "vworld": ProviderHealth("vworld", UPSTREAMS["vworld"].timeout, min_timeout=1.0),
+    "kma": ProviderHealth("kma", UPSTREAMS["kma_http"].timeout, min_timeout=2.0),
+    "open_meteo": ProviderHealth("open_meteo", UPSTREAMS["open_meteo"].timeout, min_timeout=1.0),
+    "google_places": ProviderHealth("google_places", UPSTREAMS["google_places"].timeout, min_timeout=0.5),
+    # 3코스 전체 생성/스트림과 코스 하나짜리(병렬 생성, 코스 수리) 호출은 소요시간이 달라 창을 나눔
+    "openai": ProviderHealth("openai", float(os.getenv("OPENAI_TIMEOUT", "30")), min_timeout=10.0),
+    "openai_course": ProviderHealth("openai_course", float(os.getenv("OPENAI_TIMEOUT", "30")), min_timeout=5.0),
+}
+
+metrics.gauge(
+    "upstream_breaker_state", "서킷 브레이커 상태(0=closed, 1=half_open, 2=open)", ("provider",),
+    fn=lambda: {(name,): _STATE_VALUE[health.state] for name, health in PROVIDERS.items()},
+)
+metrics.gauge(
+    "upstream_timeout_seconds", "현재 적응형 타임아웃(초)", ("provider",),
+    fn=lambda: {(name,): health.timeout() for name, health in PROVIDERS.items()},
+)
+metrics.gauge(
+    "upstream_error_ratio", "최근 창의 오류율", ("provider",),
+    fn=lambda: {(name,): health.error_rate() for name, health in PROVIDERS.items()},
+)
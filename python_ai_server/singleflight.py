@@ -0,0 +1,49 @@
+# singleflight.py
+# 같은 키로 동시에 들어온 비동기 작업을 하나로 합침 (캐시 미스 폭주 방지)
+import asyncio, weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from python_ai_server import metrics
+
+CALLS = metrics.counter("singleflight_calls_total", "single-flight 호출 수(leader=실제 실행, shared=진행 중 작업 공유)", ("group", "role"))
+
+class SingleFlight:
+    """
+    do(key, fn): 같은 key의 작업이 진행 중이면 그 결과를 같이 기다리고, 없으면 fn()을 실행합니다.
+    공유 작업은 shield로 감싸므로 기다리던 호출자 하나가 취소돼도 작업 자체는 계속됩니다.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        # 이벤트 루프별로 분리(asyncio.run으로 매번 새 루프를 쓰는 호출자 대비)
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = weakref.WeakKeyDictionary()
+
+    def _tasks(self) -> Dict[Hashable, asyncio.Task]:
+        loop = asyncio.get_running_loop()
+        tasks = self._inflight.get(loop)
+        if tasks is None:
+            tasks = self._inflight[loop] = {}
+        return tasks
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        tasks = self._tasks()
+        task = tasks.get(key)
+        if task is None:
+            CALLS.inc(self.name, "leader")
+            task = asyncio.ensure_future(fn())
+            tasks[key] = task
+            task.add_done_callback(lambda t: self._finish(tasks, key, t))
+        else:
+            CALLS.inc(self.name, "shared")
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _finish(tasks: Dict[Hashable, asyncio.Task], key: Hashable, task: asyncio.Task) -> None:
+        if tasks.get(key) is task:
+            del tasks[key]
+        if not task.cancelled():
+            task.exception()  # 기다리던 호출자가 모두 취소된 경우에도 '미회수 예외' 경고가 나지 않도록
+
+    def inflight(self) -> int:
+        try:
+            return len(self._tasks())
+        except RuntimeError:
+            return 0
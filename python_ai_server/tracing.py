@@ -0,0 +1,94 @@
+# tracing.py
+# 요청 단계별 소요시간 추적 (geocode / weather / llm / photos ...)
+# - 샘플링된 요청만 측정: 나머지 요청에서 stage()는 아무것도 하지 않음
+# - 측정값은 recommend_stage_seconds 히스토그램과 요청별 Server-Timing 헤더(디버그 시 응답 필드)로 나감
+# - contextvars로 요청 추적 객체를 전달하므로 같은 요청에서 만든 asyncio 작업의 단계도 함께 기록됨
+import os, random, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+from python_ai_server import metrics
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))  # 0~1. 디버그 헤더가 있으면 항상 측정
+
+STAGE_SECONDS = metrics.histogram(
+    "recommend_stage_seconds", "추천 요청 단계별 소요시간(샘플링된 요청만)", ("stage", "outcome"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+REQUEST_SECONDS = metrics.histogram("recommend_request_seconds", "추천 요청 전체 소요시간(샘플링된 요청만)", ("route",))
+
+class Span:
+    __slots__ = ("stage", "outcome", "seconds")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.outcome = "ok"
+        self.seconds = 0.0
+
+class Trace:
+    def __init__(self, debug: bool = False):
+        self.debug = debug
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def breakdown(self) -> Dict[str, Dict[str, object]]:
+        """단계별 {ms: 합계, count: 횟수, outcomes: [...]} (디버그 응답 필드용)."""
+        out: Dict[str, Dict[str, object]] = {}
+        for span in self.spans:
+            entry = out.setdefault(span.stage, {"ms": 0.0, "count": 0, "outcomes": []})
+            entry["ms"] = round(entry["ms"] + span.seconds * 1000, 2)
+            entry["count"] += 1
+            entry["outcomes"].append(span.outcome)
+        out["total"] = {"ms": round((time.perf_counter() - self.started) * 1000, 2), "count": 1, "outcomes": []}
+        return out
+
+    def server_timing(self) -> str:
+        """Server-Timing 헤더 값. 같은 단계는 합치고 마지막 결과를 desc로."""
+        parts = []
+        for stage, entry in self.breakdown().items():
+            desc = f';desc="{entry["outcomes"][-1]}"' if entry["outcomes"] else ""
+            parts.append(f"{stage}{desc};dur={entry['ms']}")
+        return ", ".join(parts)
+
+_current: ContextVar[Optional[Trace]] = ContextVar("recommend_trace", default=None)
+
+def start_trace(debug: bool = False, sample_rate: Optional[float] = None) -> Optional[Trace]:
+    """현재 컨텍스트에서 추적 시작. 샘플링에서 빠지면 None(이후 stage()는 비용 없음)."""
+    rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if not debug and random.random() >= rate:
+        _current.set(None)
+        return None
+    trace = Trace(debug)
+    _current.set(trace)
+    return trace
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+_NOOP = Span("noop")
+
+@contextmanager
+def stage(name: str) -> Iterator[Span]:
+    """
+    with stage("geocode") as span: ...; span.outcome = "ROAD"
+    예외가 나면 outcome은 "error"(HTTPException이면 상태 코드).
+    """
+    trace = _current.get()
+    if trace is None:
+        yield _NOOP
+        return
+    span = Span(name)
+    started = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.outcome = str(getattr(e, "status_code", "error"))
+        raise
+    finally:
+        span.seconds = time.perf_counter() - started
+        trace.spans.append(span)
+        STAGE_SECONDS.observe(span.seconds, name, span.outcome)
+
+def finish_trace(trace: Optional[Trace], route: str) -> None:
+    if trace is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - trace.started, route)
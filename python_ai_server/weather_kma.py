@@ -1,35 +1,19 @@
 # weather_kma.py
-import os, math
-from datetime import datetime
-from typing import Optional, Tuple, Dict
-import httpx
+import asyncio, os, math, time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set, Tuple
 from fastapi import HTTPException
+from python_ai_server import metrics
+from python_ai_server.cache import LRUCache
+from python_ai_server.http_clients import upstream_client
+from python_ai_server.resilience import PROVIDERS
+from python_ai_server.singleflight import SingleFlight
 
 KMA_SERVICE_KEY = os.getenv("KMA_SERVICE_KEY")  # 반드시 '디코딩키(plain)' 값
 
 # ---------- 격자 변환 ----------
-def latlon_to_grid(lat: float, lon: float) -> Tuple[int, int]:
-    RE = 6371.00877; GRID = 5.0
-    SLAT1, SLAT2 = 30.0, 60.0; OLON, OLAT = 126.0, 38.0
-    XO, YO = 43, 136
-    import math as _m
-    DEGRAD = _m.pi / 180.0
-    re = RE / GRID
-    slat1 = SLAT1 * DEGRAD; slat2 = SLAT2 * DEGRAD
-    olon = OLON * DEGRAD;  olat = OLAT * DEGRAD
-    sn = _m.log(_m.cos(slat1)/_m.cos(slat2)) / _m.log(
-        _m.tan(_m.pi*0.25+slat2*0.5)/_m.tan(_m.pi*0.25+slat1*0.5)
-    )
-    sf = (_m.cos(slat1)*(_m.tan(_m.pi*0.25+slat1*0.5)**sn))/sn
-    ro = re*sf/(_m.tan(_m.pi*0.25+olat*0.5)**sn)
-    ra = re*sf/(_m.tan(_m.pi*0.25+(lat*DEGRAD)*0.5)**sn)
-    theta = (lon*DEGRAD)-olon
-    if theta > _m.pi: theta -= 2.0*_m.pi
-    if theta < -_m.pi: theta += 2.0*_m.pi
-    theta *= sn
-    x = ra*_m.sin(theta)+XO+0.5
-    y = ro - ra*_m.cos(theta)+YO+0.5
-    return int(x), int(y)
+# 투영 상수를 미리 계산해 둔 grid_projection 구현을 그대로 사용 (배치 변환은 latlon_to_grid_batch)
+from python_ai_server.grid_projection import latlon_to_grid, latlon_to_grid_batch, grid_to_latlon
 
 BASE_TIMES = ["0200","0500","0800","1100","1400","1700","2000","2300"]
 
@@ -60,50 +44,153 @@ def map_condition(sky: Optional[str], pty: Optional[str]) -> str:
     if sky == "4": return "흐림"
     return "알수없음"
 
+# ---------- 발표 시각 ----------
+KST = timezone(timedelta(hours=9))
+# 발표 시각(base_time) 직후에는 아직 API에 데이터가 없으므로 이만큼 지난 뒤의 발표분을 사용
+KMA_PUBLISH_DELAY = timedelta(minutes=int(os.getenv("KMA_PUBLISH_DELAY_MIN", "10")))
+
+def latest_base_date_time(now: Optional[datetime] = None) -> Tuple[str, str]:
+    """현재 시각 기준으로 조회 가능한 가장 최근 발표분 (base_date, base_time). 02시 이전이면 전날 2300."""
+    t = (now or datetime.now(KST)) - KMA_PUBLISH_DELAY
+    hhmm = t.strftime("%H%M")
+    published = [bt for bt in BASE_TIMES if bt <= hhmm]
+    if published:
+        return t.strftime("%Y%m%d"), published[-1]
+    return (t - timedelta(days=1)).strftime("%Y%m%d"), BASE_TIMES[-1]
+
+def next_publish_at(base_date: str, base_time: str) -> datetime:
+    """(base_date, base_time) 다음 발표분이 조회 가능해지는 시각."""
+    i = BASE_TIMES.index(base_time)
+    day = datetime.strptime(base_date, "%Y%m%d").replace(tzinfo=KST)
+    if i + 1 < len(BASE_TIMES):
+        nxt = BASE_TIMES[i + 1]
+    else:
+        day, nxt = day + timedelta(days=1), BASE_TIMES[0]
+    return day.replace(hour=int(nxt[:2]), minute=int(nxt[2:])) + KMA_PUBLISH_DELAY
+
 # ---------- KMA 호출 (HTTP 강제) ----------
-async def fetch_vilage_fcst(nx: int, ny: int, yyyymmdd: str, fcst_time: str) -> Dict[str, Optional[str]]:
-    if not KMA_SERVICE_KEY:
-        raise HTTPException(500, "KMA_SERVICE_KEY 미설정")
+KMA_URL = os.getenv("KMA_URL", "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getVilageFcst")
+KMA_ROWS_PER_PAGE = 1000
 
-    base_date, base_time = pick_base_date_time(datetime.strptime(yyyymmdd, "%Y%m%d"))
+# (nx, ny, base_date, base_time) -> {(fcstDate, fcstTime, category): fcstValue}
+# 다음 발표분이 나올 때까지 보관하고, 모든 시간/요청이 같은 인덱스를 공유합니다.
+ForecastIndex = Dict[Tuple[str, str, str], str]
+KMA_FORECAST_CACHE = LRUCache(maxsize=int(os.getenv("KMA_FORECAST_CACHE_SIZE", "512")))
+KMA_CACHE_STATS = metrics.counter("kma_forecast_cache_total", "KMA 동네예보 인덱스 캐시 적중/미스(stale=최신 발표분을 받는 동안 직전 발표분 사용)", ("result",))
+# 다음 발표분이 나온 뒤에도 이 시간(초) 동안은 직전 발표분을 보관해, 새 발표분을 받는 사이의 요청에 씀
+KMA_STALE_GRACE = float(os.getenv("KMA_STALE_GRACE", "900"))
+# 백그라운드 갱신이 실패한 키는 이 시간(초) 동안 다시 갱신하지 않고 직전 발표분만 돌려줌(장애 중 요청마다 업스트림 재시도 방지)
+KMA_REFRESH_BACKOFF = float(os.getenv("KMA_REFRESH_BACKOFF", "60"))
+_kma_flight = SingleFlight("kma_forecast")
+_background: Set[asyncio.Task] = set()
+_refresh_retry_at: Dict[tuple, float] = {}  # 키 -> 다음 백그라운드 갱신을 허용할 시각(monotonic)
 
+async def _fetch_page(nx: int, ny: int, base_date: str, base_time: str, page_no: int) -> dict:
     # ★ HTTPS 대신 HTTP로 강제 (TLS 이슈 회피)
-    url = "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getVilageFcst"
     params = {
         "serviceKey": KMA_SERVICE_KEY,   # 디코딩키(plain) 그대로
-        "pageNo": "1",
-        "numOfRows": "300",
+        "pageNo": str(page_no),
+        "numOfRows": str(KMA_ROWS_PER_PAGE),
         "dataType": "JSON",
         "base_date": base_date,
         "base_time": base_time,
         "nx": str(nx),
         "ny": str(ny),
     }
-    headers = {"User-Agent": "Mozilla/5.0"}  # 일부 환경에서 필요
-
     # HTTP는 TLS 협상 자체가 없으므로 SSL 에러가 날 수 없음
+    # 브레이커가 열려 있으면 503(CircuitOpenError)으로 바로 실패 -> weather_provider가 Open-Meteo로 폴백
+    with PROVIDERS["kma"].guard() as timeout:
+        try:
+            async with upstream_client("kma_http") as c:  # User-Agent 헤더 포함(일부 환경에서 필요)
+                r = await c.get(KMA_URL, params=params, timeout=timeout)
+                r.raise_for_status()
+                data = r.json()
+        except Exception as e:
+            raise HTTPException(502, f"KMA 요청 실패(HTTP): {e}")
+
+        # 응답 파싱/검증: HTTP 200으로 오는 오류 코드(호출 한도 초과, 서비스 오류 등)도 브레이커가 세도록 guard 안에서
+        try:
+            header = data["response"]["header"]
+            code = header.get("resultCode")
+            if code != "00":
+                raise HTTPException(502, f"KMA 오류 코드: {code}, msg={header.get('resultMsg')}")
+            return data["response"]["body"]
+        except (KeyError, TypeError):
+            raise HTTPException(502, f"기상청 응답 파싱 실패: {data}")
+
+def _index_items(index: ForecastIndex, body: dict) -> None:
+    for it in body["items"]["item"]:
+        index[(it.get("fcstDate"), it.get("fcstTime"), it.get("category"))] = it.get("fcstValue")
+
+async def _load_forecast_index(nx: int, ny: int, base_date: str, base_time: str) -> ForecastIndex:
+    # 1페이지로 전체 건수를 확인한 뒤 나머지 페이지는 병렬로 받아 예보 기간 전체를 인덱싱
+    first = await _fetch_page(nx, ny, base_date, base_time, 1)
+    index: ForecastIndex = {}
+    _index_items(index, first)
+    total = int(first.get("totalCount") or 0)
+    pages = math.ceil(total / KMA_ROWS_PER_PAGE)
+    rest = await asyncio.gather(*(_fetch_page(nx, ny, base_date, base_time, p) for p in range(2, pages + 1)))
+    for body in rest:
+        _index_items(index, body)
+    return index
+
+def previous_base(base_date: str, base_time: str) -> Tuple[str, str]:
+    """(base_date, base_time) 바로 앞 발표분."""
+    i = BASE_TIMES.index(base_time)
+    if i > 0:
+        return base_date, BASE_TIMES[i - 1]
+    day = datetime.strptime(base_date, "%Y%m%d") - timedelta(days=1)
+    return day.strftime("%Y%m%d"), BASE_TIMES[-1]
+
+async def _refresh_in_background(key: tuple, load) -> None:
     try:
-        async with httpx.AsyncClient(timeout=15, http2=False, trust_env=True) as c:
-            r = await c.get(url, params=params, headers=headers)
-            r.raise_for_status()
-            data = r.json()
+        await _kma_flight.do(key, load)
     except Exception as e:
-        raise HTTPException(502, f"KMA 요청 실패(HTTP): {e}")
+        now = time.monotonic()
+        for k in [k for k, at in _refresh_retry_at.items() if at <= now]:
+            del _refresh_retry_at[k]
+        _refresh_retry_at[key] = now + KMA_REFRESH_BACKOFF
+        print(f"[KMA 백그라운드 갱신 실패] {key}: {e} ({KMA_REFRESH_BACKOFF:.0f}초 뒤 재시도)")
+    else:
+        _refresh_retry_at.pop(key, None)
 
-    # 응답 파싱/검증
-    try:
-        header = data["response"]["header"]
-        code = header.get("resultCode")
-        if code != "00":
-            raise HTTPException(502, f"KMA 오류 코드: {code}, msg={header.get('resultMsg')}")
-        items = data["response"]["body"]["items"]["item"]
-    except KeyError:
-        raise HTTPException(502, f"기상청 응답 파싱 실패: {data}")
-
-    bucket: Dict[str, Optional[str]] = {"TMP": None, "SKY": None, "PTY": None}
-    for it in items:
-        if it.get("fcstDate") == yyyymmdd and it.get("fcstTime") == fcst_time:
-            cat = it.get("category")
-            if cat in bucket:
-                bucket[cat] = it.get("fcstValue")
-    return bucket
+async def get_forecast_index(nx: int, ny: int, base_date: Optional[str] = None, base_time: Optional[str] = None) -> ForecastIndex:
+    """
+    격자 (nx, ny)의 발표분 전체를 (fcstDate, fcstTime, category) 인덱스로. 발표분당 업스트림 호출은 한 번입니다.
+    발표분을 지정하지 않았고 최신 발표분이 아직 없으면, 유예 시간(KMA_STALE_GRACE) 안의 직전 발표분을 바로 돌려주고
+    최신 발표분은 백그라운드로 받습니다(발표 직후 요청이 업스트림을 기다리지 않도록).
+    """
+    if not KMA_SERVICE_KEY:
+        raise HTTPException(500, "KMA_SERVICE_KEY 미설정")
+    latest = base_date is None or base_time is None
+    if latest:
+        base_date, base_time = latest_base_date_time()
+    key = (nx, ny, base_date, base_time)
+    index = KMA_FORECAST_CACHE.get(key)
+    if index is not None:
+        KMA_CACHE_STATS.inc("hit")
+        return index
+
+    async def load() -> ForecastIndex:
+        loaded = await _load_forecast_index(nx, ny, base_date, base_time)
+        KMA_FORECAST_CACHE.set_until(key, loaded, next_publish_at(base_date, base_time).timestamp() + KMA_STALE_GRACE)
+        return loaded
+
+    previous = KMA_FORECAST_CACHE.get((nx, ny, *previous_base(base_date, base_time))) if latest else None
+    if previous is not None:
+        KMA_CACHE_STATS.inc("stale")
+        retry_at = _refresh_retry_at.get(key)
+        if retry_at is None or time.monotonic() >= retry_at:
+            task = asyncio.create_task(_refresh_in_background(key, load))
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+        return previous
+    KMA_CACHE_STATS.inc("miss")
+    return await _kma_flight.do(key, load)
+
+async def fetch_vilage_fcst(nx: int, ny: int, yyyymmdd: str, fcst_time: str) -> Dict[str, Optional[str]]:
+    """
+    (yyyymmdd, fcst_time) 시각의 TMP/SKY/PTY. 예보 기간 밖이면 값이 None입니다.
+    """
+    index = await get_forecast_index(nx, ny)
+    return {cat: index.get((yyyymmdd, fcst_time, cat)) for cat in ("TMP", "SKY", "PTY")}
@@ -1,27 +1,27 @@
 # weather_provider.py
-import os, ssl, httpx, math
-from datetime import datetime
-from typing import Optional, Dict
+import os, math, time
+from typing import Any, Optional, Dict
 from fastapi import HTTPException
+from python_ai_server import metrics
+from python_ai_server.cache import LRUCache
+from python_ai_server.http_clients import upstream_client
+from python_ai_server.resilience import PROVIDERS
+from python_ai_server.singleflight import SingleFlight
+from python_ai_server.tracing import stage
+from python_ai_server.weather_kma import fetch_vilage_fcst, latlon_to_grid, map_condition
 
 # === KMA (기상청) ===
 KMA_KEY = os.getenv("KMA_SERVICE_KEY")  # '디코딩키(일반키)' 권장
-
-def _tls12_client() -> httpx.AsyncClient:
-    ctx = ssl.create_default_context()
-    ctx.minimum_version = ssl.TLSVersion.TLSv1_2
-    ctx.maximum_version = ssl.TLSVersion.TLSv1_2
-    transport = httpx.AsyncHTTPTransport(verify=ctx, http2=False, retries=1)
-    return httpx.AsyncClient(transport=transport, timeout=15, trust_env=False)
+WEATHER_PRIMARY = os.getenv("WEATHER_PRIMARY", "kma")  # "kma" | "open_meteo"
+PROVIDER_STATS = metrics.counter("weather_provider_total", "날씨 응답을 제공한 프로바이더", ("provider",))
 
 async def _kma_fetch(params: dict) -> dict:
     if not KMA_KEY:
         raise HTTPException(500, "KMA_SERVICE_KEY 미설정")
     url_https = "https://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getVilageFcst"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    # 1) HTTPS
-    async with _tls12_client() as c:
-        r = await c.get(url_https, params=params, headers=headers)
+    # 1) HTTPS (TLS 1.2 고정 클라이언트, User-Agent 포함)
+    async with upstream_client("kma") as c:
+        r = await c.get(url_https, params=params)
         r.raise_for_status()
         return r.json()
 
@@ -49,56 +49,97 @@ def _nearest_hour(hhmm: str) -> str:
     if m >= 30: h = (h + 1) % 24
     return f"{h:02d}00"
 
-async def fetch_simple_weather(lat: float, lon: float, yyyymmdd: str, hhmm: str) -> Dict[str, Optional[str]]:
-    """
-    우선 KMA 시도 -> 실패 시 Open-Meteo 폴백
-    반환: {"TMP": "23.4", "COND": "맑음"}
-    """
-    # 1) 먼저 KMA (현재/과거/미래를 단순화해서 베이스타임 계산)
-    try:
-        from weather_kma import pick_base_date_time
-        base_date, base_time = pick_base_date_time(datetime.strptime(yyyymmdd, "%Y%m%d"))
-        params = {
-            "serviceKey": KMA_KEY,
-            "pageNo": "1",
-            "numOfRows": "300",
-            "dataType": "JSON",
-            "base_date": base_date,
-            "base_time": base_time,
-            # nx, ny는 호출하는 쪽에서 계산해서 넣어주세요(여기선 생략)
-        }
-        # 여기서는 KMA 호출을 실제로 하지 않고, 원래 weather_kma.fetch_vilage_fcst로 맡깁니다.
-        # 만약 그 함수가 TLS로 계속 깨지면 except로 떨어지게 하세요.
-        raise Exception("force-fallback")  # ← 지금은 의도적으로 폴백 강제(환경 문제 회피)
-    except Exception:
-        pass  # Open-Meteo로 폴백
-
-    # 2) Open-Meteo
-    target_hhmm = _nearest_hour(hhmm)
-    target_hour = int(target_hhmm[:2])
-    url = "https://api.open-meteo.com/v1/forecast"
+# === Open-Meteo 격자 셀 캐시 ===
+# 같은 KMA 격자(약 5km) 안의 요청은 한 번 받은 시간별 예보(기본 7일치)를 함께 씁니다.
+# Open-Meteo 모델은 대략 1시간 주기로 갱신되므로, 다음 갱신 시각(+여유)까지 보관합니다.
+OPEN_METEO_UPDATE_INTERVAL = int(os.getenv("OPEN_METEO_UPDATE_INTERVAL", "3600"))
+OPEN_METEO_UPDATE_OFFSET = int(os.getenv("OPEN_METEO_UPDATE_OFFSET", "300"))
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+FORECAST_CACHE = LRUCache(maxsize=int(os.getenv("FORECAST_CACHE_SIZE", "512")))
+FORECAST_STATS = metrics.counter("forecast_cache_total", "Open-Meteo 격자 셀 캐시 적중/미스", ("result",))
+_forecast_flight = SingleFlight("open_meteo_forecast")
+
+def _next_update_at(now: float) -> float:
+    interval = OPEN_METEO_UPDATE_INTERVAL
+    return (now - OPEN_METEO_UPDATE_OFFSET) // interval * interval + interval + OPEN_METEO_UPDATE_OFFSET
+
+async def _fetch_open_meteo(lat: float, lon: float) -> Dict[str, Any]:
+    url = OPEN_METEO_URL
     params = {
         "latitude": lat,
         "longitude": lon,
         "hourly": "temperature_2m,weathercode",
         "timezone": "Asia/Seoul",
     }
-    async with httpx.AsyncClient(timeout=10) as c:
-        r = await c.get(url, params=params)
-        r.raise_for_status()
-        data = r.json()
+    with PROVIDERS["open_meteo"].guard() as timeout:
+        async with upstream_client("open_meteo") as c:
+            r = await c.get(url, params=params, timeout=timeout)
+            r.raise_for_status()
+            data = r.json()
 
-    hours = data.get("hourly", {}).get("time", [])
-    temps = data.get("hourly", {}).get("temperature_2m", [])
-    codes = data.get("hourly", {}).get("weathercode", [])
+    hourly = data.get("hourly", {})
+    forecast = {
+        "time": hourly.get("time", []),
+        "temperature_2m": hourly.get("temperature_2m", []),
+        "weathercode": hourly.get("weathercode", []),
+        "by_date": {},  # "YYYY-MM-DD" -> [(시, 인덱스)]
+    }
+    for i, t in enumerate(forecast["time"]):
+        # t 예: "2025-08-24T14:00"
+        forecast["by_date"].setdefault(t[:10], []).append((int(t[11:13]), i))
+    return forecast
+
+async def get_cell_forecast(lat: float, lon: float) -> Dict[str, Any]:
+    """
+    (lat, lon)이 속한 격자 셀의 시간별 예보. 캐시 미스가 동시에 나도 업스트림 호출은 한 번입니다.
+    """
+    cell = latlon_to_grid(lat, lon)
+    forecast = FORECAST_CACHE.get(cell)
+    if forecast is not None:
+        FORECAST_STATS.inc("hit")
+        return forecast
+    FORECAST_STATS.inc("miss")
+
+    async def load() -> Dict[str, Any]:
+        fetched = await _fetch_open_meteo(lat, lon)
+        FORECAST_CACHE.set_until(cell, fetched, _next_update_at(time.time()))
+        return fetched
+
+    return await _forecast_flight.do(cell, load)
+
+async def fetch_simple_weather(lat: float, lon: float, yyyymmdd: str, hhmm: str) -> Dict[str, Optional[str]]:
+    """
+    우선 KMA 시도 -> 실패 시 Open-Meteo 폴백 (WEATHER_PRIMARY=open_meteo면 바로 Open-Meteo)
+    반환: {"TMP": "23.4", "COND": "맑음"}
+    """
+    with stage("weather") as span:
+        weather, span.outcome = await _fetch_simple_weather(lat, lon, yyyymmdd, hhmm)
+        return weather
+
+async def _fetch_simple_weather(lat: float, lon: float, yyyymmdd: str, hhmm: str) -> tuple[Dict[str, Optional[str]], str]:
+    """(날씨, 사용한 제공자 kma|open_meteo)"""
+    # 1) 먼저 KMA 동네예보(발표분 인덱스 캐시). 키가 없거나 예보 기간 밖/오류면 Open-Meteo로 폴백
+    if WEATHER_PRIMARY == "kma" and KMA_KEY:
+        try:
+            nx, ny = latlon_to_grid(lat, lon)
+            bucket = await fetch_vilage_fcst(nx, ny, yyyymmdd, _nearest_hour(hhmm))
+            if bucket.get("TMP") is not None and (bucket.get("SKY") is not None or bucket.get("PTY") is not None):
+                PROVIDER_STATS.inc("kma")
+                return {"TMP": bucket["TMP"], "COND": map_condition(bucket.get("SKY"), bucket.get("PTY"))}, "kma"
+        except Exception as e:
+            print(f"[KMA 실패, Open-Meteo 폴백] {e}")
+    PROVIDER_STATS.inc("open_meteo")
+
+    # 2) Open-Meteo (격자 셀 단위 캐시)
+    target_hhmm = _nearest_hour(hhmm)
+    target_hour = int(target_hhmm[:2])
+    forecast = await get_cell_forecast(lat, lon)
+    hours, temps, codes = forecast["time"], forecast["temperature_2m"], forecast["weathercode"]
 
     # 해당 날짜의 target_hour 가장 가까운 시간 인덱스 찾기
     want_date = f"{yyyymmdd[:4]}-{yyyymmdd[4:6]}-{yyyymmdd[6:]}"
     idx_best, min_gap = None, 999
-    for i, t in enumerate(hours):
-        # t 예: "2025-08-24T14:00"
-        if not t.startswith(want_date): continue
-        hh = int(t[11:13])
+    for hh, i in forecast["by_date"].get(want_date, []):
         gap = abs(hh - target_hour)
         if gap < min_gap:
             min_gap, idx_best = gap, i
@@ -114,4 +155,4 @@ async def fetch_simple_weather(lat: float, lon: float, yyyymmdd: str, hhmm: str)
     code = codes[idx_best] if idx_best < len(codes) else None
     cond = WMO_KO.get(int(code), "알수없음") if code is not None else "알수없음"
 
-    return {"TMP": f"{tmp}" if tmp is not None else None, "COND": cond}
+    return {"TMP": f"{tmp}" if tmp is not None else None, "COND": cond}, "open_meteo"
@@ -1,5 +1,11 @@
 import express from 'express';
-import { getRecommendations } from '../controllers/aiController.js';
+import {
+  createRecommendationJob,
+  getRecommendationJob,
+  getRecommendations,
+  getRecommendationsBatch,
+  getRecommendationsStream,
+} from '../controllers/aiController.js';
 
 const router = express.Router();
 
@@ -58,4 +64,188 @@ const router = express.Router();
  */
 router.post('/recommend', getRecommendations);
 
+/**
+ * @swagger
+ * /api/ai/recommend/stream:
+ *   post:
+ *     summary: AI 추천 코스 스트리밍 (SSE)
+ *     description: |
+ *       /api/ai/recommend와 같은 입력을 받아 코스가 완성되는 즉시 Server-Sent Events로 보냅니다.
+ *       이벤트 - meta(날씨), course(코스 1개), photo(스톱 사진 URL 패치), done(완료 요약), error
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             properties:
+ *               location:
+ *                 type: string
+ *                 example: 서울 강남역
+ *               date:
+ *                 type: string
+ *                 example: 2025-08-17
+ *               time:
+ *                 type: string
+ *                 example: 15:00
+ *     responses:
+ *       200:
+ *         description: SSE 스트림
+ *         content:
+ *           text/event-stream:
+ *             schema:
+ *               type: string
+ *               example: "event: course\ndata: {\"index\": 0, \"course\": {...}}\n\n"
+ *       500:
+ *         description: AI 추천 서버 오류
+ */
+router.post('/recommend/stream', getRecommendationsStream);
+
+/**
+ * @swagger
+ * /api/ai/recommend/batch:
+ *   post:
+ *     summary: AI 추천 일괄 처리
+ *     description: |
+ *       여러 (위치, 날짜, 시간) 조합을 한 번에 추천합니다. 같은 주소/날씨 조회는 한 번만 수행합니다.
+ *       stream=true면 끝나는 순서대로 NDJSON(한 줄에 항목 하나)으로 보냅니다.
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             properties:
+ *               items:
+ *                 type: array
+ *                 items:
+ *                   type: object
+ *                   properties:
+ *                     location:
+ *                       type: string
+ *                       example: 서울 강남역
+ *                     date:
+ *                       type: string
+ *                       example: 2025-08-17
+ *                     time:
+ *                       type: string
+ *                       example: 15:00
+ *               stream:
+ *                 type: boolean
+ *                 example: false
+ *     responses:
+ *       200:
+ *         description: 입력 순서대로의 항목별 결과 (실패한 항목은 error 필드)
+ *         content:
+ *           application/json:
+ *             schema:
+ *               type: object
+ *               properties:
+ *                 results:
+ *                   type: array
+ *                   items:
+ *                     type: object
+ *                     properties:
+ *                       index:
+ *                         type: integer
+ *                       result:
+ *                         type: object
+ *                       error:
+ *                         type: object
+ *                         properties:
+ *                           status:
+ *                             type: integer
+ *                             example: 404
+ *                           detail:
+ *                             type: string
+ *       400:
+ *         description: 배치 항목 수 초과
+ *       500:
+ *         description: AI 추천 서버 오류
+ */
+router.post('/recommend/batch', getRecommendationsBatch);
+
+/**
+ * @swagger
+ * /api/ai/recommend/jobs:
+ *   post:
+ *     summary: AI 추천 작업 등록 (비동기)
+ *     description: |
+ *       추천 요청을 큐에 넣고 job_id를 바로 반환합니다. 결과는 GET /api/ai/recommend/jobs/{jobId}로 조회합니다.
+ *       priority는 high > normal > low 순서로 처리되며, 큐가 가득 차면 429와 Retry-After 헤더를 반환합니다.
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             properties:
+ *               location:
+ *                 type: string
+ *                 example: 서울 강남역
+ *               date:
+ *                 type: string
+ *                 example: 2025-08-17
+ *               time:
+ *                 type: string
+ *                 example: 15:00
+ *               priority:
+ *                 type: string
+ *                 enum: [high, normal, low]
+ *                 example: normal
+ *     responses:
+ *       202:
+ *         description: 등록된 작업
+ *         content:
+ *           application/json:
+ *             schema:
+ *               type: object
+ *               properties:
+ *                 job_id:
+ *                   type: string
+ *                 status:
+ *                   type: string
+ *                   example: queued
+ *                 lane:
+ *                   type: string
+ *                   example: normal
+ *                 position:
+ *                   type: integer
+ *                   example: 3
+ *       429:
+ *         description: 작업 큐가 가득 참 (Retry-After 초 후 재시도)
+ *       500:
+ *         description: AI 추천 서버 오류
+ */
+router.post('/recommend/jobs', createRecommendationJob);
+
+/**
+ * @swagger
+ * /api/ai/recommend/jobs/{jobId}:
+ *   get:
+ *     summary: AI 추천 작업 상태/결과 조회
+ *     description: |
+ *       status - queued(position 포함), running, done(result 포함), failed(error 포함).
+ *       wait=초를 주면 작업이 끝날 때까지 최대 그만큼 기다렸다가 응답합니다(서버 상한 30초).
+ *     parameters:
+ *       - in: path
+ *         name: jobId
+ *         required: true
+ *         schema:
+ *           type: string
+ *       - in: query
+ *         name: wait
+ *         schema:
+ *           type: number
+ *           example: 20
+ *     responses:
+ *       200:
+ *         description: 작업 상태 (done이면 result에 /api/ai/recommend와 같은 결과)
+ *       404:
+ *         description: 없거나 만료된 작업
+ *       500:
+ *         description: AI 추천 서버 오류
+ */
+router.get('/recommend/jobs/:jobId', getRecommendationJob);
+
 export default router;
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import asyncio
+from contextlib import nullcontext
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from fastapi import HTTPException
+
+# 여러 테스트 모듈이 함께 쓰는 가짜 업스트림(OpenAI, 스트림, 날씨, 지오코딩/LLM)
+
+VALID_RESULT = {
+    "courses": [
+        {
+            "코스명": f"테스트 코스 {i}",
+            "총예상소요시간": 240,
+            "스톱": [
+                {"장소명": "스타벅스 강남역 2호점", "설명": "정상", "권장체류시간": 60, "권장시간대": "아침", "카테고리": "카페"},
+                {"장소명": "국립중앙박물관", "설명": "정상", "권장체류시간": 60, "권장시간대": "오후", "카테고리": "박물관"},
+                {"장소명": "봉은사", "설명": "정상", "권장체류시간": 60, "권장시간대": "저녁", "카테고리": "기타"}
+            ]
+        }
+        for i in range(3)
+    ]
+}
+
+def _copy(data):
+    return json.loads(json.dumps(data, ensure_ascii=False))
+
+class FakeCompletions:
+    """
+    고정 응답을 돌려주는 chat.completions. on_create(kwargs)로 요청을 들여다보고,
+    gate(asyncio.Event)를 주면 그 이벤트가 설정될 때까지 응답을 붙잡아 둠.
+    """
+    def __init__(self, content, gate=None, on_create=None):
+        self.content = content
+        self.gate = gate
+        self.on_create = on_create
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.on_create:
+            self.on_create(kwargs)
+        if self.gate is not None:
+            await self.gate.wait()
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+class FakeStream:
+    """openai AsyncStream처럼 async with / async for를 지원하고 닫혔는지 기록."""
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+        return False
+
+    def __aiter__(self):
+        return self._chunks.__aiter__()
+
+@pytest.fixture
+def valid_result():
+    """스키마를 통과하는 3코스 결과(테스트마다 새 사본)."""
+    return _copy(VALID_RESULT)
+
+@pytest.fixture
+def fake_completions():
+    return FakeCompletions
+
+@pytest.fixture
+def fake_stream():
+    return FakeStream
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """places.AsyncOpenAI를 주어진 completions를 쓰는 가짜 클라이언트로 교체."""
+    from python_ai_server.recommendations import places
+
+    def install(completions):
+        async def close():
+            pass
+        monkeypatch.setattr(places, "AsyncOpenAI", lambda **kwargs: SimpleNamespace(chat=SimpleNamespace(completions=completions), close=close))
+        return completions
+    return install
+
+@pytest.fixture
+def fake_forecast():
+    """Open-Meteo 형식의 이틀치 시간별 예보(첫날 맑음, 둘째 날 비)."""
+    times = [f"2025-08-24T{h:02d}:00" for h in range(24)] + [f"2025-08-25T{h:02d}:00" for h in range(24)]
+    forecast = {
+        "time": times,
+        "temperature_2m": [20.0 + i * 0.5 for i in range(len(times))],
+        "weathercode": [0 if i < 24 else 61 for i in range(len(times))],
+        "by_date": {},
+    }
+    for i, t in enumerate(times):
+        forecast["by_date"].setdefault(t[:10], []).append((int(t[11:13]), i))
+    return forecast
+
+@pytest.fixture
+def patch_upstreams(monkeypatch):
+    """app의 지오코딩/날씨/LLM을 가짜로 바꾸고 호출 기록(calls)을 돌려주는 함수."""
+    from python_ai_server import app as app_module
+    from python_ai_server.recommendations.proximity import ProximityIndex
+    from python_ai_server.recommendations.result_cache import RecommendationCache
+
+    def patch(llm_delay=0.05):
+        calls = {"geocode": [], "weather": [], "llm": 0, "llm_active": 0, "llm_peak": 0}
+
+        async def fake_geocode(address):
+            calls["geocode"].append(address)
+            await asyncio.sleep(0.01)
+            if address == "없는 주소":
+                raise HTTPException(status_code=404, detail="주소를 찾을 수 없습니다.")
+            return (37.4979, 127.0276) if address == "서울 강남역" else (35.1587, 129.1604)
+
+        async def fake_weather(lat, lon, yyyymmdd, fcst_time):
+            calls["weather"].append((lat, lon, yyyymmdd, fcst_time))
+            return {"TMP": "25", "COND": "맑음"}
+
+        async def fake_llm(location, date, time_str, weather_text=None, usage=None, llm_slots=None, **kwargs):
+            calls["llm"] += 1
+            async with llm_slots or nullcontext():  # 실제로는 completion 호출 동안만 잡힘
+                calls["llm_active"] += 1
+                calls["llm_peak"] = max(calls["llm_peak"], calls["llm_active"])
+                await asyncio.sleep(llm_delay)
+                calls["llm_active"] -= 1
+            return _copy(VALID_RESULT)
+
+        monkeypatch.setattr(app_module, "geocode_vworld", fake_geocode)
+        monkeypatch.setattr(app_module, "fetch_simple_weather", fake_weather)
+        monkeypatch.setattr(app_module, "get_place_recommendations_async", fake_llm)
+        monkeypatch.setattr(app_module, "RECOMMEND_CACHE", RecommendationCache())
+        monkeypatch.setattr(app_module, "NEARBY_RESULTS", ProximityIndex())
+        monkeypatch.setattr(app_module, "BATCH_LLM_CONCURRENCY", 2)
+        return calls
+    return patch
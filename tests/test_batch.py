@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from python_ai_server import app as app_module
+
+def _batch(items, stream=False):
+    return app_module.BatchRecommendRequest(
+        items=[app_module.RecommendRequest(location=loc, date=date, time=t) for loc, date, t in items], stream=stream
+    )
+
+def test_batch_dedupes_upstreams_and_caps_llm(patch_upstreams):
+    calls = patch_upstreams()
+    items = [("서울 강남역", f"2025-08-{day}", "15:00") for day in (17, 18, 19)]
+    items += [("부산 해운대", "2025-08-17", "15:00"), ("없는 주소", "2025-08-17", "15:00"), ("서울 강남역", "2025-08-17", "15:00")]
+
+    response = asyncio.run(app_module.recommend_batch(_batch(items)))
+    results = json.loads(response.body)["results"]
+
+    assert [r["index"] for r in results] == list(range(len(items)))
+    assert results[4]["error"] == {"status": 404, "detail": "주소를 찾을 수 없습니다."}
+    assert all(r["result"]["weather_text"] == "맑음, 25°C" for i, r in enumerate(results) if i != 4)
+    assert sorted(calls["geocode"]) == sorted(["서울 강남역", "부산 해운대", "없는 주소"])
+    assert len(calls["weather"]) == 4  # 강남역 3일 + 해운대 1일
+    assert calls["llm"] == 4  # 마지막 항목은 첫 항목과 캐시 키가 같음
+    assert calls["llm_peak"] == 2
+
+def test_batch_streams_ndjson_as_items_finish(patch_upstreams):
+    patch_upstreams()
+    items = [("서울 강남역", "2025-08-17", "15:00"), ("없는 주소", "2025-08-17", "15:00")]
+
+    async def run():
+        response = await app_module.recommend_batch(_batch(items, stream=True))
+        return [line async for line in response.body_iterator]
+
+    lines = [json.loads(line) for line in asyncio.run(run())]
+    assert [entry["index"] for entry in lines] == [1, 0]  # 실패한 항목이 먼저 끝남
+    assert "error" in lines[0] and "result" in lines[1]
+
+def test_run_batch_caps_items_in_flight():
+    from python_ai_server.recommendations.batch import run_batch
+    active = {"now": 0, "peak": 0}
+
+    async def handle(item):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return {"item": item}
+
+    async def run():
+        return [entry async for _, entry in run_batch(list(range(20)), handle, concurrency=3)]
+
+    entries = asyncio.run(run())
+    assert sorted(entry["index"] for entry in entries) == list(range(20))
+    assert active["peak"] == 3
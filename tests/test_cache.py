@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from python_ai_server.cache import LRUCache, TieredCache, is_missing
+
+def test_lru_eviction_and_ttl():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    cache.set("d", 4, ttl=-1)
+    assert cache.get("d") is None
+
+def test_tiered_cache_survives_restart_and_negative_caching(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache("test", path=path)
+    cache.set("봉은사", "ref-1")
+    cache.set("없는 장소", None)
+    cache.store.close()
+
+    restarted = TieredCache("test", path=path)
+    assert asyncio.run(restarted.aget("봉은사")) == "ref-1"  # 디스크 조회는 스레드에서
+    assert restarted.get("없는 장소") is None
+    assert is_missing(restarted.get("처음 보는 장소"))
+    assert restarted.stats["disk_hits"] == 2
+    assert restarted.stats["negative_hits"] == 1
+    assert restarted.stats["misses"] == 1
+
+def test_sqlite_writes_are_write_behind(tmp_path):
+    store = TieredCache("test", path=str(tmp_path / "cache.sqlite3")).store
+    with store._lock:  # 디스크가 막혀 있어도 set은 기다리지 않음
+        writer = threading.Thread(target=lambda: [store.set(f"k{i}", i, time.time() + 60) for i in range(100)])
+        writer.start()
+        writer.join(timeout=10)  # set이 디스크 잠금을 기다린다면 여기서 끝나지 않음
+        assert not writer.is_alive()
+        assert store.get("k7")[0] == 7  # 아직 안 쓴 값도 조회됨
+    assert store.flush(timeout=5)
+    assert not store._pending
+    store.close()
+
+def test_sqlite_tier_purges_expired_and_caps_rows(tmp_path):
+    store = TieredCache("capped", path=str(tmp_path / "cache.sqlite3")).store
+    store.max_rows = 3
+    now = time.time()
+    store.set("만료", 0, now - 1)
+    assert store.flush(timeout=5)
+    for i in range(4):
+        store.set(f"k{i}", i, now + 60 + i)
+    assert store.flush(timeout=5)
+    # 상한을 넘은 만큼 만료가 가장 이른 행부터 삭제 (이미 만료된 행이 먼저)
+    keys = [row[0] for row in store._connect().execute("SELECT key FROM kv WHERE namespace='capped' ORDER BY key")]
+    assert keys == ["k1", "k2", "k3"]
+    store.set("k1", 1, now - 1)  # 만료시킴
+    assert store.flush(timeout=5)
+    assert store.purge_expired() == 1
+    assert store._connect().execute("SELECT COUNT(*) FROM kv WHERE namespace='capped'").fetchone() == (2,)
+    store.close()
+
+def test_photo_lookup_uses_cache(monkeypatch):
+    from types import SimpleNamespace
+    from python_ai_server.recommendations import places
+    monkeypatch.setattr(places, "PHOTO_CACHE", TieredCache("place_photo", path=None))
+    calls = []
+
+    class FakeClient:
+        async def get(self, url, params=None, timeout=None):
+            calls.append(params["input"])
+            if params["input"] == "키 오류":
+                data = {"candidates": [], "status": "REQUEST_DENIED", "error_message": "The provided API key is invalid."}
+            else:
+                photos = [{"photo_reference": "ref"}] if params["input"] == "봉은사" else []
+                data = {"candidates": [{"photos": photos}], "status": "OK"}
+            return SimpleNamespace(json=lambda: data, raise_for_status=lambda: None)
+
+    async def run():
+        client = FakeClient()
+        names = ["봉은사", " 봉은사 ", "없는 장소", "없는 장소", "키 오류", "키 오류"]
+        return [await places.get_photo_url_async(name, "key", client) for name in names]
+
+    urls = asyncio.run(run())
+    # HTTP 200이어도 REQUEST_DENIED는 "사진 없음"으로 캐시하지 않음 -> 다음 요청에서 다시 조회
+    assert calls == ["봉은사", "없는 장소", "키 오류", "키 오류"]
+    assert urls[0] == urls[1] and "photoreference=ref" in urls[0]
+    assert urls[2] == urls[3] == urls[4] == ""
+    assert is_missing(places.PHOTO_CACHE.get("키 오류"))
@@ -0,0 +1,118 @@
+import os
+import sys
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from datetime import datetime
+from python_ai_server import forecast_prewarm, weather_kma, weather_provider
+from python_ai_server.cache import LRUCache
+from python_ai_server.forecast_prewarm import PopularCells
+
+def _use_kma(monkeypatch, load):
+    monkeypatch.setattr(weather_kma, "KMA_SERVICE_KEY", "test-key")
+    monkeypatch.setattr(weather_kma, "KMA_FORECAST_CACHE", LRUCache(64))
+    monkeypatch.setattr(weather_kma, "_load_forecast_index", load)
+    monkeypatch.setattr(weather_provider, "KMA_KEY", "test-key")
+    monkeypatch.setattr(weather_provider, "WEATHER_PRIMARY", "kma")
+
+def test_popular_cells_rank_decay_and_prune():
+    cells = PopularCells(max_tracked=20)
+    for i in range(25):
+        for _ in range(i + 1):
+            cells.record(60 + i, 127, 37.5, 127.0)
+    assert len(cells) <= 20
+    assert [cell for cell, _ in cells.top(3)] == [(84, 127), (83, 127), (82, 127)]
+    for _ in range(40):
+        cells.decay(0.8)
+    assert len(cells) == 0
+
+def test_prewarm_fills_popular_cells_within_concurrency_cap(monkeypatch):
+    active = {"now": 0, "peak": 0}
+    loaded = []
+
+    async def fake_load(nx, ny, base_date, base_time):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        loaded.append((nx, ny))
+        return {("20250824", "1400", "TMP"): "25"}
+
+    _use_kma(monkeypatch, fake_load)
+    monkeypatch.setattr(forecast_prewarm, "PREWARM_CONCURRENCY", 2)
+    cells = PopularCells()
+    for i in range(6):
+        for _ in range(10 - i):
+            cells.record(60 + i, 127, 37.5, 127.0)
+    cells.record(99, 99, 35.0, 129.0)  # 한 번만 요청된 셀은 상위 5개에서 빠짐
+
+    async def run():
+        counts = await forecast_prewarm.prewarm_once(cells, scheduled_at=0, top=5)
+        # 인기 셀 요청은 업스트림을 기다리지 않음
+        before = len(loaded)
+        index = await weather_kma.get_forecast_index(60, 127)
+        return counts, before, index
+
+    counts, before, index = asyncio.run(run())
+    assert counts == {"ok": 5, "error": 0}
+    assert sorted(loaded) == [(60 + i, 127) for i in range(5)]
+    assert active["peak"] == 2
+    assert len(loaded) == before and index == {("20250824", "1400", "TMP"): "25"}
+
+def test_previous_base_is_served_while_new_base_loads(monkeypatch):
+    loads = []
+
+    async def fake_load(nx, ny, base_date, base_time):
+        loads.append((base_date, base_time))
+        await asyncio.sleep(0.01)
+        return {"base": base_time}
+
+    _use_kma(monkeypatch, fake_load)
+    latest = weather_kma.latest_base_date_time()
+    previous = weather_kma.previous_base(*latest)
+    weather_kma.KMA_FORECAST_CACHE.set((60, 127, *previous), {"base": previous[1]}, 3600)
+
+    async def run():
+        first = await weather_kma.get_forecast_index(60, 127)
+        await asyncio.sleep(0.05)
+        second = await weather_kma.get_forecast_index(60, 127)
+        return first, second
+
+    assert asyncio.run(run()) == ({"base": previous[1]}, {"base": latest[1]})
+    assert loads == [latest]
+    assert weather_kma.previous_base("20250824", "0500") == ("20250824", "0200")
+    assert weather_kma.previous_base("20250824", "0200") == ("20250823", "2300")
+
+def test_next_run_follows_kma_publish_times(monkeypatch):
+    _use_kma(monkeypatch, None)
+    now = datetime(2025, 8, 24, 14, 5, tzinfo=weather_kma.KST)
+    assert forecast_prewarm.next_run_at(now.timestamp()) == datetime(2025, 8, 24, 14, 10, tzinfo=weather_kma.KST).timestamp()
+    monkeypatch.setattr(weather_provider, "WEATHER_PRIMARY", "open_meteo")
+    assert forecast_prewarm.next_run_at(now.timestamp()) == weather_provider._next_update_at(now.timestamp())
+
+def test_failed_background_refresh_backs_off_per_key(monkeypatch):
+    attempts = []
+
+    async def failing_load(nx, ny, base_date, base_time):
+        attempts.append((nx, ny, base_date, base_time))
+        raise RuntimeError("KMA 장애")
+
+    _use_kma(monkeypatch, failing_load)
+    monkeypatch.setattr(weather_kma, "_refresh_retry_at", {})
+    previous = {("20250824", "1400", "TMP"): "24"}
+    weather_kma.KMA_FORECAST_CACHE.set((60, 127, *weather_kma.previous_base(*weather_kma.latest_base_date_time())), previous, 600)
+
+    async def run():
+        served = []
+        for _ in range(5):
+            served.append(await weather_kma.get_forecast_index(60, 127))
+            await asyncio.sleep(0.01)  # 백그라운드 갱신이 끝날 시간
+        after_failures = len(attempts)
+        weather_kma._refresh_retry_at.update({k: 0 for k in weather_kma._refresh_retry_at})  # 대기 시간 경과
+        await weather_kma.get_forecast_index(60, 127)
+        await asyncio.sleep(0.01)
+        return served, after_failures
+
+    served, after_failures = asyncio.run(run())
+    assert all(index == previous for index in served)
+    assert after_failures == 1  # 실패 후 대기 시간 동안은 직전 발표분만 돌려주고 재시도하지 않음
+    assert len(attempts) == 2   # 대기 시간이 지나면 다시 갱신
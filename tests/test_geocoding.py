@@ -0,0 +1,193 @@
+import os
+import sys
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi import HTTPException
+from python_ai_server import geocoding_vworld
+from python_ai_server.cache import TieredCache
+
+@pytest.fixture
+def vworld(monkeypatch):
+    calls = []
+    known = {("서울 강남역", "PARCEL"): (37.4979, 127.0276)}
+
+    async def fake_call(address, addr_type):
+        calls.append((address, addr_type))
+        if (address, addr_type) in known:
+            return known[(address, addr_type)]
+        raise HTTPException(404, f"VWorld 결과 없음({addr_type}): {address}")
+
+    monkeypatch.setattr(geocoding_vworld, "VWORLD_KEY", "test-key")
+    monkeypatch.setattr(geocoding_vworld, "_call_vworld", fake_call)
+    monkeypatch.setattr(geocoding_vworld, "GEOCODE_CACHE", TieredCache("geocode", path=None, negative_ttl=600))
+    monkeypatch.setattr(geocoding_vworld, "GEOCODE_TYPE_HINTS", TieredCache("geocode_type", path=None))
+    return calls
+
+def test_normalize_address():
+    normalize = geocoding_vworld.normalize_address
+    assert normalize("서울특별시  강남구, 역삼동") == "서울 강남구 역삼동"
+    assert normalize("서울시 강남구 역삼동.") == normalize("서울 강남구 역삼동")
+    assert normalize("경기도 성남시 분당구") == "경기 성남시 분당구"
+
+def test_repeat_address_hits_cache(vworld):
+    first = asyncio.run(geocoding_vworld.geocode_vworld("서울 강남역"))
+    assert vworld == [("서울 강남역", "ROAD"), ("서울 강남역", "PARCEL")]
+    again = asyncio.run(geocoding_vworld.geocode_vworld("서울시  강남역"))
+    assert again == first
+    assert len(vworld) == 2
+
+def test_remembered_type_and_negative_cache(vworld):
+    asyncio.run(geocoding_vworld.geocode_vworld("서울 강남역"))
+    geocoding_vworld.GEOCODE_CACHE.memory.clear()
+    vworld.clear()
+    asyncio.run(geocoding_vworld.geocode_vworld("서울 강남역"))
+    assert vworld == [("서울 강남역", "PARCEL")]
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(geocoding_vworld.geocode_vworld("없는 주소"))
+        assert exc.value.status_code == 404
+    assert vworld.count(("없는 주소", "ROAD")) == 1
+
+def _slow_vworld(monkeypatch, delays):
+    calls = []
+
+    async def fake_call(address, addr_type):
+        calls.append(addr_type)
+        delay, ok = delays[addr_type]
+        await asyncio.sleep(delay)
+        if not ok:
+            raise HTTPException(404, f"VWorld 결과 없음({addr_type}): {address}")
+        return (37.0, 127.0) if addr_type == "ROAD" else (37.5, 127.5)
+
+    monkeypatch.setattr(geocoding_vworld, "_call_vworld", fake_call)
+    return calls
+
+def _gated_vworld(monkeypatch, road_gate):
+    """ROAD는 road_gate가 설정될 때까지 응답하지 않고, PARCEL은 바로 응답. 끝/취소 순서를 기록."""
+    events = []
+
+    async def fake_call(address, addr_type):
+        events.append(f"{addr_type} 시작")
+        try:
+            if addr_type == "ROAD":
+                await road_gate.wait()
+        except asyncio.CancelledError:
+            events.append("ROAD 취소")
+            raise
+        events.append(f"{addr_type} 완료")
+        return (37.0, 127.0) if addr_type == "ROAD" else (37.5, 127.5)
+
+    monkeypatch.setattr(geocoding_vworld, "_call_vworld", fake_call)
+    return events
+
+def test_hedged_parcel_wins_when_road_is_slow(vworld, monkeypatch):
+    events = _gated_vworld(monkeypatch, asyncio.Event())  # ROAD는 끝나지 않음
+    monkeypatch.setattr(geocoding_vworld, "GEOCODE_HEDGE_DELAY", 0.01)
+    monkeypatch.setattr(geocoding_vworld, "GEOCODE_PREFER_WINDOW", 0.01)
+    lookup = geocoding_vworld.geocode_vworld("서울 강남구 역삼동 823", hedge=True)
+    assert asyncio.run(asyncio.wait_for(lookup, timeout=10)) == (37.5, 127.5)
+    assert events == ["ROAD 시작", "PARCEL 시작", "PARCEL 완료", "ROAD 취소"]
+
+def test_hedged_prefers_road_within_window(vworld, monkeypatch):
+    road_gate = asyncio.Event()
+    events = _gated_vworld(monkeypatch, road_gate)
+    monkeypatch.setattr(geocoding_vworld, "GEOCODE_HEDGE_DELAY", 0.0)
+    monkeypatch.setattr(geocoding_vworld, "GEOCODE_PREFER_WINDOW", 10)
+
+    async def run():
+        lookup = asyncio.create_task(geocoding_vworld.geocode_vworld("서울 테헤란로 152", hedge=True))
+        for _ in range(1000):
+            if "PARCEL 완료" in events:
+                break
+            await asyncio.sleep(0)
+        road_gate.set()  # PARCEL이 먼저 온 뒤 창 안에서 ROAD 도착
+        return await asyncio.wait_for(lookup, timeout=10)
+
+    assert asyncio.run(run()) == (37.0, 127.0)
+    assert events == ["ROAD 시작", "PARCEL 시작", "PARCEL 완료", "ROAD 완료"]
+
+def test_concurrent_identical_addresses_share_one_lookup(vworld, monkeypatch):
+    calls = _slow_vworld(monkeypatch, {"ROAD": (0.05, True), "PARCEL": (0.05, True)})
+
+    async def run():
+        return await asyncio.gather(*(geocoding_vworld.geocode_vworld(a) for a in ["서울 강남역", "서울시 강남역", "서울특별시 강남역"] * 3))
+
+    results = asyncio.run(run())
+    assert calls == ["ROAD"]
+    assert set(results) == {(37.0, 127.0)}
+
+def test_vworld_error_status_is_not_cached_as_no_result(monkeypatch):
+    from types import SimpleNamespace
+    calls = []
+    replies = {
+        "없는 주소": {"response": {"status": "NOT_FOUND"}},
+        "키 오류": {"response": {"status": "ERROR", "error": {"code": "INVALID_KEY", "text": "등록되지 않은 인증키입니다."}}},
+    }
+
+    class FakeClient:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def get(self, url, params=None, timeout=None):
+            calls.append(params["address"])
+            return SimpleNamespace(status_code=200, json=lambda: replies[params["address"]])
+
+    monkeypatch.setattr(geocoding_vworld, "VWORLD_KEY", "test-key")
+    monkeypatch.setattr(geocoding_vworld, "upstream_client", lambda name: FakeClient())
+    monkeypatch.setattr(geocoding_vworld, "GEOCODE_CACHE", TieredCache("geocode", path=None, negative_ttl=600))
+    monkeypatch.setattr(geocoding_vworld, "GEOCODE_TYPE_HINTS", TieredCache("geocode_type", path=None))
+
+    statuses = []
+    for address in ("없는 주소", "없는 주소", "키 오류", "키 오류"):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(geocoding_vworld.geocode_vworld(address, hedge=False))
+        statuses.append(exc.value.status_code)
+    assert statuses == [404, 404, 502, 502]
+    # NOT_FOUND는 negative 캐시(ROAD+PARCEL 한 번씩), INVALID_KEY는 매번 다시 호출
+    assert calls.count("없는 주소") == 2 and calls.count("키 오류") == 4
+
+def test_hedged_cancelled_caller_does_not_orphan_first_request(vworld, monkeypatch):
+    states = []
+
+    async def slow_call(address, addr_type):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            states.append("cancelled")
+            raise
+
+    monkeypatch.setattr(geocoding_vworld, "_call_vworld", slow_call)
+
+    async def run():
+        task = asyncio.create_task(geocoding_vworld._geocode_hedged("서울 강남역", ["ROAD", "PARCEL"], 1.0, 0.1))
+        await asyncio.sleep(0.05)  # 아직 헤지 지연(1초) 안: 우선 유형 요청 하나만 진행 중
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
+    assert states == ["cancelled"]
+
+@pytest.mark.parametrize("hedge", [False, True])
+def test_transient_error_on_one_type_is_not_cached_as_no_result(vworld, monkeypatch, hedge):
+    calls = []
+
+    async def fake_call(address, addr_type):
+        calls.append(addr_type)
+        if addr_type == "ROAD":
+            raise HTTPException(502, "VWorld 오류(ROAD): ERROR")
+        raise HTTPException(404, f"VWorld 결과 없음({addr_type}): {address}")
+
+    monkeypatch.setattr(geocoding_vworld, "_call_vworld", fake_call)
+    monkeypatch.setattr(geocoding_vworld, "GEOCODE_HEDGE_DELAY", 0.0)
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(geocoding_vworld.geocode_vworld("서울 테헤란로 152", hedge=hedge))
+        assert exc.value.status_code == 502
+    # ROAD 장애 중 PARCEL NOT_FOUND는 '결과 없음'이 아님 -> 캐시하지 않고 다음 요청에서 다시 조회
+    assert calls.count("ROAD") == 2
@@ -0,0 +1,50 @@
+import os
+import sys
+import math
+import random
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+from python_ai_server.grid_projection import grid_to_latlon, grid_to_latlon_batch, latlon_to_grid, latlon_to_grid_batch
+
+def _baseline_latlon_to_grid(lat, lon):
+    # 상수를 매 호출마다 계산하던 기존 weather_kma.latlon_to_grid 구현
+    RE = 6371.00877; GRID = 5.0
+    SLAT1, SLAT2 = 30.0, 60.0; OLON, OLAT = 126.0, 38.0
+    XO, YO = 43, 136
+    DEGRAD = math.pi / 180.0
+    re = RE / GRID
+    slat1 = SLAT1 * DEGRAD; slat2 = SLAT2 * DEGRAD
+    olon = OLON * DEGRAD;  olat = OLAT * DEGRAD
+    sn = math.log(math.cos(slat1)/math.cos(slat2)) / math.log(
+        math.tan(math.pi*0.25+slat2*0.5)/math.tan(math.pi*0.25+slat1*0.5)
+    )
+    sf = (math.cos(slat1)*(math.tan(math.pi*0.25+slat1*0.5)**sn))/sn
+    ro = re*sf/(math.tan(math.pi*0.25+olat*0.5)**sn)
+    ra = re*sf/(math.tan(math.pi*0.25+(lat*DEGRAD)*0.5)**sn)
+    theta = (lon*DEGRAD)-olon
+    if theta > math.pi: theta -= 2.0*math.pi
+    if theta < -math.pi: theta += 2.0*math.pi
+    theta *= sn
+    x = ra*math.sin(theta)+XO+0.5
+    y = ro - ra*math.cos(theta)+YO+0.5
+    return int(x), int(y)
+
+def _random_points(n):
+    rng = random.Random(1234)
+    return [(rng.uniform(32.0, 39.5), rng.uniform(124.0, 132.0)) for _ in range(n)]
+
+def test_scalar_and_batch_match_baseline():
+    points = _random_points(20000)
+    expected = [_baseline_latlon_to_grid(lat, lon) for lat, lon in points]
+    assert [latlon_to_grid(lat, lon) for lat, lon in points] == expected
+    nx, ny = latlon_to_grid_batch([p[0] for p in points], [p[1] for p in points])
+    assert list(zip(nx.tolist(), ny.tolist())) == expected
+    assert latlon_to_grid(37.5665, 126.9780) == (60, 127)
+
+def test_grid_to_latlon_round_trips():
+    cells = [(60, 127), (98, 76), (52, 38), (89, 90)]
+    for nx, ny in cells:
+        assert latlon_to_grid(*grid_to_latlon(nx, ny)) == (nx, ny)
+    lats, lons = grid_to_latlon_batch([c[0] for c in cells], [c[1] for c in cells])
+    np.testing.assert_allclose(lats, [grid_to_latlon(*c)[0] for c in cells], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(lons, [grid_to_latlon(*c)[1] for c in cells], rtol=0, atol=1e-9)
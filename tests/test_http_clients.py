@@ -0,0 +1,55 @@
+import os
+import sys
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from python_ai_server import http_clients, metrics
+from python_ai_server.http_clients import ClientRegistry, UpstreamConfig
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_shared_client_reuses_connections(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    registry = ClientRegistry({"local_test": UpstreamConfig(timeout=5)})
+    monkeypatch.setattr(http_clients, "HTTP_CLIENTS", registry)
+
+    async def run():
+        await registry.start()
+        try:
+            for _ in range(5):
+                async with http_clients.upstream_client("local_test") as client:
+                    assert client is registry.shared("local_test")
+                    (await client.get(url)).raise_for_status()
+        finally:
+            await registry.aclose()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.shutdown()
+    assert http_clients.REQUESTS.value("local_test") == 5
+    assert http_clients.CONNECTIONS.value("local_test") == 1
+    assert 'upstream_http_connections_opened_total{upstream="local_test"} 1' in metrics.render()
+
+def test_outside_app_loop_uses_temporary_client():
+    async def run():
+        async with http_clients.upstream_client("open_meteo") as client:
+            assert http_clients.HTTP_CLIENTS.shared("open_meteo") is None
+            return client.timeout.read
+
+    assert asyncio.run(run()) == 10
@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from fastapi import HTTPException
+from python_ai_server import app as app_module
+from python_ai_server.recommendations.jobs import JobQueue, QueueFullError
+
+def test_lanes_run_in_priority_order_with_positions():
+    order = []
+
+    async def handler(payload):
+        order.append(payload)
+        await asyncio.sleep(0.01)
+        return {"payload": payload}
+
+    async def run():
+        queue = JobQueue(max_depth=10, workers=1)
+        submitted = [queue.submit(name, lane) for name, lane in (("low", "low"), ("normal-1", "normal"), ("high", "high"), ("normal-2", "normal"))]
+        positions = {job.payload: queue.position(job) for job in submitted}
+        queue.start(handler)
+        last = await queue.wait(submitted[0], 2)
+        await queue.stop()
+        return positions, queue.view(last)
+
+    positions, view = asyncio.run(run())
+    assert positions == {"high": 0, "normal-1": 1, "normal-2": 2, "low": 3}
+    assert order == ["high", "normal-1", "normal-2", "low"]
+    assert view["status"] == "done" and view["result"] == {"payload": "low"}
+
+def test_full_queue_rejects_with_retry_after_low_lane_first():
+    async def run():
+        queue = JobQueue(max_depth=4, workers=2)
+        queue.submit(0, "normal")
+        queue.submit(1, "normal")
+        with pytest.raises(QueueFullError) as low:
+            queue.submit(2, "low")  # 상한의 절반에서 low 먼저 거절
+        queue.submit(3, "high")
+        queue.submit(4, "normal")
+        with pytest.raises(QueueFullError) as high:
+            queue.submit(5, "high")
+        return low.value, high.value
+
+    low, high = asyncio.run(run())
+    assert low.status_code == high.status_code == 429
+    assert int(high.headers["Retry-After"]) >= 1
+
+def test_failed_job_reports_error_and_results_expire(monkeypatch):
+    async def handler(payload):
+        raise HTTPException(status_code=404, detail="주소를 찾을 수 없습니다.")
+
+    async def run():
+        queue = JobQueue(max_depth=4, workers=1, result_ttl=0.05)
+        job = queue.submit("없는 주소")
+        queue.start(handler)
+        await queue.wait(job, 1)
+        view = queue.view(job)
+        await asyncio.sleep(0.06)
+        expired = queue.get(job.id)
+        await queue.stop()
+        return view, expired
+
+    view, expired = asyncio.run(run())
+    assert view["status"] == "failed"
+    assert view["error"] == {"status": 404, "detail": "주소를 찾을 수 없습니다."}
+    assert expired is None
+
+def test_job_endpoints_long_poll_result(monkeypatch, patch_upstreams):
+    calls = patch_upstreams(llm_delay=0.05)
+    queue = JobQueue(max_depth=8, workers=2)
+    monkeypatch.setattr(app_module, "JOB_QUEUE", queue)
+    prepare = app_module.prepare_context
+    monkeypatch.setattr(app_module, "prepare_context", lambda body: prepare(body, app_module.geocode_vworld, app_module.fetch_simple_weather))
+
+    async def run():
+        queue.start(lambda body: app_module.recommend_one(body))
+        body = app_module.RecommendJobRequest(location="서울 강남역", date="2025-08-17", time="15:00", priority="high")
+        created = await app_module.create_recommend_job(body)
+        job_id = json.loads(created.body)["job_id"]
+        polled = await app_module.get_recommend_job(job_id, wait=2)
+        with pytest.raises(HTTPException) as missing:
+            await app_module.get_recommend_job("없는-작업", wait=0)
+        await queue.stop()
+        return created, json.loads(polled.body), missing.value
+
+    created, polled, missing = asyncio.run(run())
+    assert created.status_code == 202
+    assert created.headers["location"] == f"/recommend/jobs/{polled['job_id']}"
+    assert polled["status"] == "done" and polled["lane"] == "high"
+    assert polled["result"]["weather_text"] == "맑음, 25°C"
+    assert calls["llm"] == 1
+    assert missing.status_code == 404
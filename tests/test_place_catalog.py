@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from types import SimpleNamespace
+from python_ai_server import place_catalog
+from python_ai_server.place_catalog import PlaceCatalog, build_catalog, normalize_name, read_records
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "python_ai_server", "examples", "place_catalog_sample.csv")
+GANGNAM = (37.4979, 127.0276)
+
+def _distinct_result(result):
+    # valid_result는 세 코스가 같음 -> 코스 간 중복이 없도록 뒤 두 코스의 장소명/카테고리 구성을 바꿈
+    for i, course in enumerate(result["courses"][1:], start=2):
+        for j, stop in enumerate(course["스톱"], start=1):
+            stop["장소명"] = f"테스트 장소 {i}-{j}"
+        course["스톱"][-1]["카테고리"] = "공원" if i == 2 else "식당"
+    return result
+
+@pytest.fixture
+def catalog(tmp_path):
+    assert build_catalog(read_records(SAMPLE), str(tmp_path)) == 8
+    opened = PlaceCatalog(str(tmp_path))
+    yield opened
+    opened.close()
+
+def test_nearby_returns_closest_places_in_radius(catalog):
+    names = [place.name for place in catalog.nearby(*GANGNAM, radius_m=1000)]
+    assert names == ["스타벅스 강남역 2호점", "하이디라오 강남점"]
+    assert [p.name for p in catalog.nearby(*GANGNAM, radius_m=5000, categories=["박물관"])] == []
+    assert len(catalog.nearby(*GANGNAM, radius_m=10000, limit=3)) == 3
+
+def test_match_normalizes_and_tolerates_small_differences(catalog):
+    assert normalize_name(" 스타벅스  강남역(2호점) ") == "스타벅스강남역2호점"
+    place, score = catalog.match("스타벅스강남역2호점", *GANGNAM)
+    assert place.name == "스타벅스 강남역 2호점" and score == 1.0 and place.distance_m < 100
+    place, score = catalog.match("하이디라오 강남", *GANGNAM)
+    assert place.name == "하이디라오 강남점" and 0.6 <= score < 1.0
+    assert catalog.match("국립중앙박물관", *GANGNAM, radius_m=3000) is None  # 반경 밖
+    assert catalog.match("없는 장소") is None
+    bar = catalog.match("찰스바 청담점")[0]
+    assert bar.opening_hours() == "18:00-02:00" and bar.is_open_at(60) and not bar.is_open_at(12 * 60)
+
+def test_catalog_grounds_names_and_feeds_prompt_candidates(catalog, monkeypatch, valid_result, fake_openai, fake_completions):
+    from python_ai_server.recommendations import places
+    monkeypatch.setattr(places, "get_catalog", lambda: catalog)
+    generated = _distinct_result(valid_result)
+    generated["courses"][0]["스톱"][0]["장소명"] = "스타벅스 강남역2호점"
+    prompts = []
+    fake_openai(fake_completions(json.dumps(generated, ensure_ascii=False), on_create=lambda kwargs: prompts.append(kwargs["messages"][1]["content"])))
+
+    async def fake_photo(place_name, api_key, client):
+        return ""
+    monkeypatch.setattr(places, "get_photo_url_async", fake_photo)
+
+    result = asyncio.run(places.get_place_recommendations_async("서울 강남역", "2025-08-17", "15:00", weather_text="맑음", coords=GANGNAM))
+    assert "주변 실제 장소 후보" in prompts[0] and "하이디라오 강남점(식당)" in prompts[0]
+    first, _, last = result["courses"][0]["스톱"]
+    assert first["장소명"] == "스타벅스 강남역 2호점" and first["verified"] is True
+    assert first["lat"] == 37.4985 and first["opening_hours"] == "07:00-22:00"
+    assert last["verified"] is False  # 봉은사는 기준 좌표에서 약 3.2km(매칭 반경 3km 밖)
+
+def test_grounding_skips_corrections_that_break_validation(catalog, monkeypatch, valid_result):
+    from python_ai_server.recommendations import places
+    monkeypatch.setattr(places, "get_catalog", lambda: catalog)
+    result = _distinct_result(valid_result)
+    result["courses"][1]["스톱"][0]["장소명"] = "스타벅스 강남역2호"  # 보정하면 코스1 스톱과 중복
+    assert not places.cross_course_errors(result["courses"])
+
+    assert places.ground_courses(result, GANGNAM) >= 1
+    assert result["courses"][1]["스톱"][0]["장소명"] == "스타벅스 강남역2호"
+    assert result["courses"][1]["스톱"][0]["verified"] is False
+    assert not places.cross_course_errors(result["courses"]) and not places.schema_errors(result)
+
+    # 스트리밍: 이미 내보낸 코스의 장소명(taken)과도 겹치지 않게
+    single = {"courses": [json.loads(json.dumps(result["courses"][2], ensure_ascii=False))]}
+    single["courses"][0]["스톱"][0]["장소명"] = "하이디라오 강남"
+    places.ground_courses(single, GANGNAM, taken={places.normalize_place_name("하이디라오 강남점")})
+    assert single["courses"][0]["스톱"][0]["장소명"] == "하이디라오 강남"
@@ -59,3 +59,257 @@ def test_fallback_parse():
     arr_text = "[{\"title\":\"테스트\",\"total_estimated_minutes\":360,\"stops\":[{\"name\":\"스타벅스 강남역 2호점\",\"desc\":\"테스트\",\"typical_duration_min\":60,\"suggested_time_of_day\":\"morning\",\"category\":\"cafe\"}]}]"
     arr_parsed = fallback_parse(arr_text)
     assert arr_parsed and "courses" in arr_parsed
+
+def test_async_recommendations_do_not_block(monkeypatch, valid_result, fake_openai, fake_completions):
+    import asyncio
+    from python_ai_server.recommendations import places
+    gate = asyncio.Event()
+    # 다섯 요청이 모두 completion 호출에 들어와야 응답이 풀림 -> 요청이 직렬로 돌면 첫 호출에서 멈춤
+    completions = fake_openai(fake_completions(
+        json.dumps(valid_result, ensure_ascii=False), gate=gate,
+        on_create=lambda kwargs: completions.calls == 5 and gate.set(),
+    ))
+
+    async def fake_photo(place_name, api_key, client):
+        return f"photo:{place_name}"
+    monkeypatch.setattr(places, "get_photo_url_async", fake_photo)
+
+    async def run():
+        calls = [places.get_place_recommendations_async("서울 강남역", "2025-08-17", "15:00", weather_text="맑음") for _ in range(5)]
+        return await asyncio.wait_for(asyncio.gather(*calls), timeout=10)
+
+    results = asyncio.run(run())
+    assert completions.calls == 5
+    for result in results:
+        assert validate_course_schema(result)
+        assert result["weather_text"] == "맑음"
+        assert result["courses"][0]["스톱"][2]["photo_url"] == "photo:봉은사"
+
+def test_llm_slots_are_held_only_during_completions(monkeypatch, valid_result, fake_openai, fake_completions):
+    import asyncio
+    from python_ai_server.recommendations import places
+    slots = asyncio.Semaphore(1)
+    held = []
+    fake_openai(fake_completions(json.dumps(valid_result, ensure_ascii=False), on_create=lambda kwargs: held.append(("llm", slots.locked()))))
+
+    async def fake_photo(place_name, api_key, client):
+        held.append(("photo", slots.locked()))
+        return ""
+    monkeypatch.setattr(places, "get_photo_url_async", fake_photo)
+
+    result = asyncio.run(places.get_place_recommendations_async("서울 강남역", "2025-08-17", "15:00", llm_slots=slots))
+    assert validate_course_schema(result)
+    assert ("llm", True) in held
+    assert {locked for kind, locked in held if kind == "photo"} == {False}  # 사진 조회 중에는 슬롯을 놓음
+
+def test_photo_enrichment_dedupes_and_respects_budget(monkeypatch, valid_result):
+    import asyncio
+    from python_ai_server.recommendations import places
+    looked_up = []
+
+    async def fake_photo(place_name, api_key, client):
+        looked_up.append(place_name)
+        if place_name == "봉은사":
+            await asyncio.sleep(5)
+        return f"photo:{place_name}"
+    monkeypatch.setattr(places, "get_photo_url_async", fake_photo)
+
+    result = valid_result
+    monkeypatch.setattr(places, "PHOTO_TIME_BUDGET", 0.2)
+    asyncio.run(places.enrich_photos_async(result, "key"))
+
+    assert sorted(looked_up) == sorted(["스타벅스 강남역 2호점", "국립중앙박물관", "봉은사"])
+    for course in result["courses"]:
+        assert course["스톱"][0]["photo_url"] == "photo:스타벅스 강남역 2호점"
+        assert course["스톱"][2]["photo_url"] == ""
+
+def test_schema_errors_name_course_and_rule(valid_result):
+    from python_ai_server.recommendations.places import schema_errors, fix_course_locally
+    result = valid_result
+    result["courses"][1]["스톱"][0]["장소명"] = "역삼동"
+    result["courses"][2]["총예상소요시간"] = 200
+
+    errors = schema_errors(result)
+    assert list(errors) == [1, 2]
+    assert "접미사 '동'" in errors[1][0]
+    assert "총예상소요시간 200분" in errors[2][0]
+    assert fix_course_locally(result["courses"][2]) and result["courses"][2]["총예상소요시간"] == 240
+    assert not fix_course_locally(result["courses"][1])
+    assert schema_errors({"courses": []}) == {None: ["courses는 정확히 3개여야 함"]}
+
+def test_invalid_course_is_repaired_alone(monkeypatch, valid_result, fake_openai):
+    import asyncio
+    from python_ai_server.recommendations import places
+    broken = valid_result
+    broken["courses"][1]["스톱"][0]["장소명"] = "역삼동"
+    broken["courses"][2]["총예상소요시간"] = 999  # 로컬 보정 대상
+    replacement = dict(broken["courses"][0], 코스명="수리된 코스")
+    replies = [json.dumps(broken, ensure_ascii=False), json.dumps({"course": replacement}, ensure_ascii=False)]
+    requests_seen = []
+
+    class SequenceCompletions:
+        async def create(self, **kwargs):
+            from types import SimpleNamespace
+            requests_seen.append(kwargs)
+            message = SimpleNamespace(content=replies[len(requests_seen) - 1])
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    fake_openai(SequenceCompletions())
+    async def fake_photo(place_name, api_key, client):
+        return ""
+    monkeypatch.setattr(places, "get_photo_url_async", fake_photo)
+
+    result = asyncio.run(places.get_place_recommendations_async("서울 강남역", "2025-08-17", "15:00", weather_text="맑음"))
+    assert validate_course_schema(result)
+    assert len(requests_seen) == 2
+    assert requests_seen[0]["response_format"]["json_schema"] is places.JSON_SCHEMA
+    assert requests_seen[1]["response_format"]["json_schema"] is places.COURSE_SCHEMA
+    assert "2번째 코스" in requests_seen[1]["messages"][1]["content"]
+    assert [c["코스명"] for c in result["courses"]] == ["테스트 코스 0", "수리된 코스", "테스트 코스 2"]
+    assert result["courses"][2]["총예상소요시간"] == 240
+
+def _course(name, places, categories):
+    stops = [
+        {"장소명": place, "설명": "정상", "권장체류시간": 60, "권장시간대": "오후", "카테고리": category}
+        for place, category in zip(places, categories)
+    ]
+    return {"코스명": name, "총예상소요시간": 60 * len(stops) + 60, "스톱": stops}
+
+def test_parallel_mode_generates_courses_concurrently_and_dedupes(monkeypatch, fake_openai):
+    import asyncio
+    from types import SimpleNamespace
+    from python_ai_server.recommendations import places
+    by_theme = {
+        places.COURSE_THEMES[0]: _course("낮 코스", ["서울숲", "카페 어니언 성수점", "국립중앙박물관"], ["공원", "카페", "박물관"]),
+        places.COURSE_THEMES[1]: _course("야경 코스", ["서울스카이", "봉은사", "하이디라오 강남점"], ["야경", "기타", "식당"]),
+        # 첫 코스와 장소가 겹침 -> 이 코스만 다시 생성
+        places.COURSE_THEMES[2]: _course("실내 코스", ["국립중앙박물관", "코엑스 아쿠아리움", "별마당 도서관"], ["박물관", "액티비티", "기타"]),
+    }
+    repaired = _course("실내 코스", ["리움미술관", "코엑스 아쿠아리움", "별마당 도서관"], ["박물관", "액티비티", "기타"])
+    prompts = []
+    all_generating = asyncio.Event()
+
+    class ThemedCompletions:
+        async def create(self, **kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            prompts.append(prompt)
+            if len(prompts) == 3:
+                all_generating.set()
+            # 생성 3건이 모두 들어와야 응답 -> 코스를 하나씩 차례로 만들면 첫 호출에서 멈춤
+            await all_generating.wait()
+            course = repaired if "중복" in prompt else next(c for theme, c in by_theme.items() if theme in prompt)
+            message = SimpleNamespace(content=json.dumps({"course": course}, ensure_ascii=False))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    fake_openai(ThemedCompletions())
+    async def fake_photo(place_name, api_key, client):
+        return ""
+    monkeypatch.setattr(places, "get_photo_url_async", fake_photo)
+
+    generate = places.get_place_recommendations_async("서울 강남역", "2025-08-17", "15:00", weather_text="맑음", mode="parallel")
+    result = asyncio.run(asyncio.wait_for(generate, timeout=10))
+
+    assert validate_course_schema(result)
+    assert not places.cross_course_errors(result["courses"])
+    assert [c["코스명"] for c in result["courses"]] == ["낮 코스", "야경 코스", "실내 코스"]
+    assert result["courses"][2]["스톱"][0]["장소명"] == "리움미술관"
+    assert len(prompts) == 4 and "중복" in prompts[3]  # 생성 3건은 동시에, 수리 1건만 뒤따름
+
+def test_prompt_prefix_is_static_and_usage_counts_cached_tokens():
+    from types import SimpleNamespace
+    from python_ai_server.recommendations import places
+    first_system, first_user = places.build_prompts("서울 강남역", "2025-08-17", "15:00", "맑음")
+    second_system, second_user = places.build_prompts("부산 해운대", "2025-08-18", "19:00", None)
+    assert first_system is second_system
+    assert first_user.endswith("현지 날씨: 맑음") and "부산 해운대" in second_user
+    assert validate_course_schema(places.EXAMPLE_RESULT)
+
+    usage = {}
+    cached_before = places.TOKENS.value("cached")
+    response = SimpleNamespace(usage=SimpleNamespace(
+        prompt_tokens=1200, completion_tokens=300, total_tokens=1500,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1024),
+    ))
+    places.add_usage(usage, response)
+    places.add_usage(usage, response)
+    assert usage == {"prompt_tokens": 2400, "cached_tokens": 2048, "completion_tokens": 600, "total_tokens": 3000}
+    assert places.TOKENS.value("cached") - cached_before == 2048
+
+def test_extract_json_single_scan():
+    from python_ai_server.recommendations.places import extract_json, normalize_result, parse_payload
+    payload = {"courses": [{"title": "중괄호 } 와 \"따옴표\" 포함", "stops": []}]}
+    text = "예시 {이건 JSON 아님} 입니다.\n```json\n" + json.dumps(payload, ensure_ascii=False) + "\n```\n끝 ]"
+    assert extract_json(text) == payload
+    # 잘린 응답/짝이 안 맞는 괄호는 None
+    assert extract_json('{"courses": [{"title": "잘림"') is None
+    assert extract_json("[" * 50000 + "}" * 50000) is None
+    assert parse_payload("[" * 100000) is None  # json.loads의 RecursionError도 파싱 실패로
+    # 필드명 변환과 검증을 한 번에
+    english = {"courses": [{"title": "코스", "total_estimated_minutes": 240, "stops": [
+        {"name": "스타벅스 강남역 2호점", "desc": "설명", "typical_duration_min": 60, "suggested_time_of_day": "아침", "category": "카페"},
+        {"name": "국립중앙박물관", "desc": "설명", "typical_duration_min": 60, "suggested_time_of_day": "오후", "category": "박물관"},
+        {"name": "역삼동", "desc": "설명", "typical_duration_min": 60, "suggested_time_of_day": "저녁", "category": "공원"},
+    ]}] * 3}
+    result, errors = normalize_result(english)
+    assert result["courses"][0]["스톱"][0]["장소명"] == "스타벅스 강남역 2호점"
+    assert list(errors) == [0, 1, 2] and "접미사 '동'" in errors[0][0]
+    assert "title" in english["courses"][0]  # 입력은 그대로
+
+def test_validate_course_schema_requires_korean_field_names(valid_result):
+    from python_ai_server.recommendations.places import normalize_result
+    from python_ai_server.recommendations.result_cache import RecommendationCache, make_key
+    english = {"courses": [
+        {"title": c["코스명"], "total_estimated_minutes": c["총예상소요시간"], "stops": [
+            {"name": s["장소명"], "desc": s["설명"], "typical_duration_min": s["권장체류시간"], "suggested_time_of_day": s["권장시간대"], "category": s["카테고리"]}
+            for s in c["스톱"]
+        ]} for c in valid_result["courses"]
+    ]}
+    assert normalize_result(english)[1] == {}  # 모델 응답으로는 변환해서 통과
+    assert not validate_course_schema(english)  # 변환 전 결과는 캐시 저장 등에서 거절
+    assert not RecommendationCache().store(make_key(60, 127, "2025-08-17", "15:00", "맑음"), english, 0)
+
+def test_openai_client_is_shared_inside_app_lifespan(monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+    from python_ai_server.recommendations import places
+    created, closed = [], []
+
+    def factory(**kwargs):
+        async def close():
+            closed.append(client)
+        client = SimpleNamespace(close=close)
+        created.append(client)
+        return client
+    monkeypatch.setattr(places, "AsyncOpenAI", factory)
+
+    async def use_twice():
+        clients = []
+        for _ in range(2):
+            async with places.openai_client() as client:
+                clients.append(client)
+        return clients
+
+    async def run():
+        outside = await use_twice()  # 앱 밖: 호출마다 임시 클라이언트를 열고 닫음
+        holder = places.SharedOpenAI()
+        monkeypatch.setattr(places, "OPENAI_CLIENT", holder)
+        await holder.start()
+        inside = await use_twice()
+        closed_before_shutdown = len(closed)
+        await holder.aclose()
+        return outside, inside, closed_before_shutdown
+
+    outside, inside, closed_before_shutdown = asyncio.run(run())
+    assert outside[0] is not outside[1]
+    assert inside[0] is inside[1] and len(created) == 3
+    assert closed_before_shutdown == 2 and closed[-1] is inside[0]
+
+def test_sync_wrapper_refuses_running_loop():
+    import asyncio
+    from python_ai_server.recommendations import places
+
+    async def call_inside_loop():
+        with pytest.raises(RuntimeError, match="get_place_recommendations_async"):
+            places.get_place_recommendations("서울 강남역", "2025-08-17", "15:00", weather_text="맑음")
+
+    asyncio.run(call_inside_loop())
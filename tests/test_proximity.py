@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from python_ai_server.recommendations import proximity
+from python_ai_server.recommendations.proximity import ProximityIndex, geohash, haversine_m, reuse_or_generate
+
+GANGNAM = (37.4979, 127.0276)
+YEOKSAM = (37.4996, 127.0286)  # 강남역에서 약 200m
+
+@pytest.fixture
+def named_result(valid_result):
+    def make(name):
+        result = json.loads(json.dumps(valid_result, ensure_ascii=False))
+        result["courses"][0]["코스명"] = name
+        return result
+    return make
+
+def test_geohash_and_distance():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert 150 < haversine_m(*GANGNAM, *YEOKSAM) < 250
+
+def test_nearby_result_is_reused_within_radius_and_key(named_result):
+    index = ProximityIndex(radius_m=500, max_age=60)
+    assert index.add(*GANGNAM, "2025-08-17", "15:00", "맑음", named_result("강남"), tokens=900)
+    assert not index.add(*GANGNAM, "2025-08-17", "15:00", "맑음", {"courses": []})
+
+    found = index.find(*YEOKSAM, "2025-08-17", "14:10", "맑음")
+    assert found is not None and found[0]["courses"][0]["코스명"] == "강남" and found[1] < 250
+    assert index.find(*YEOKSAM, "2025-08-17", "19:00", "맑음") is None  # 시간대 다름
+    assert index.find(*YEOKSAM, "2025-08-17", "15:00", "비") is None   # 날씨 다름
+    assert index.find(37.5665, 126.9780, "2025-08-17", "15:00", "맑음") is None  # 시청: 반경 밖
+    assert index.stats["hits"] == 1 and index.stats["saved_tokens"] == 900
+    assert index.reuse_rate() == 0.25
+
+def test_eviction_expiry_and_rebuild(monkeypatch, named_result):
+    now = [1000.0]
+    monkeypatch.setattr(proximity.time, "time", lambda: now[0])
+    index = ProximityIndex(radius_m=500, max_age=60, maxsize=2, rebuild_every=2)
+    for i in range(3):
+        index.add(GANGNAM[0] + i * 0.0001, GANGNAM[1], "2025-08-17", "15:00", "맑음", named_result(f"코스{i}"))
+    assert len(index) == 2 and index.stats["evictions"] == 1
+    found = index.find(*GANGNAM, "2025-08-17", "15:00", "맑음")
+    assert found[0]["courses"][0]["코스명"] == "코스1"  # 가장 가까운 코스0은 제거됨
+
+    now[0] += 61
+    # 조회 때 만료 항목을 제거하고, 제거 수가 rebuild_every에 닿으면 버킷도 재구성
+    assert index.find(*GANGNAM, "2025-08-17", "15:00", "맑음") is None
+    assert index.stats["expirations"] == 2 and index.stats["rebuilds"] == 1
+    assert len(index) == 0 and index._buckets == {}
+
+def test_reuse_or_generate_skips_generation_for_nearby_request(named_result):
+    index = ProximityIndex(radius_m=500, max_age=60)
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        return named_result("생성"), 1200, proximity.time.time()
+
+    async def run():
+        first = await reuse_or_generate(index, *GANGNAM, "2025-08-17", "15:00", "맑음", generate)
+        second = await reuse_or_generate(index, *YEOKSAM, "2025-08-17", "15:30", "맑음", generate)
+        return first, second
+
+    (first, first_tokens, first_at), (second, second_tokens, second_at) = asyncio.run(run())
+    assert len(calls) == 1
+    assert (first_tokens, second_tokens) == (1200, 0)
+    assert second_at == index._entries[0].created_at  # 재사용 결과는 색인에 들어간 시각 그대로
+    assert second == first
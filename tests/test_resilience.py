@@ -0,0 +1,163 @@
+import os
+import sys
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from fastapi import HTTPException
+from python_ai_server import resilience, weather_kma, weather_provider
+from python_ai_server.cache import LRUCache
+from python_ai_server.resilience import CircuitOpenError, ProviderHealth
+
+def _fail(health, exc):
+    with pytest.raises(type(exc)):
+        with health.guard():
+            raise exc
+
+def test_breaker_opens_and_recovers_through_probe(monkeypatch):
+    monkeypatch.setattr(resilience, "BREAKER_MIN_CALLS", 4)
+    health = ProviderHealth("test", base_timeout=10, min_timeout=1)
+    for _ in range(3):
+        with health.guard():
+            pass
+    # 클라이언트 오류(404)는 오류로 세지 않음
+    for _ in range(5):
+        _fail(health, HTTPException(404, "결과 없음"))
+    assert health.state == resilience.CLOSED
+    for _ in range(8):
+        _fail(health, HTTPException(502, "업스트림 오류"))
+    assert health.state == resilience.OPEN
+    with pytest.raises(CircuitOpenError):
+        with health.guard():
+            pass
+
+    # 대기 시간이 지나면 시험 호출 한 건만 허용, 성공하면 닫힘
+    monkeypatch.setattr(resilience, "BREAKER_OPEN_SECONDS", 0)
+    probe = health.guard()
+    probe.__enter__()
+    assert health.state == resilience.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        with health.guard():
+            pass
+    probe.__exit__(None, None, None)
+    assert health.state == resilience.CLOSED and health.error_rate() == 0
+
+def test_cancelled_call_is_not_counted():
+    health = ProviderHealth("test", base_timeout=10, min_timeout=1)
+
+    async def run():
+        async def slow():
+            with health.guard():
+                await asyncio.sleep(1)
+        task = asyncio.create_task(slow())
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert health.error_rate() == 0 and not health._outcomes
+
+def test_timeout_follows_observed_latency(monkeypatch):
+    health = ProviderHealth("test", base_timeout=10, min_timeout=0.5)
+    for _ in range(resilience.ADAPTIVE_TIMEOUT_MIN_SAMPLES - 1):
+        health.record(True, 0.2)
+    assert health.timeout() == 10
+    health.record(True, 0.2)
+    assert health.timeout() == pytest.approx(0.2 * resilience.ADAPTIVE_TIMEOUT_MULTIPLIER)
+    for _ in range(resilience.LATENCY_WINDOW):
+        health.record(True, 0.01)
+    assert health.timeout() == 0.5
+    for _ in range(resilience.LATENCY_WINDOW):
+        health.record(True, 30)
+    assert health.timeout() == 10
+
+def test_open_kma_breaker_falls_back_without_calling(monkeypatch, fake_forecast):
+    kma = ProviderHealth("kma", base_timeout=15, min_timeout=2)
+    kma.state, kma._opened_at = resilience.OPEN, float("inf")
+    monkeypatch.setitem(resilience.PROVIDERS, "kma", kma)
+    monkeypatch.setattr(weather_provider, "KMA_KEY", "key")
+    monkeypatch.setattr(weather_provider, "WEATHER_PRIMARY", "kma")
+    monkeypatch.setattr(weather_kma, "KMA_SERVICE_KEY", "key")
+    monkeypatch.setattr(weather_kma, "KMA_FORECAST_CACHE", LRUCache(16))
+    monkeypatch.setattr(weather_provider, "FORECAST_CACHE", LRUCache(16))
+    kma_calls = []
+
+    async def fake_open_meteo(lat, lon):
+        return fake_forecast
+
+    class NoClient:
+        async def __aenter__(self):
+            kma_calls.append(1)
+            raise AssertionError("KMA는 호출되면 안 됨")
+
+    monkeypatch.setattr(weather_provider, "_fetch_open_meteo", fake_open_meteo)
+    monkeypatch.setattr(weather_kma, "upstream_client", lambda name: NoClient())
+    weather = asyncio.run(weather_provider.fetch_simple_weather(37.4979, 127.0276, "20250824", "14:00"))
+    assert weather == {"TMP": "27.0", "COND": "맑음"}
+    assert kma_calls == []
+
+def test_timeouts_are_recorded_at_the_timeout_so_it_can_grow_back(monkeypatch):
+    import httpx
+    monkeypatch.setattr(resilience, "BREAKER_MIN_CALLS", 1000)
+    health = ProviderHealth("test", base_timeout=10, min_timeout=0.1)
+    for _ in range(resilience.ADAPTIVE_TIMEOUT_MIN_SAMPLES):
+        health.record(True, 0.1)
+    assert health.timeout() == pytest.approx(0.3)
+    # 업스트림이 느려져 타임아웃이 나면(호출 측이 HTTPException으로 감싸도) 타임아웃 값으로 기록 -> 다시 늘어남
+    def timed_out():
+        with pytest.raises(HTTPException):
+            with health.guard():
+                try:
+                    raise httpx.ReadTimeout("느림")
+                except Exception as e:
+                    raise HTTPException(502, f"요청 실패: {e}")
+
+    timed_out()
+    assert health.timeout() == pytest.approx(0.9)
+    _fail(health, HTTPException(502, "업스트림 오류"))  # 타임아웃이 아닌 오류는 지연으로 세지 않음
+    assert health.timeout() == pytest.approx(0.9)
+    for _ in range(3):
+        timed_out()
+    assert health.timeout() == 10  # 계속 타임아웃이면 기본 타임아웃까지 회복
+
+def test_kma_error_code_counts_toward_breaker(monkeypatch):
+    from types import SimpleNamespace
+    kma = ProviderHealth("kma", base_timeout=15, min_timeout=2)
+    monkeypatch.setitem(resilience.PROVIDERS, "kma", kma)
+
+    class QuotaClient:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def get(self, url, params=None, timeout=None):
+            data = {"response": {"header": {"resultCode": "22", "resultMsg": "LIMITED_NUMBER_OF_SERVICE_REQUESTS_EXCEEDS_ERROR"}}}
+            return SimpleNamespace(json=lambda: data, raise_for_status=lambda: None)
+
+    monkeypatch.setattr(weather_kma, "upstream_client", lambda name: QuotaClient())
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(weather_kma._fetch_page(60, 127, "20250824", "1100", 1))
+    assert exc.value.status_code == 502
+    assert kma.error_rate() == 1.0
+
+def test_stream_read_failure_counts_toward_openai_breaker(monkeypatch, fake_openai, fake_stream):
+    from types import SimpleNamespace
+    from python_ai_server.recommendations import streaming
+    openai = ProviderHealth("openai", base_timeout=30, min_timeout=10)
+    monkeypatch.setitem(resilience.PROVIDERS, "openai", openai)
+
+    class BrokenStream:
+        async def create(self, **kwargs):
+            async def gen():
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content='{"courses": ['))], usage=None)
+                raise ConnectionError("스트림 끊김")
+            return fake_stream(gen())
+
+    fake_openai(BrokenStream())
+
+    async def run():
+        return [event async for event, _ in streaming.stream_place_recommendations("서울 강남역", "2025-08-17", "15:00")]
+
+    assert asyncio.run(run()) == ["error", "done"]
+    assert openai.error_rate() == 1.0
@@ -0,0 +1,81 @@
+import os
+import sys
+import asyncio
+import json
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from python_ai_server.recommendations.result_cache import RecommendationCache, make_key
+
+def _generator(calls, result, tokens=1200):
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return json.loads(json.dumps(result, ensure_ascii=False)), tokens, time.time()
+    return generate
+
+def test_make_key_buckets_time_and_weather():
+    assert make_key(60, 127, "2025-08-17", "15:00", "구름많음") == (60, 127, "20250817", "오후", "흐림")
+    assert make_key(60, 127, "2025-08-17", "14:10", "흐림") == make_key(60, 127, "20250817", "13:00", "부분적으로 흐림")
+    assert make_key(60, 127, "2025-08-17", "23:30", "비(약)")[3:] == ("밤", "비")
+
+def test_fresh_hit_saves_tokens_and_failures_are_not_cached(valid_result):
+    cache = RecommendationCache(ttl=60, stale_ttl=60)
+    calls = []
+    key = make_key(60, 127, "2025-08-17", "15:00", "맑음")
+
+    async def run():
+        first = await cache.get_or_generate(key, _generator(calls, valid_result))
+        first["weather_text"] = "바뀐 값"
+        second = await cache.get_or_generate(key, _generator(calls, valid_result))
+        failed_key = make_key(61, 127, "2025-08-17", "15:00", "맑음")
+        failure = {"courses": [{"코스명": "생성 실패", "총예상소요시간": 0, "스톱": []}]}
+        await cache.get_or_generate(failed_key, _generator(calls, failure))
+        await cache.get_or_generate(failed_key, _generator(calls, failure))
+        return second
+
+    second = asyncio.run(run())
+    assert "weather_text" not in second
+    assert len(calls) == 3
+    assert cache.stats["hits"] == 1 and cache.stats["saved_tokens"] == 1200
+    assert cache.stats["rejected"] == 2
+
+def test_stale_entry_is_served_and_refreshed_once_in_background(valid_result):
+    cache = RecommendationCache(ttl=0, stale_ttl=60)
+    calls = []
+    key = make_key(60, 127, "2025-08-17", "15:00", "맑음")
+
+    async def run():
+        await cache.get_or_generate(key, _generator(calls, valid_result))
+        served = await asyncio.gather(*(cache.get_or_generate(key, _generator(calls, valid_result)) for _ in range(5)))
+        await asyncio.sleep(0.05)
+        return served
+
+    served = asyncio.run(run())
+    assert all(s["courses"] == valid_result["courses"] for s in served)
+    assert cache.stats["stale_hits"] == 5
+    assert len(calls) == 2 and cache.stats["refreshes"] == 1
+
+def test_concurrent_misses_share_one_generation(valid_result):
+    cache = RecommendationCache(ttl=60, stale_ttl=60)
+    calls = []
+    key = make_key(60, 127, "2025-08-17", "15:00", "맑음")
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_generate(key, _generator(calls, valid_result)) for _ in range(8)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    results[0]["weather_text"] = "요청별 값"
+    assert "weather_text" not in results[1]
+
+def test_reused_result_keeps_its_original_age(valid_result):
+    cache = RecommendationCache(ttl=60, stale_ttl=60)
+    key = make_key(60, 127, "2025-08-17", "15:00", "맑음")
+    # 근접 재사용으로 받은 결과가 이미 90초 지난 것이면 stale 구간(30초 남음)으로 저장
+    assert cache.store(key, valid_result, 0, created_at=time.time() - 90)
+    assert cache.peek(key) is None
+    assert cache._entries.get(key).fresh_until < time.time()
+    # 신선 + stale 기간이 모두 지난 결과는 저장하지 않음
+    old_key = make_key(61, 127, "2025-08-17", "15:00", "맑음")
+    assert not cache.store(old_key, valid_result, 0, created_at=time.time() - 121)
+    assert cache._entries.get(old_key) is None
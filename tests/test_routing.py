@@ -0,0 +1,114 @@
+import os
+import sys
+import random
+import itertools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from python_ai_server.recommendations.places import validate_course
+from python_ai_server.recommendations import routing
+from python_ai_server.recommendations.routing import best_order, route_course, travel_minutes
+
+def _path_cost(minutes, order, start=None):
+    cost = start[order[0]] if start is not None else 0.0
+    return cost + sum(minutes[a][b] for a, b in zip(order, order[1:]))
+
+def test_travel_matrix_walks_short_legs_and_rides_long_ones():
+    minutes = travel_minutes([37.4979, 37.5006, 37.5240], [127.0276, 127.0265, 126.9804])
+    assert minutes.shape == (3, 3) and (minutes.diagonal() == 0).all()
+    assert (minutes == minutes.T).all()
+    assert 3 < minutes[0, 1] < 6    # 약 300m 도보
+    assert 20 < minutes[0, 2] < 40  # 약 5km 이동
+
+def test_best_order_matches_brute_force_with_time_constraints():
+    rng = random.Random(3)
+    for _ in range(30):
+        n = rng.randint(3, 7)
+        points = [(37.45 + rng.random() * 0.1, 126.95 + rng.random() * 0.1) for _ in range(n)]
+        ranks = [rng.randint(0, 3) for _ in range(n)]
+        matrix = travel_minutes([p[0] for p in points], [p[1] for p in points]).tolist()
+        start = [rng.random() * 20 for _ in range(n)]
+        order = best_order(matrix, ranks, start)
+        feasible = [
+            perm for perm in itertools.permutations(range(n))
+            if all(ranks[a] <= ranks[b] for a, b in zip(perm, perm[1:]))
+        ]
+        assert sorted(order) == list(range(n))
+        assert all(ranks[a] <= ranks[b] for a, b in zip(order, order[1:]))
+        assert abs(_path_cost(matrix, order, start) - min(_path_cost(matrix, p, start) for p in feasible)) < 1e-9
+
+def _stop(name, slot, lat, lon, category="카페"):
+    return {"장소명": name, "설명": "정상", "권장체류시간": 60, "권장시간대": slot, "카테고리": category, "lat": lat, "lon": lon}
+
+def test_route_course_reorders_and_recomputes_duration():
+    course = {
+        "코스명": "강남 코스",
+        "총예상소요시간": 300,
+        "스톱": [
+            _stop("봉은사", "오후", 37.5153, 127.0573, "기타"),
+            _stop("스타벅스 강남역 2호점", "오후", 37.4985, 127.0283),
+            _stop("선릉과 정릉", "오후", 37.5087, 127.0489, "공원"),
+            _stop("찰스바 청담점", "밤", 37.5247, 127.0471, "바"),
+        ],
+    }
+    assert route_course(course, origin=(37.4979, 127.0276))
+    assert [s["장소명"] for s in course["스톱"]] == ["스타벅스 강남역 2호점", "선릉과 정릉", "봉은사", "찰스바 청담점"]
+    assert course["스톱"][0]["travel_min"] == 0
+    assert course["총예상소요시간"] == 240 + course["travel_total_min"]
+    assert sum(s["travel_min"] for s in course["스톱"]) == course["travel_total_min"]
+    assert validate_course(course)
+
+    no_coords = {"코스명": "x", "총예상소요시간": 240, "스톱": [{"장소명": "a", "권장체류시간": 60}]}
+    assert not route_course(no_coords) and "travel_total_min" not in no_coords
+
+def test_route_course_builds_one_matrix_per_course(monkeypatch):
+    # 응답당 비용: 코스마다 이동시간 행렬 한 번(벡터 연산) + DP 한 번, 스톱 쌍별 거리 계산 없음
+    calls = {"matrix": 0, "dp": 0}
+
+    def counted(name, fn):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return fn(*args, **kwargs)
+        return wrapper
+    monkeypatch.setattr(routing, "travel_minutes", counted("matrix", routing.travel_minutes))
+    monkeypatch.setattr(routing, "best_order", counted("dp", routing.best_order))
+    rng = random.Random(5)
+    slots = ["아침", "오후", "저녁", "밤"]
+    courses = [
+        {"코스명": f"코스{k}", "총예상소요시간": 500, "스톱": [
+            _stop(f"장소{k}-{i}", rng.choice(slots), 37.45 + rng.random() * 0.1, 126.95 + rng.random() * 0.1) for i in range(7)
+        ]}
+        for k in range(30)
+    ]
+    assert all(route_course(course) for course in courses)
+    assert calls == {"matrix": 30, "dp": 30}
+
+def test_route_course_out_of_range_total_leaves_course_untouched():
+    # 체류시간 합 720분 + 서울 <-> 부산 이동: 900분 초과 -> 순서/이동시간/총시간 모두 그대로
+    stops = [
+        _stop("부산 카페", "오후", 35.1587, 129.1604),
+        _stop("서울 카페", "오후", 37.4985, 127.0283, "식당"),
+        _stop("서울 공원", "오후", 37.5087, 127.0489, "공원"),
+    ]
+    for stop in stops:
+        stop["권장체류시간"] = 240
+    course = {"코스명": "무리한 코스", "총예상소요시간": 800, "스톱": stops}
+    before = [dict(stop) for stop in stops]
+    assert not route_course(course, origin=(37.4979, 127.0276))
+    assert course["스톱"] == before
+    assert course["총예상소요시간"] == 800 and "travel_total_min" not in course
+
+def test_model_supplied_travel_total_is_ignored():
+    from python_ai_server.recommendations.places import prepare_course
+    course = {
+        "코스명": "모델 코스",
+        "총예상소요시간": 500,  # 체류시간 합 180분 + 30~120 범위 밖 -> 로컬 보정 대상
+        "travel_total_min": 17,
+        "스톱": [
+            _stop("스타벅스 강남역 2호점", "오후", 37.4985, 127.0283),
+            _stop("선릉과 정릉", "오후", 37.5087, 127.0489, "공원"),
+            _stop("봉은사", "오후", 37.5153, 127.0573, "기타"),
+        ],
+    }
+    course["스톱"][0]["travel_min"] = 5
+    prepared, errors = prepare_course(course)
+    assert errors == [] and prepared["총예상소요시간"] == 240
+    assert "travel_total_min" not in prepared and "travel_min" not in prepared["스톱"][0]
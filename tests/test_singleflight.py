@@ -0,0 +1,46 @@
+import os
+import sys
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from python_ai_server.singleflight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == {"value": 42} for r in results)
+
+def test_cancelled_waiter_does_not_cancel_shared_work():
+    flight = SingleFlight("test")
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()  # 클라이언트 연결 끊김
+        result = await second
+        orphan = asyncio.create_task(flight.do("other", work))
+        await asyncio.sleep(0.01)
+        orphan.cancel()  # 기다리는 쪽이 모두 사라져도 작업은 끝까지 실행
+        await asyncio.sleep(0.08)
+        return first.cancelled(), result
+
+    cancelled, result = asyncio.run(run())
+    assert cancelled and result == "done"
+    assert len(finished) == 2
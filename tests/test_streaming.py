@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from types import SimpleNamespace
+from python_ai_server.recommendations import places, streaming
+from python_ai_server.recommendations.streaming import IncrementalCourseParser
+
+def _feed_in_chunks(text, size):
+    parser = IncrementalCourseParser()
+    found = []
+    for i in range(0, len(text), size):
+        found.extend(parser.feed(text[i:i + size]))
+    return found
+
+def test_parser_emits_each_course_once_across_chunks(valid_result):
+    text = json.dumps(valid_result, ensure_ascii=False)
+    for size in (1, 7, len(text)):
+        courses = _feed_in_chunks(text, size)
+        assert courses == valid_result["courses"]
+
+def test_parser_handles_fences_root_arrays_and_braces_in_strings():
+    course = {"코스명": "괄호 } ] { [ 와 \"따옴표\"", "스톱": []}
+    fenced = "```json\n" + json.dumps({"courses": [course, course]}, ensure_ascii=False) + "\n```"
+    assert _feed_in_chunks(fenced, 3) == [course, course]
+    assert _feed_in_chunks(json.dumps([course], ensure_ascii=False), 2) == [course]
+
+def _chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+def test_stream_emits_courses_before_completion(monkeypatch, valid_result, fake_openai, fake_stream):
+    text = json.dumps(valid_result, ensure_ascii=False)
+    # 두 번째 코스 직전에서 멈추고, 첫 코스 이벤트를 받은 뒤에야 나머지를 보내는 스트림
+    split = text.index('{"코스명": "테스트 코스 1"')
+    first_course_seen = asyncio.Event()
+    order = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            assert kwargs["stream"] is True
+            async def gen():
+                yield _chunk(text[:split])
+                await first_course_seen.wait()
+                order.append("stream_resumed")
+                yield _chunk(text[split:])
+                yield _chunk(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30))
+            return fake_stream(gen())
+
+    fake_openai(FakeCompletions())
+
+    async def fake_photo(place_name, api_key, client):
+        return f"photo:{place_name}"
+    monkeypatch.setattr(places, "get_photo_url_async", fake_photo)
+
+    stored = []
+    usage = {}
+
+    async def run():
+        events = []
+        async for event, data in streaming.stream_place_recommendations(
+            "서울 강남역", "2025-08-17", "15:00", weather_text="맑음", usage=usage, on_result=stored.append
+        ):
+            if event == "course" and data["index"] == 0:
+                order.append("course_0")
+                first_course_seen.set()
+            events.append((event, data))
+        return events
+
+    events = asyncio.run(asyncio.wait_for(run(), timeout=10))
+    courses = [e for e in events if e[0] == "course"]
+    photos = [e for e in events if e[0] == "photo"]
+    assert [c[1]["index"] for c in courses] == [0, 1, 2]
+    assert order == ["course_0", "stream_resumed"]  # 첫 코스는 스트림이 끝나기 전에 도착
+    assert courses[0][1]["course"]["스톱"][0]["photo_url"] == ""
+    assert len(photos) == 9 and all(p[1]["photo_url"].startswith("photo:") for p in photos)
+    assert events[-1] == ("done", {"courses": 3, "complete": True, "rejected": 0})
+    assert usage["total_tokens"] == 30
+    assert stored and places.validate_course_schema(stored[0])
+    assert stored[0]["courses"][1]["스톱"][2]["photo_url"] == "photo:봉은사"
+
+def _distinct_courses(result):
+    for i, course in enumerate(result["courses"]):
+        course["코스명"] = f"테스트 코스 {i}"
+        for j, stop in enumerate(course["스톱"]):
+            stop["장소명"] = f"장소 {i}-{j}"
+    return result["courses"]
+
+def test_stream_repairs_rejected_course_and_hides_internal_errors(valid_result, fake_openai, fake_stream):
+    good = _distinct_courses(valid_result)
+    broken = json.loads(json.dumps(good[1], ensure_ascii=False))
+    broken["스톱"] = broken["스톱"][:1]  # 스톱 수 위반
+    text = json.dumps({"courses": [good[0], broken, good[2]]}, ensure_ascii=False)
+    requests = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            requests.append(kwargs.get("stream", False))
+            if kwargs.get("stream"):
+                async def gen():
+                    yield _chunk(text)
+                return fake_stream(gen())
+            # 코스 단위 수리(비스트림) 호출
+            content = json.dumps({"course": good[1]}, ensure_ascii=False)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    fake_openai(FakeCompletions())
+
+    async def run():
+        return [(event, data) async for event, data in streaming.stream_place_recommendations("서울 강남역", "2025-08-17", "15:00")]
+
+    events = asyncio.run(run())
+    courses = [data["course"]["코스명"] for event, data in events if event == "course"]
+    assert requests == [True, False]
+    assert courses == ["테스트 코스 0", "테스트 코스 2", "테스트 코스 1"]
+    assert events[-1] == ("done", {"courses": 3, "complete": True, "rejected": 1})
+
+    class Failing:
+        async def create(self, **kwargs):
+            raise RuntimeError("내부 연결 정보 sk-secret")
+
+    fake_openai(Failing())
+    events = asyncio.run(run())
+    assert events[0][0] == "error" and "sk-secret" not in events[0][1]["message"]
+
+def test_client_disconnect_closes_upstream_stream(valid_result, fake_openai, fake_stream):
+    text = json.dumps(valid_result, ensure_ascii=False)
+    streams = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            async def gen():
+                yield _chunk(text[:10])
+                await asyncio.Event().wait()  # 끝나지 않는 스트림
+            streams.append(fake_stream(gen()))
+            return streams[-1]
+
+    fake_openai(FakeCompletions())
+
+    async def run():
+        async def consume():
+            async for _ in streaming.stream_place_recommendations("서울 강남역", "2025-08-17", "15:00"):
+                pass
+        consumer = asyncio.create_task(consume())
+        for _ in range(100):
+            if streams:
+                break
+            await asyncio.sleep(0)
+        consumer.cancel()  # 클라이언트 끊김: 응답을 보내던 작업이 취소됨
+        await asyncio.gather(consumer, return_exceptions=True)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert streams and streams[0].closed
@@ -0,0 +1,96 @@
+import os
+import sys
+import asyncio
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from python_ai_server import app as app_module
+from python_ai_server import metrics, tracing
+from python_ai_server.tracing import current_trace, stage, start_trace
+
+def test_histogram_render_is_cumulative():
+    hist = metrics.Histogram("test_latency_seconds", "테스트", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(value, "llm")
+    lines = hist.render()
+    assert 'test_latency_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="llm",le="1"} 3' in lines
+    assert 'test_latency_seconds_bucket{stage="llm",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{stage="llm"} 4' in lines
+    assert hist.value("llm") == 4
+
+def test_stage_records_outcome_and_errors():
+    async def run():
+        trace = start_trace(sample_rate=1.0)
+        with stage("geocode") as span:
+            span.outcome = "ROAD"
+        with pytest.raises(HTTPException):
+            with stage("weather"):
+                raise HTTPException(status_code=502, detail="실패")
+        # 같은 요청에서 만든 작업의 단계도 같은 추적에 기록
+        async def photos():
+            with stage("photos") as span:
+                span.outcome = "partial"
+        await asyncio.create_task(photos())
+        return trace
+
+    trace = asyncio.run(run())
+    breakdown = trace.breakdown()
+    assert breakdown["geocode"]["outcomes"] == ["ROAD"]
+    assert breakdown["weather"]["outcomes"] == ["502"]
+    assert breakdown["photos"]["outcomes"] == ["partial"]
+    assert 'geocode;desc="ROAD";dur=' in trace.server_timing()
+
+def test_unsampled_request_is_noop():
+    before = tracing.STAGE_SECONDS.value("noop_stage", "ok")
+
+    async def run():
+        assert start_trace(sample_rate=0.0) is None
+        with stage("noop_stage") as span:
+            span.outcome = "ignored"
+        return current_trace()
+
+    assert asyncio.run(run()) is None
+    assert tracing.STAGE_SECONDS.value("noop_stage", "ok") == before
+
+def test_recommend_reports_server_timing(monkeypatch, patch_upstreams):
+    patch_upstreams(llm_delay=0.0)
+    prepare = app_module.prepare_context
+    monkeypatch.setattr(app_module, "prepare_context", lambda body: prepare(body, app_module.geocode_vworld, app_module.fetch_simple_weather))
+    client = TestClient(app_module.app)
+    body = {"location": "서울 강남역", "date": "2025-08-20", "time": "14:00"}
+
+    response = client.post("/recommend", json=body, headers={"X-Debug-Timing": "1"})
+    assert response.status_code == 200
+    assert "total;dur=" in response.headers["Server-Timing"]
+    assert "total" in response.json()["_timing"]
+
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.0)
+    response = client.post("/recommend", json=body)
+    assert "Server-Timing" not in response.headers
+    assert "_timing" not in response.json()
+
+def test_streaming_response_is_timed_to_the_end(monkeypatch, patch_upstreams):
+    patch_upstreams(llm_delay=0.0)
+    prepare = app_module.prepare_context
+    monkeypatch.setattr(app_module, "prepare_context", lambda body: prepare(body, app_module.geocode_vworld, app_module.fetch_simple_weather))
+
+    async def fake_stream(*args, **kwargs):
+        await asyncio.sleep(0.2)
+        with stage("llm") as span:
+            span.outcome = "stream"
+        yield "done", {"courses": 0, "complete": True, "rejected": 0}
+    monkeypatch.setattr(app_module, "stream_place_recommendations", fake_stream)
+    client = TestClient(app_module.app)
+    body = {"location": "서울 강남역", "date": "2025-08-21", "time": "14:00"}
+    before = tracing.REQUEST_SECONDS.value("/recommend/stream")
+
+    response = client.post("/recommend/stream", json=body, headers={"X-Debug-Timing": "1"})
+    assert "Server-Timing" not in response.headers  # 헤더 시점의 시간은 의미 없음
+    events = response.text.strip().split("\n\n")
+    assert events[-1].startswith("event: timing")
+    timing = json.loads(events[-1].split("data: ", 1)[1])
+    assert timing["llm"]["outcomes"] == ["stream"] and timing["total"]["ms"] >= 200
+    assert tracing.REQUEST_SECONDS.value("/recommend/stream") == before + 1
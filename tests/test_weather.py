@@ -0,0 +1,80 @@
+import os
+import sys
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from datetime import datetime
+from python_ai_server import weather_kma, weather_provider
+from python_ai_server.cache import LRUCache
+
+def test_open_meteo_cell_cache_shares_one_fetch(monkeypatch, fake_forecast):
+    calls = []
+
+    async def fake_fetch(lat, lon):
+        calls.append((lat, lon))
+        await asyncio.sleep(0.05)
+        return fake_forecast
+
+    monkeypatch.setattr(weather_provider, "KMA_KEY", None)
+    monkeypatch.setattr(weather_provider, "FORECAST_CACHE", LRUCache(16))
+    monkeypatch.setattr(weather_provider, "_fetch_open_meteo", fake_fetch)
+
+    async def run():
+        # 같은 격자 셀 안의 서로 다른 좌표, 서로 다른 날짜/시간
+        first = await asyncio.gather(
+            weather_provider.fetch_simple_weather(37.4979, 127.0276, "20250824", "14:00"),
+            weather_provider.fetch_simple_weather(37.4980, 127.0277, "20250825", "09:40"),
+        )
+        later = await weather_provider.fetch_simple_weather(37.4981, 127.0278, "20250824", "23:10")
+        return first, later
+
+    (today, tomorrow), late = asyncio.run(run())
+    assert len(calls) == 1
+    assert today == {"TMP": "27.0", "COND": "맑음"}
+    assert tomorrow == {"TMP": "37.0", "COND": "비(약)"}
+    assert late == {"TMP": "31.5", "COND": "맑음"}
+
+def test_next_update_at_aligns_to_cadence(monkeypatch):
+    monkeypatch.setattr(weather_provider, "OPEN_METEO_UPDATE_INTERVAL", 3600)
+    monkeypatch.setattr(weather_provider, "OPEN_METEO_UPDATE_OFFSET", 300)
+    assert weather_provider._next_update_at(7200 + 100) == 7200 + 300
+    assert weather_provider._next_update_at(7200 + 300) == 10800 + 300
+
+def test_latest_base_date_time_rolls_over():
+    kst = weather_kma.KST
+    assert weather_kma.latest_base_date_time(datetime(2025, 8, 24, 1, 30, tzinfo=kst)) == ("20250823", "2300")
+    assert weather_kma.latest_base_date_time(datetime(2025, 8, 24, 14, 5, tzinfo=kst)) == ("20250824", "1100")
+    assert weather_kma.latest_base_date_time(datetime(2025, 8, 24, 14, 15, tzinfo=kst)) == ("20250824", "1400")
+    assert weather_kma.next_publish_at("20250824", "2300") == datetime(2025, 8, 25, 2, 10, tzinfo=kst)
+
+def test_kma_index_pages_once_and_serves_every_hour(monkeypatch):
+    pages = []
+    items = [
+        {"fcstDate": "20250824", "fcstTime": f"{h:02d}00", "category": cat, "fcstValue": value}
+        for h in range(24)
+        for cat, value in (("TMP", str(20 + h)), ("SKY", "1"), ("PTY", "1" if h >= 18 else "0"))
+    ]
+
+    async def fake_page(nx, ny, base_date, base_time, page_no):
+        pages.append(page_no)
+        rows = weather_kma.KMA_ROWS_PER_PAGE
+        return {"totalCount": len(items), "items": {"item": items[(page_no - 1) * rows:page_no * rows]}}
+
+    monkeypatch.setattr(weather_kma, "KMA_ROWS_PER_PAGE", 30)
+    monkeypatch.setattr(weather_kma, "KMA_SERVICE_KEY", "test-key")
+    monkeypatch.setattr(weather_kma, "KMA_FORECAST_CACHE", LRUCache(16))
+    monkeypatch.setattr(weather_kma, "_fetch_page", fake_page)
+    monkeypatch.setattr(weather_provider, "KMA_KEY", "test-key")
+    monkeypatch.setattr(weather_provider, "WEATHER_PRIMARY", "kma")
+
+    async def run():
+        return [
+            await weather_provider.fetch_simple_weather(37.4979, 127.0276, "20250824", hhmm)
+            for hhmm in ("09:10", "14:00", "19:40")
+        ]
+
+    assert asyncio.run(run()) == [
+        {"TMP": "29", "COND": "맑음"},
+        {"TMP": "34", "COND": "맑음"},
+        {"TMP": "40", "COND": "비"},
+    ]
+    assert sorted(pages) == [1, 2, 3]